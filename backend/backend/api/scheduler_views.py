@@ -7,6 +7,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.management import call_command
 from backend.scheduler import get_scheduler
+from backend.utils.cache import CacheManager
 from common.logger import loginfo
 import time
 import threading
@@ -29,7 +30,9 @@ def scheduler_status(request):
             'data': {
                 'running': scheduler.scheduler.running if scheduler.scheduler else False,
                 'jobs': jobs,
-                'total_jobs': len(jobs)
+                'total_jobs': len(jobs),
+                # 当前 worker 的两级缓存命中统计
+                'cache': CacheManager.get_stats()
             }
         })
         
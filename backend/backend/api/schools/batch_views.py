@@ -0,0 +1,156 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from backend.models.tb_primary_schools import TbPrimarySchools
+from backend.models.tb_secondary_schools import TbSecondarySchools
+from backend.api.schools.primary_views import get_primary_detail_cache_key, build_primary_detail_response
+from backend.api.schools.secondary_views import get_secondary_detail_cache_key, build_secondary_detail_response
+from backend.utils.cache import CacheManager
+from backend.utils.payload_response import PayloadResponse, encode_envelope
+from common.logger import logerror, loginfo
+import json
+import time
+import traceback
+
+
+# 单次批量请求最多的学校数
+BATCH_MAX_IDS = 50
+
+# 详情响应的固定开头，"data" 之后就是学校数据的 JSON，结尾是一个 "}"
+# 批量接口直接截取缓存字节中的学校数据拼接，不需要反序列化
+DETAIL_BODY_PREFIX = encode_envelope()
+
+
+def parse_batch_ids(raw_ids):
+    """
+    解析 ids 参数（逗号分隔），去重并保持顺序
+    :raises ValueError: 参数为空、格式错误或数量超限
+    """
+    ids = []
+    for part in (raw_ids or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        school_id = int(part)
+        if school_id not in ids:
+            ids.append(school_id)
+
+    if not ids:
+        raise ValueError("ids 不能为空")
+    if len(ids) > BATCH_MAX_IDS:
+        raise ValueError(f"ids 最多 {BATCH_MAX_IDS} 个")
+    return ids
+
+
+def extract_detail_data(body):
+    """从详情响应字节中截取学校数据部分"""
+    if body.startswith(DETAIL_BODY_PREFIX) and body.endswith(b'}'):
+        return body[len(DETAIL_BODY_PREFIX):-1]
+    # 格式不一致（如旧版本写入的缓存）时回退到反序列化
+    return json.dumps(json.loads(body)['data']).encode('utf-8')
+
+
+def build_batch_response(items, missing):
+    """
+    拼接批量响应：{"code": 200, ..., "data": {"list": [...], "missing": [...]}}
+    按固定开头 + data + "}" 依次写出字节，data 的区间由各段长度直接得到
+    """
+    data = b''.join((
+        b'{"list": [', b', '.join(items), b'], "missing": ',
+        json.dumps(missing).encode('utf-8'), b'}'
+    ))
+    body = DETAIL_BODY_PREFIX + data + b'}'
+    return PayloadResponse.from_body(body, (len(DETAIL_BODY_PREFIX), len(DETAIL_BODY_PREFIX) + len(data)))
+
+
+def school_details_batch(request, model, get_cache_key, build_detail_response, path):
+    """
+    批量获取学校详情
+    1. 一次 MGET 读取所有学校的详情缓存（与详情接口共用缓存）
+    2. 未命中（或已软过期）的学校用一次 id__in 查询回源
+    3. 回源结果用一次 MSET 写回缓存
+    """
+    start_time = time.time()
+    try:
+        ids = parse_batch_ids(request.GET.get('ids'))
+    except ValueError as e:
+        return JsonResponse({
+            "code": 400,
+            "message": f"参数错误: {str(e)}",
+            "success": False,
+            "data": None
+        })
+
+    try:
+        keys = {school_id: get_cache_key(school_id) for school_id in ids}
+        # 详情不进入 L1（与预热一致，避免批量请求挤掉热点数据）
+        cached = CacheManager.get_response_bodies(list(keys.values()), local=False)
+
+        data = {}
+        fill_ids = []
+        for school_id, key in keys.items():
+            hit = cached.get(key)
+            if hit is not None:
+                data[school_id] = extract_detail_data(hit[0])
+            if hit is None or hit[1]:
+                fill_ids.append(school_id)
+
+        if fill_ids:
+            responses = {}
+            for school in model.objects.filter(id__in=fill_ids):
+                response = build_detail_response(school)
+                responses[keys[school.id]] = response
+                data[school.id] = extract_detail_data(response.content)
+            CacheManager.set_many_responses(
+                responses, CacheManager.DETAIL_RESPONSE_TIMEOUT, local=False,
+                soft_timeout=CacheManager.DETAIL_RESPONSE_SOFT_TIMEOUT
+            )
+
+        items = [data[school_id] for school_id in ids if school_id in data]
+        missing = [school_id for school_id in ids if school_id not in data]
+
+        loginfo(
+            f"[PERF] GET {path} (batch) | "
+            f"Total: {(time.time() - start_time) * 1000:.2f}ms | "
+            f"Result: ids={len(ids)}, cached={len(cached)}, filled={len(fill_ids)}, missing={len(missing)}"
+        )
+        return build_batch_response(items, missing)
+
+    except Exception as e:
+        logerror(f"批量获取学校详情失败: {str(e)}\n{traceback.format_exc()}")
+        return JsonResponse({
+            "code": 500,
+            "message": f"服务器错误: {str(e)}",
+            "success": False,
+            "data": None
+        })
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def primary_schools_batch(request):
+    """
+    批量获取小学详情（学校对比、关联卡片）
+    GET /api/schools/primary/batch/?ids=1,2,3
+
+    返回 list（按 ids 顺序，字段与详情接口相同）和 missing（不存在的学校ID）
+    """
+    return school_details_batch(
+        request, TbPrimarySchools, get_primary_detail_cache_key, build_primary_detail_response,
+        '/api/schools/primary/batch/'
+    )
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def secondary_schools_batch(request):
+    """
+    批量获取中学详情（学校对比、关联卡片）
+    GET /api/schools/secondary/batch/?ids=1,2,3
+
+    返回 list（按 ids 顺序，字段与详情接口相同）和 missing（不存在的学校ID）
+    """
+    return school_details_batch(
+        request, TbSecondarySchools, get_secondary_detail_cache_key, build_secondary_detail_response,
+        '/api/schools/secondary/batch/'
+    )
@@ -1,5 +1,4 @@
 import json
-import re
 import time
 import hashlib
 import traceback
@@ -7,116 +6,19 @@ from datetime import datetime
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
-from django.core.cache import cache
 from backend.models.tb_primary_schools import TbPrimarySchools
-from backend.utils.text_converter import normalize_keyword
 from backend.utils.cache import CacheManager
-from backend.utils.application_status import calculate_s1_p1_status, calculate_transfer_status
+from backend.utils.payload_response import PayloadResponse
+from backend.utils.school_snapshot import SchoolSnapshot, SnapshotStore
+from backend.utils.school_aliases import load_school_aliases
+from backend.utils.promotion_order import sort_yearly_stats
+from backend.utils.list_card import (
+    get_band1_rate, build_primary_list_card, build_primary_transfer_status,
+    unpack_list_card, load_stale_list_card_rows, OPEN_APPLICATION_STATUSES
+)
 from common.logger import loginfo
 
 
-def get_band_sort_key(band_str):
-    """
-    获取 Band 的排序键，用于排序
-    返回 (band_number, sub_level)
-    - band_number: 1, 2, 3, 999 (数字越小优先级越高，999表示未知)
-    - sub_level: 1(A), 2(B), 3(C), 4(无子级别), 999 (子级别越小优先级越高)
-    
-    排序优先级：Band 1A > Band 1B > Band 1C > Band 1 > Band 2A > ... > 未知
-    """
-    if not band_str or band_str == '未知':
-        return (999, 999)
-    
-    band_str = str(band_str).strip()
-    
-    # 提取 Band 数字（更精确的匹配）
-    band_number = 999
-    # 匹配 "Band 1", "Band 2", "Band 3" 或 "1", "2", "3" 开头
-    match = re.search(r'Band\s*(\d)|^(\d)', band_str, re.IGNORECASE)
-    if match:
-        band_number = int(match.group(1) or match.group(2))
-    
-    # 提取子级别 (A, B, C) - 更精确的匹配，避免误匹配
-    sub_level = 4  # 默认无子级别
-    # 匹配 "Band 1A", "Band 1B", "Band 1C" 等格式
-    sub_match = re.search(r'Band\s*\d+([ABC])', band_str, re.IGNORECASE)
-    if sub_match:
-        sub_char = sub_match.group(1).upper()
-        if sub_char == 'A':
-            sub_level = 1
-        elif sub_char == 'B':
-            sub_level = 2
-        elif sub_char == 'C':
-            sub_level = 3
-    
-    return (band_number, sub_level)
-
-
-def sort_yearly_stats(promotion_info):
-    """
-    辅助函数：对 promotion_info 中的 yearly_stats 按年份降序排序
-    并对每个年份的 schools 按照 Band 进行排序
-    解决 MySQL JSON 字段存储不保证顺序的问题
-    """
-    if not promotion_info or not isinstance(promotion_info, dict):
-        return promotion_info
-    
-    if 'yearly_stats' in promotion_info and isinstance(promotion_info['yearly_stats'], dict):
-        try:
-            # 按年份降序排序
-            sorted_stats = dict(sorted(promotion_info['yearly_stats'].items(), key=lambda x: x[0], reverse=True))
-            
-            # 对每个年份的 schools 按照 Band 进行排序
-            for year, year_data in sorted_stats.items():
-                if isinstance(year_data, dict) and 'schools' in year_data and isinstance(year_data['schools'], dict):
-                    schools_dict = year_data['schools']
-                    # 转换为列表，按照 Band 排序
-                    schools_sorted = sorted(
-                        schools_dict.items(),
-                        key=lambda x: get_band_sort_key(
-                            x[1].get('band', '未知') if isinstance(x[1], dict) else '未知'
-                        )
-                    )
-                    # 转换回字典（Python 3.7+ 字典保持插入顺序）
-                    sorted_stats[year]['schools'] = dict(schools_sorted)
-            
-            # 返回新的字典以避免修改原数据
-            new_info = promotion_info.copy()
-            new_info['yearly_stats'] = sorted_stats
-            loginfo(f"sorted_stats: {sorted_stats}")
-            return new_info
-        except Exception:
-            # 如果排序失败（例如键不是可比较的），返回原数据
-            loginfo(f"sorted_stats failed, promotion_info: {promotion_info}")
-            return promotion_info
-    return promotion_info
-
-
-def get_band1_rate(school):
-    """
-    获取学校的 Band 1 比例
-    如果 promotion_info 中的 band1_rate_null 为 True，返回 None
-    否则优先使用 school.band1_rate，如果为 None 则从 promotion_info 中获取
-    """
-    # 检查 promotion_info 中的 band1_rate_null 标志
-    if school.promotion_info and isinstance(school.promotion_info, dict):
-        if school.promotion_info.get('band1_rate_null') is True:
-            return None
-    
-    # 优先使用 school.band1_rate
-    if school.band1_rate is not None:
-        return float(school.band1_rate)
-    
-    # 如果 school.band1_rate 为 None，尝试从 promotion_info 中获取
-    if school.promotion_info and isinstance(school.promotion_info, dict):
-        band1_rate = school.promotion_info.get('band1_rate')
-        if band1_rate is not None:
-            return float(band1_rate)
-    
-    return None
-
-
 def serialize_primary_school(school):
     """
     序列化小学数据为前端需要的格式
@@ -141,7 +43,7 @@ def serialize_primary_school(school):
             )
     
     # 处理 promotion_info 排序
-    promotion_info = sort_yearly_stats(school.promotion_info)
+    promotion_info = sort_yearly_stats(school.promotion_info, school.promotion_order)
     
     return {
         "id": school.id,
@@ -248,7 +150,7 @@ def get_cache_key_for_query(params):
     # 将参数字典转换为排序后的字符串,确保相同参数生成相同的键
     param_str = json.dumps(params, sort_keys=True)
     hash_value = hashlib.md5(param_str.encode()).hexdigest()
-    return f"primary_schools_count:{hash_value}"
+    return CacheManager.versioned_key(f"primary_schools_count:{hash_value}")
 
 
 def serialize_primary_school_for_list(school):
@@ -268,76 +170,13 @@ def serialize_primary_school_for_list(school):
     - assessmentInfo (评估政策)
     - promotionInfo (升学详情JSON，band1_rate已提取为生成列)
     """
-    # 使用统一的函数获取 band1_rate（会检查 band1_rate_null 标志）
-    band1_rate = get_band1_rate(school)
-    
-    # 🔥 优化：精简 secondaryInfo，保留必要的字符串值但限制大小
-    secondary_info = school.secondary_info or {}
-    secondary_info_minimal = {}
-    if isinstance(secondary_info, dict):
-        # 保留前端需要的字段，但限制字符串长度（避免过大的数据）
-        # 前端使用: through_train, direct, associated
-        # 数据库可能存储为: 结龙, 直属, 联系
-        for db_key, frontend_key in [('结龙', 'through_train'), ('直属', 'direct'), ('联系', 'associated')]:
-            value = secondary_info.get(db_key) or secondary_info.get(frontend_key)
-            if value:
-                # 如果是字符串，限制长度（避免过大的数据）
-                if isinstance(value, str) and len(value) > 200:
-                    value = value[:200] + '...'
-                secondary_info_minimal[frontend_key] = value
-    
-    # 🔥 优化：精简 transferInfo，只返回计算后的申请状态（不包含详细时间信息）
-    transfer_info = school.transfer_info or {}
-    transfer_info_minimal = {}
-    if isinstance(transfer_info, dict):
-        # 使用统一的工具函数计算申请状态，与前端逻辑保持一致
-        # 这样可以大幅减少数据大小，同时保持前端功能
-        
-        # 计算小一申请状态
-        p1_info = transfer_info.get('小一')
-        if p1_info and isinstance(p1_info, dict):
-            p1_status = calculate_s1_p1_status(p1_info)
-            if p1_status:
-                transfer_info_minimal['小一'] = {'application_status': p1_status}
-        
-        # 计算插班申请状态
-        transfer_data = transfer_info.get('插班')
-        if transfer_data and isinstance(transfer_data, dict):
-            # 🔥 传递学校ID用于调试（可选）
-            transfer_status = calculate_transfer_status(transfer_data, debug_school_id=school.id)
-            if transfer_status:
-                transfer_info_minimal['插班'] = {'application_status': transfer_status}
-        
-        # 🔥 为了前端兼容性，在顶层添加 application_status
-        # 优先使用小一或插班的状态
-        if '小一' in transfer_info_minimal:
-            transfer_info_minimal['application_status'] = transfer_info_minimal['小一'].get('application_status')
-        elif '插班' in transfer_info_minimal:
-            transfer_info_minimal['application_status'] = transfer_info_minimal['插班'].get('application_status')
+    # 🔥 优先使用写入时预计算的卡片（list_card 列），缺失或版本过旧时实时生成
+    card = unpack_list_card(school.list_card)
+    card = dict(card) if card is not None else build_primary_list_card(school)
     
-    return {
-        # 基本信息
-        "id": school.id,
-        "name": school.school_name,
-        "nameTraditional": school.school_name_traditional,
-        "nameEnglish": school.school_name_english,
-        "type": "primary",
-        "category": school.school_category,
-        "district": school.district,
-        "schoolNet": school.school_net,
-        "gender": school.student_gender,
-        "religion": school.religion,
-        "tuition": school.tuition or "-",
-        
-        # 卡片显示：Band1比例（生成列，前端使用 school.band1Rate）
-        "band1Rate": band1_rate,
-        
-        # 🔥 优化：精简的联系中学信息（只保留类型标识）
-        "secondaryInfo": secondary_info_minimal,
-        
-        # 🔥 优化：精简的申请状态信息（只保留是否有申请）
-        "transferInfo": transfer_info_minimal,
-    }
+    # 🔥 优化：精简的申请状态信息（与当天日期有关，按状态时间线查表）
+    card["transferInfo"] = build_primary_transfer_status(school)
+    return card
 
 
 def serialize_primary_school_optimized(school):
@@ -348,7 +187,7 @@ def serialize_primary_school_optimized(school):
     # 预先获取 JSON 字段,避免多次访问
     total_classes_info = school.total_classes_info or {}
     # 排序 yearly_stats
-    promotion_info = sort_yearly_stats(school.promotion_info or {})
+    promotion_info = sort_yearly_stats(school.promotion_info or {}, school.promotion_order)
     
     # 快速计算总班数(避免方法调用)
     total_classes = 0
@@ -409,6 +248,85 @@ def serialize_primary_school_optimized(school):
     }
 
 
+def get_primary_detail_cache_key(school_id):
+    """小学详情缓存键（详情接口和批量接口共用）"""
+    return CacheManager.versioned_key(f"primary_school_detail:{school_id}")
+
+
+def build_primary_detail_response(school):
+    """小学详情响应（详情接口和批量接口共用，缓存的是这个响应的字节）"""
+    return PayloadResponse(serialize_primary_school(school))
+
+
+def primary_sort_key(school):
+    """列表页排序：band1_rate 降序（NULL 在最后），再按校名（不区分大小写）、ID"""
+    band1_rate = school.band1_rate
+    return (band1_rate is None, -float(band1_rate or 0), (school.school_name or '').casefold(), school.id)
+
+
+# primary_sort_key 每一项的类型，用于校验游标中的排序键
+PRIMARY_SORT_KEY_TYPES = (bool, float, str, int)
+
+
+# 推荐接口：同区学校按以下特征的相同程度排序，再从前几名中随机抽取
+PRIMARY_SIMILARITY_WEIGHTS = {
+    'school_net': 3,
+    'band1_level': 2,
+    'school_category': 1,
+    'student_gender': 1,
+    'religion': 1,
+}
+RECOMMENDATION_SIZE = 6
+
+
+# Band1 比例分档的显示名称（统计接口）
+BAND1_LEVEL_LABELS = {1: '0-20%', 2: '20-40%', 3: '40-60%', 4: '60-80%', 5: '80-100%'}
+
+
+def get_band1_level(band1_rate):
+    """Band1 比例分档（每 20% 一档，从 1 开始；无数据为 None），用于相似度计算"""
+    if band1_rate is None:
+        return None
+    return min(int(band1_rate // 20), 4) + 1
+
+
+def build_primary_snapshot():
+    """
+    构建小学列表快照
+    行按 primary_sort_key 排序（band1_rate 降序，再按校名），id 兜底保证顺序稳定
+    """
+    schools = TbPrimarySchools.objects.only(
+        # 筛选 / 搜索字段
+        'id', 'school_name', 'school_name_traditional', 'school_name_english',
+        'school_category', 'district', 'school_net', 'student_gender',
+        'religion', 'teaching_language', 'band1_rate',
+        # 卡片：预计算的 list_card + 申请状态时间线（过期时用 transfer_info 实时计算）
+        'list_card', 'status_timeline', 'transfer_info'
+    )
+    schools = load_stale_list_card_rows(TbPrimarySchools, schools)
+    aliases = load_school_aliases('primary')
+    return SchoolSnapshot.build(
+        schools,
+        serialize_primary_school_for_list,
+        fields=(
+            'school_name', 'school_name_traditional', 'school_name_english',
+            'school_category', 'district', 'school_net', 'student_gender',
+            'religion', 'teaching_language', 'band1_rate',
+        ),
+        derived={
+            'application_status': lambda card: card['transferInfo'].get('application_status'),
+            'band1_level': lambda card: get_band1_level(card['band1Rate']),
+            SchoolSnapshot.ALIAS_COLUMN: lambda card: (
+                aliases.get(card['name']) or aliases.get(card['nameTraditional']) or []
+            ),
+        },
+        sort_key=primary_sort_key
+    )
+
+
+primary_snapshot = SnapshotStore('primary_schools', build_primary_snapshot)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def primary_schools_list(request):
@@ -421,6 +339,7 @@ def primary_schools_list(request):
     3. 🔥 使用 only() 减少查询字段(如果不需要所有字段)
     4. 🔥 优化关键字搜索逻辑
     5. 提前验证分页参数,避免无效查询
+    6. 🔥 支持游标分页: 传 cursor（第一页传空值）时返回 nextCursor，用于无限滚动
     """
     start_time = time.time()
     step_times = {}
@@ -449,6 +368,12 @@ def primary_schools_list(request):
         step_times['param_parse'] = (time.time() - step_start) * 1000
         step_start = time.time()
         
+        # 🔥 游标分页（无限滚动）: 传 cursor 参数时按游标翻页，cursor 为空表示第一页
+        # 响应返回 nextCursor，下一页从上一页最后一所学校之后开始，不需要页码和总页数
+        cursor = request.GET.get('cursor')
+        use_cursor = cursor is not None
+        cursor_position = SchoolSnapshot.decode_cursor(cursor, PRIMARY_SORT_KEY_TYPES) if cursor else None
+        
         # 🔥 缓存优化: 基于查询参数生成缓存键
         cache_params = {
             'category': category,
@@ -461,205 +386,133 @@ def primary_schools_list(request):
             'page': page,
             'page_size': page_size
         }
+        if use_cursor:
+            cache_params['page'] = None
+            cache_params['cursor'] = cursor
         cache_key = get_cache_key_for_query(cache_params)
         step_times['cache_key_gen'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 尝试从缓存获取数据
-        cached_data = cache.get(cache_key)
-        cache_get_time = (time.time() - step_start) * 1000
-        step_times['cache_get'] = cache_get_time
-        step_start = time.time()
         
-        # 🔥 监控：如果缓存读取超过100ms，记录警告
-        if cache_get_time > 100:
-            loginfo(
-                f"[WARN] Slow cache read detected | "
-                f"CacheKey: {cache_key[:50]}... | "
-                f"CacheGet: {cache_get_time:.2f}ms | "
-                f"This may indicate Redis performance issues or network latency"
+        def build_response(page=page):
+            """
+            回源：从内存快照查询并构建响应
+            未命中缓存时由 single-flight 调度（同一查询只执行一次），缓存软过期后也会在后台线程中调用
+            """
+            step_times['cache_check'] = (time.time() - cache_start) * 1000
+            step_start = time.time()
+            
+            # 🔥 内存快照: 全部小学按列表页排序常驻内存，筛选、排序、分页都不再访问数据库
+            snapshot = primary_snapshot.get()
+            
+            step_times['snapshot'] = (time.time() - step_start) * 1000
+            step_start = time.time()
+            
+            rows = snapshot.filter(
+                equals={
+                    'school_category': category,
+                    'district': district,
+                    'school_net': school_net,
+                    'student_gender': gender,
+                    'religion': religion,
+                },
+                contains={'teaching_language': teaching_language},
+                keyword=keyword
             )
-        
-        if cached_data:
-            # 兼容两种缓存格式：
-            # 1. warmup_cache 格式：直接是 data 部分 {'list': ..., 'total': ...}
-            # 2. API 格式：完整的响应格式 {'code': 200, 'data': {...}}
-            if 'data' in cached_data:
-                # API 格式，直接返回
-                result_data = cached_data
-                data_part = cached_data['data']
-            else:
-                # warmup_cache 格式，需要包装成完整响应格式
-                result_data = {
-                    "code": 200,
-                    "message": "成功",
-                    "success": True,
-                    "data": cached_data
-                }
-                data_part = cached_data
+            total = len(rows)
             
-            step_times['data_process'] = (time.time() - step_start) * 1000
+            step_times['filter'] = (time.time() - step_start) * 1000
             step_start = time.time()
+
+            if use_cursor:
+                # 🔥 游标分页: 在已排序的行号中二分定位游标位置，不计算页码
+                schools_data, next_cursor = snapshot.cursor_page(rows, cursor_position, page_size)
+
+                step_times['paginate'] = (time.time() - step_start) * 1000
+                response = PayloadResponse({
+                    "list": schools_data,
+                    "total": total,
+                    "pageSize": page_size,
+                    "nextCursor": next_cursor,
+                    "hasMore": next_cursor is not None
+                })
+                step_times['response_build'] = 0
+                loginfo(
+                    f"[PERF] GET /api/schools/primary/ (snapshot, cursor) | "
+                    f"Total: {(time.time() - start_time) * 1000:.2f}ms | "
+                    f"Filter: {step_times.get('filter', 0):.2f}ms | "
+                    f"Paginate: {step_times.get('paginate', 0):.2f}ms | "
+                    f"Result: total={total}, pageSize={page_size}, items={len(schools_data)}"
+                )
+                return response
+
+            total_pages = (total + page_size - 1) // page_size
+            
+            # 🔥 验证页码是否超出范围
+            if total_pages and page > total_pages:
+                page = total_pages
+            
+            # 直接使用快照中预先序列化好的卡片数据
+            schools_data = snapshot.page(rows, page, page_size)
             
-            # 构建JsonResponse（这里会序列化数据）
-            response = JsonResponse(result_data)
+            step_times['paginate'] = (time.time() - step_start) * 1000
+            step_start = time.time()
+            
+            # 构建响应
+            response = PayloadResponse({
+                "list": schools_data,
+                "total": total,
+                "page": page,
+                "pageSize": page_size,
+                "totalPages": total_pages
+            })
             
-            step_times['json_response'] = (time.time() - step_start) * 1000
+            step_times['response_build'] = (time.time() - step_start) * 1000
             total_time = (time.time() - start_time) * 1000
             
+            # 记录性能日志
             loginfo(
-                f"[PERF] GET /api/schools/primary/ (from-cache) | "
+                f"[PERF] GET /api/schools/primary/ (snapshot) | "
                 f"Total: {total_time:.2f}ms | "
-                f"KeyGen: {step_times.get('cache_key_gen', 0):.2f}ms | "
-                f"CacheGet: {step_times.get('cache_get', 0):.2f}ms | "
-                f"DataProcess: {step_times.get('data_process', 0):.2f}ms | "
-                f"JsonResponse: {step_times.get('json_response', 0):.2f}ms | "
-                f"Result: total={data_part.get('total', 0)}, page={data_part.get('page', page)}, pageSize={data_part.get('pageSize', page_size)}, items={len(data_part.get('list', []))}"
+                f"ParamParse: {step_times.get('param_parse', 0):.2f}ms | "
+                f"CacheCheck: {step_times.get('cache_check', 0):.2f}ms | "
+                f"Snapshot: {step_times.get('snapshot', 0):.2f}ms | "
+                f"Filter: {step_times.get('filter', 0):.2f}ms | "
+                f"Paginate: {step_times.get('paginate', 0):.2f}ms | "
+                f"ResponseBuild: {step_times.get('response_build', 0):.2f}ms | "
+                f"Result: total={total}, page={page}, pageSize={page_size}, items={len(schools_data)}"
             )
+            
             return response
         
-        step_times['cache_check'] = (time.time() - step_start) * 1000
-        step_start = time.time()
+        # 🔥 读取缓存（缓存的是编码好的响应字节）
+        # 防击穿: 同一查询同时只有一个请求回源，其他请求等待回源结果
+        # 过期后异步刷新: 缓存超过10分钟先返回旧数据并在后台刷新，超过1小时才阻塞回源
+        cache_start = time.time()
+        response = CacheManager.get_or_set_response(cache_key, build_response, 3600, soft_timeout=600)
         
-        # 🔥 优化1: 构建基础过滤条件 (不包含 ORDER BY)
-        base_filters = Q()
-        
-        if category:
-            base_filters &= Q(school_category=category)
-        if district:
-            base_filters &= Q(district=district)
-        if school_net:
-            base_filters &= Q(school_net=school_net)
-        if gender:
-            base_filters &= Q(student_gender=gender)
-        if religion:
-            base_filters &= Q(religion=religion)
-        if teaching_language:
-            base_filters &= Q(teaching_language__icontains=teaching_language)
-        
-        # 处理关键字搜索
-        if keyword:
-            normalized_keyword = normalize_keyword(keyword)
-            # 🔥 优化2: 简化关键字搜索 - 避免重复的 icontains
-            # 如果标准化后与原始关键字相同,就不需要重复搜索
-            if normalized_keyword == keyword:
-                keyword_filter = (
-                    Q(school_name__icontains=keyword) |
-                    Q(school_name_traditional__icontains=keyword) |
-                    Q(school_name_english__icontains=keyword)
-                )
-            else:
-                # 只有在标准化后不同时,才需要搜索两次
-                keyword_filter = (
-                    Q(school_name__icontains=normalized_keyword) | 
-                    Q(school_name__icontains=keyword) |
-                    Q(school_name_traditional__icontains=normalized_keyword) |
-                    Q(school_name_traditional__icontains=keyword) |
-                    Q(school_name_english__icontains=keyword)
+        if 'response_build' not in step_times:
+            # 命中缓存
+            cache_get_time = (time.time() - cache_start) * 1000
+            step_times['cache_get'] = cache_get_time
+            
+            # 🔥 监控：如果缓存读取超过100ms，记录警告
+            if cache_get_time > 100:
+                loginfo(
+                    f"[WARN] Slow cache read detected | "
+                    f"CacheKey: {cache_key[:50]}... | "
+                    f"CacheGet: {cache_get_time:.2f}ms | "
+                    f"This may indicate Redis performance issues or network latency"
                 )
-            base_filters &= keyword_filter
-        
-        step_times['query_build'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 🔥 优化3: 分离 COUNT 查询 (不带 ORDER BY)
-        # COUNT 查询使用最简单的形式,数据库可以直接使用索引
-        count_queryset = TbPrimarySchools.objects.filter(base_filters)
-        total = count_queryset.count()
-        
-        step_times['count_query'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 提前计算分页信息
-        if total == 0:
-            # 🔥 优化4: 无数据时直接返回,避免后续查询
-            return JsonResponse({
-                "code": 200,
-                "message": "成功",
-                "success": True,
-                "data": {
-                    "list": [],
-                    "total": 0,
-                    "page": page,
-                    "pageSize": page_size,
-                    "totalPages": 0
-                }
-            })
-        
-        total_pages = (total + page_size - 1) // page_size
-        
-        # 🔥 优化5: 验证页码是否超出范围
-        if page > total_pages:
-            page = total_pages
-        
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        
-        # 🔥 优化6: 数据查询时才添加 ORDER BY
-        # 分离排序逻辑,确保 COUNT 时不受影响
-        data_queryset = TbPrimarySchools.objects.filter(base_filters).order_by(
-            '-band1_rate',  # 使用生成列,有索引
-            'school_name'
-        )
-        
-        # 列表页只查询卡片必需字段（减少数据库I/O和网络传输）
-        data_queryset = data_queryset.only(
-            # 基本字段（11个）
-            'id', 'school_name', 'school_name_traditional', 'school_name_english',
-            'school_category', 'district', 'school_net', 'student_gender',
-            'religion', 'tuition', 'band1_rate',
-            # 卡片需要的JSON字段（2个）
-            'secondary_info',   # 联系中学信息
-            'transfer_info'     # 申请状态
-        )
-        
-        # 使用切片获取当前页数据
-        schools_page = data_queryset[start_index:end_index]
-        
-        step_times['data_query'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 使用精简序列化（只返回卡片必需字段）
-        schools_data = [serialize_primary_school_for_list(school) for school in schools_page]
-        
-        step_times['serialize'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 构建响应
-        response_data = {
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": {
-                "list": schools_data,
-                "total": total,
-                "page": page,
-                "pageSize": page_size,
-                "totalPages": total_pages
-            }
-        }
-        
-        step_times['response_build'] = (time.time() - step_start) * 1000
-        total_time = (time.time() - start_time) * 1000
-        
-        # 🔥 缓存结果数据（10分钟）
-        cache.set(cache_key, response_data, 600)
-        
-        # 记录性能日志
-        loginfo(
-            f"[PERF] GET /api/schools/primary/ (query-optimized) | "
-            f"Total: {total_time:.2f}ms | "
-            f"ParamParse: {step_times.get('param_parse', 0):.2f}ms | "
-            f"CacheCheck: {step_times.get('cache_check', 0):.2f}ms | "
-            f"QueryBuild: {step_times.get('query_build', 0):.2f}ms | "
-            f"CountQuery: {step_times.get('count_query', 0):.2f}ms | "
-            f"DataQuery: {step_times.get('data_query', 0):.2f}ms | "
-            f"Serialize: {step_times.get('serialize', 0):.2f}ms | "
-            f"ResponseBuild: {step_times.get('response_build', 0):.2f}ms | "
-            f"Result: total={total}, page={page}, pageSize={page_size}, items={len(schools_data)}"
-        )
+            
+            total_time = (time.time() - start_time) * 1000
+            loginfo(
+                f"[PERF] GET /api/schools/primary/ (from-cache) | "
+                f"Total: {total_time:.2f}ms | "
+                f"KeyGen: {step_times.get('cache_key_gen', 0):.2f}ms | "
+                f"CacheGet: {step_times.get('cache_get', 0):.2f}ms | "
+                f"Result: page={page}, pageSize={page_size}, bytes={len(response.content)}"
+            )
         
-        return JsonResponse(response_data)
+        return response
         
     except ValueError as e:
         total_time = (time.time() - start_time) * 1000
@@ -692,38 +545,25 @@ def primary_school_detail(request, school_id):
         school_id = int(school_id)
         
         # 🔥 优化: 添加缓存
-        cache_key = f"primary_school_detail:{school_id}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return JsonResponse({
-                "code": 200,
-                "message": "成功",
-                "success": True,
-                "data": cached_data
-            })
+        cache_key = get_primary_detail_cache_key(school_id)
         
-        try:
+        def build_response():
+            """回源：查询并序列化学校详情（学校不存在时抛出 DoesNotExist，不写缓存）"""
             school = TbPrimarySchools.objects.get(id=school_id)
-        except TbPrimarySchools.DoesNotExist:
-            return JsonResponse({
-                "code": 404,
-                "message": "学校不存在",
-                "success": False,
-                "data": None
-            })
-        
-        # 序列化学校数据
-        school_data = serialize_primary_school(school)
+            return build_primary_detail_response(school)
         
-        # 缓存30分钟
-        cache.set(cache_key, school_data, 1800)
+        # 缓存30分钟后先返回旧数据并后台刷新（最长保留1天），同一学校同时只有一个请求回源
+        return CacheManager.get_or_set_response(
+            cache_key, build_response, CacheManager.DETAIL_RESPONSE_TIMEOUT,
+            soft_timeout=CacheManager.DETAIL_RESPONSE_SOFT_TIMEOUT
+        )
         
+    except TbPrimarySchools.DoesNotExist:
         return JsonResponse({
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": school_data
+            "code": 404,
+            "message": "学校不存在",
+            "success": False,
+            "data": None
         })
         
     except ValueError:
@@ -748,69 +588,58 @@ def primary_school_recommendations(request, school_id):
     """
     获取小学推荐列表（同区学校、热门学校）
     GET /api/schools/primary/{id}/recommendations/
+    
+    🔥 优化: 从列表快照中取数，不查询数据库，也不再按学校缓存响应
+    - 同区推荐：从预先算好的相似学校（同区，网、Band、类别等越接近越靠前）中随机取6个
+    - 热门推荐：全港 Band1 比例最高的学校（所有学校共用一份）
     """
     try:
         school_id = int(school_id)
-        
-        # 缓存优化
-        cache_key = f"primary_school_recommendations:{school_id}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return JsonResponse({
-                "code": 200,
-                "message": "成功",
-                "success": True,
-                "data": cached_data
-            })
-            
-        try:
-            current_school = TbPrimarySchools.objects.get(id=school_id)
-        except TbPrimarySchools.DoesNotExist:
-            return JsonResponse({
-                "code": 404,
-                "message": "学校不存在",
-                "success": False,
-                "data": None
-            })
-            
-        # 1. 同区推荐 (Same District) - 随机取6个
-        related_schools = TbPrimarySchools.objects.filter(
-            district=current_school.district
-        ).exclude(id=school_id).order_by('?')[:6]
+        snapshot = primary_snapshot.get()
+        row = snapshot.positions.get(school_id)
+        if row is None:
+            raise TbPrimarySchools.DoesNotExist()
+        
+        # 1. 同区推荐 (Same District) - 从相似学校中随机取6个
+        related_rows = snapshot.neighbour_index('district', PRIMARY_SIMILARITY_WEIGHTS).sample(
+            row, RECOMMENDATION_SIZE
+        )
         
         # 2. 热门推荐 (Popular/High Banding) - 取全港Band1率最高的6个
-        # 注意：band1_rate 是生成列，可能为 None
-        popular_schools = TbPrimarySchools.objects.exclude(
-            id=school_id
-        ).exclude(
-            id__in=[s.id for s in related_schools]
-        ).order_by('-band1_rate')[:6]
-        
-        # 序列化函数 (精简版)
-        def serialize_simple(school):
+        # 快照已按 band1_rate 降序排列，前几行就是热门学校（多取一些用于排除当前学校和同区推荐）
+        popular_candidates = snapshot.derived(
+            'popular', lambda snapshot: list(range(min(snapshot.size, RECOMMENDATION_SIZE * 2 + 1)))
+        )
+        excluded = set(related_rows)
+        excluded.add(row)
+        popular_rows = [i for i in popular_candidates if i not in excluded][:RECOMMENDATION_SIZE]
+        
+        # 序列化函数 (精简版，字段取自列表卡片)
+        def serialize_simple(i):
+            card = snapshot.cards[i]
             return {
-                "id": school.id,
-                "name": school.school_name,
+                "id": card["id"],
+                "name": card["name"],
                 "type": "primary",
-                "district": school.district,
-                "category": school.school_category,
-                "tuition": school.tuition or "-",
-                "band1Rate": get_band1_rate(school)
+                "district": card["district"],
+                "category": card["category"],
+                "tuition": card["tuition"],
+                "band1Rate": card["band1Rate"]
             }
-            
+        
         data = {
-            "related": [serialize_simple(s) for s in related_schools],
-            "popular": [serialize_simple(s) for s in popular_schools]
+            "related": [serialize_simple(i) for i in related_rows],
+            "popular": [serialize_simple(i) for i in popular_rows]
         }
         
-        # 缓存 6 小时
-        cache.set(cache_key, data, 21600)
+        return PayloadResponse(data)
         
+    except TbPrimarySchools.DoesNotExist:
         return JsonResponse({
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": data
+            "code": 404,
+            "message": "学校不存在",
+            "success": False,
+            "data": None
         })
         
     except Exception as e:
@@ -826,26 +655,28 @@ def primary_school_recommendations(request, school_id):
 @require_http_methods(["GET"])
 def primary_schools_stats(request):
     """
-    获取小学统计信息(简化版本,只返回学校总数)
+    获取小学统计信息
     GET /api/schools/primary/stats/
+    
+    🔥 优化: 从列表快照中统计（位图计数），不查询数据库
+    返回学校总数、开放申请数，以及按申请状态、地区、类别、Band1比例分档的分布
     """
     try:
-        # 🔥 优化: 使用缓存
-        cache_key = "primary_schools_total_count"
-        total_schools = cache.get(cache_key)
-        
-        if total_schools is None:
-            total_schools = TbPrimarySchools.objects.count()
-            # 缓存1天 (总数变化不频繁)
-            cache.set(cache_key, total_schools, 60 * 60 * 24)
-        
-        return JsonResponse({
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": {
-                "totalSchools": total_schools,
-                "openApplications": 0
+        snapshot = primary_snapshot.get()
+        counts = snapshot.facet_counts(
+            ('application_status', 'district', 'school_category', 'band1_level')
+        )
+        status_stats = counts['application_status']
+        
+        return PayloadResponse({
+            "totalSchools": snapshot.size,
+            "openApplications": sum(status_stats.get(status, 0) for status in OPEN_APPLICATION_STATUSES),
+            "statusStats": status_stats,
+            "districtStats": counts['district'],
+            "categoryStats": counts['school_category'],
+            "bandStats": {
+                BAND1_LEVEL_LABELS[level]: count
+                for level, count in sorted(counts['band1_level'].items(), reverse=True)
             }
         })
         
@@ -862,73 +693,79 @@ def primary_schools_stats(request):
 @require_http_methods(["GET"])
 def primary_schools_filters(request):
     """
-    获取小学筛选选项
+    获取小学筛选选项及分面计数
     GET /api/schools/primary/filters/
     
+    可选参数与列表接口相同（category、district、schoolNet、gender、religion、teachingLanguage、keyword），
+    counts 返回在当前筛选条件下再选中每个选项时匹配的学校数
+    
     性能优化:
-    1. 使用单次查询获取所有字段,减少数据库查询次数(从5次减少到1次)
-    2. 在Python中处理去重和排序,避免多次数据库扫描
+    1. 选项和计数都来自内存快照的位图索引，不访问数据库
+    2. 计数是位图按位与后数 1 的个数，不需要为每个选项单独查询
     3. 添加缓存
     """
     try:
-        # 🔥 优化: 添加缓存
-        cache_key = "primary_schools_filters"
-        cached_filters = cache.get(cache_key)
-        
-        if cached_filters:
-            return JsonResponse({
-                "code": 200,
-                "message": "成功",
-                "success": True,
-                "data": cached_filters
-            })
-        
-        # 使用单次查询获取所有需要的字段
-        all_data = TbPrimarySchools.objects.values(
-            'district', 
-            'school_category', 
-            'school_net', 
-            'student_gender', 
-            'religion'
-        ).distinct()
-        
-        # 在Python中处理去重和排序
-        districts_set = set()
-        categories_set = set()
-        school_nets_set = set()
-        genders_set = set()
-        religions_set = set()
-        
-        for item in all_data:
-            if item.get('district'):
-                districts_set.add(item['district'])
-            if item.get('school_category'):
-                categories_set.add(item['school_category'])
-            if item.get('school_net') and item['school_net'] != '/':
-                school_nets_set.add(item['school_net'])
-            if item.get('student_gender'):
-                genders_set.add(item['student_gender'])
-            if item.get('religion'):
-                religions_set.add(item['religion'])
-        
-        # 转换为排序后的列表
-        filters_data = {
-            "districts": sorted(districts_set),
-            "categories": sorted(categories_set),
-            "genders": sorted(genders_set),
-            "religions": sorted(religions_set),
-            "schoolNets": sorted(school_nets_set)
+        filter_params = {
+            'category': request.GET.get('category'),
+            'district': request.GET.get('district'),
+            'school_net': request.GET.get('schoolNet'),
+            'gender': request.GET.get('gender'),
+            'religion': request.GET.get('religion'),
+            'teaching_language': request.GET.get('teachingLanguage'),
+            'keyword': request.GET.get('keyword'),
         }
         
-        # 缓存1天 (筛选选项变化不频繁)
-        cache.set(cache_key, filters_data, 60 * 60 * 24)
+        # 🔥 优化: 添加缓存（按筛选条件区分）
+        cache_key = CacheManager.generate_cache_key(
+            "primary_schools_filters:",
+            **{k: v for k, v in filter_params.items() if v}
+        )
         
-        return JsonResponse({
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": filters_data
-        })
+        def build_response():
+            """回源：从快照位图索引计算筛选选项和分面计数"""
+            snapshot = primary_snapshot.get()
+            
+            # 选项列表（排除空值和无效校网 '/'）
+            def options(column, exclude=()):
+                return sorted(v for v in snapshot.bitmap(column) if v and v not in exclude)
+            
+            counts = snapshot.facet_counts(
+                ('district', 'school_category', 'school_net', 'student_gender', 'religion', 'teaching_language'),
+                equals={
+                    'school_category': filter_params['category'],
+                    'district': filter_params['district'],
+                    'school_net': filter_params['school_net'],
+                    'student_gender': filter_params['gender'],
+                    'religion': filter_params['religion'],
+                },
+                contains={'teaching_language': filter_params['teaching_language']},
+                keyword=filter_params['keyword']
+            )
+            counts['school_net'].pop('/', None)
+            
+            filters_data = {
+                "districts": options('district'),
+                "categories": options('school_category'),
+                "genders": options('student_gender'),
+                "religions": options('religion'),
+                "schoolNets": options('school_net', exclude=('/',)),
+                "teachingLanguages": options('teaching_language'),
+                "counts": {
+                    "districts": counts['district'],
+                    "categories": counts['school_category'],
+                    "genders": counts['student_gender'],
+                    "religions": counts['religion'],
+                    "schoolNets": counts['school_net'],
+                    "teachingLanguages": counts['teaching_language'],
+                }
+            }
+            
+            return PayloadResponse(filters_data)
+        
+        # 缓存1天 (筛选选项变化不频繁)，过期后先返回旧数据并后台刷新，最长保留2天
+        return CacheManager.get_or_set_response(
+            cache_key, build_response, 60 * 60 * 24 * 2, soft_timeout=60 * 60 * 24
+        )
         
     except Exception as e:
         return JsonResponse({
@@ -1,14 +1,18 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import F, Q
-from django.core.cache import cache
 from backend.models.tb_secondary_schools import TbSecondarySchools
-from backend.utils.text_converter import normalize_keyword
 from backend.utils.cache import CacheManager
-from backend.utils.application_status import calculate_s1_p1_status, calculate_transfer_status
+from backend.utils.payload_response import PayloadResponse
+from backend.utils.school_snapshot import SchoolSnapshot, SnapshotStore
+from backend.utils.school_aliases import load_school_aliases
+from backend.utils.list_card import (
+    build_secondary_list_card, build_secondary_transfer_status, unpack_list_card, load_stale_list_card_rows,
+    OPEN_APPLICATION_STATUSES
+)
 from common.logger import logerror, loginfo
 import json
+import random
 import traceback
 import time
 import hashlib
@@ -20,7 +24,7 @@ def get_cache_key_for_secondary_query(params):
     """
     param_str = json.dumps(params, sort_keys=True)
     hash_value = hashlib.md5(param_str.encode()).hexdigest()
-    return f"secondary_schools_list:{hash_value}"
+    return CacheManager.versioned_key(f"secondary_schools_list:{hash_value}")
 
 
 def serialize_secondary_school_for_list(school):
@@ -36,54 +40,13 @@ def serialize_secondary_school_for_list(school):
     - promotionInfo (升学详情)
     - schoolCurriculum (课程体系)
     """
-    # 🔥 优化：精简 transferInfo，只返回计算后的申请状态（不包含详细时间信息）
-    transfer_info = school.transfer_info or {}
-    transfer_info_minimal = {}
-    if isinstance(transfer_info, dict):
-        # 使用统一的工具函数计算申请状态，与前端逻辑保持一致
-        # 这样可以大幅减少数据大小，同时保持前端功能
-        
-        # 计算S1申请状态（中一申请）- 使用小一/S1的统一函数
-        s1_info = transfer_info.get('S1')
-        if s1_info and isinstance(s1_info, dict):
-            s1_status = calculate_s1_p1_status(s1_info)
-            if s1_status:
-                transfer_info_minimal['S1'] = {'application_status': s1_status}
-        
-        # 计算插班申请状态
-        transfer_data = transfer_info.get('插班')
-        if transfer_data and isinstance(transfer_data, dict):
-            # 🔥 传递学校ID用于调试（可选）
-            transfer_status = calculate_transfer_status(transfer_data, debug_school_id=school.id)
-            if transfer_status:
-                transfer_info_minimal['插班'] = {'application_status': transfer_status}
-        
-        # 🔥 为了前端兼容性，在顶层添加 application_status
-        # 优先使用S1或插班的状态
-        if 'S1' in transfer_info_minimal:
-            transfer_info_minimal['application_status'] = transfer_info_minimal['S1'].get('application_status')
-        elif '插班' in transfer_info_minimal:
-            transfer_info_minimal['application_status'] = transfer_info_minimal['插班'].get('application_status')
+    # 🔥 优先使用写入时预计算的卡片（list_card 列），缺失或版本过旧时实时生成
+    card = unpack_list_card(school.list_card)
+    card = dict(card) if card is not None else build_secondary_list_card(school)
     
-    return {
-        # 基本信息
-        "id": school.id,
-        "name": school.school_name,
-        "nameTraditional": school.school_name_traditional,
-        "nameEnglish": school.school_name_english,
-        "type": "secondary",
-        "district": school.district,
-        "schoolNet": school.school_net,
-        "religion": school.religion,
-        "gender": school.student_gender,
-        "tuition": school.tuition if school.tuition else 0,
-        "category": school.school_category,
-        "schoolType": school.school_category,
-        "schoolGroup": school.school_group,
-        
-        # 🔥 优化：精简的申请状态信息（只返回状态标识，不包含详细时间）
-        "transferInfo": transfer_info_minimal,
-    }
+    # 🔥 优化：精简的申请状态信息（与当天日期有关，按状态时间线查表）
+    card["transferInfo"] = build_secondary_transfer_status(school)
+    return card
 
 
 def serialize_secondary_school(school):
@@ -176,12 +139,88 @@ def serialize_secondary_school(school):
     }
 
 
+def get_secondary_detail_cache_key(school_id):
+    """中学详情缓存键（详情接口和批量接口共用）"""
+    return CacheManager.versioned_key(f"secondary_school_detail:{school_id}")
+
+
+def build_secondary_detail_response(school):
+    """中学详情响应（详情接口和批量接口共用，缓存的是这个响应的字节）"""
+    return PayloadResponse(serialize_secondary_school(school))
+
+
+def secondary_sort_key(school):
+    """列表页排序：school_group 升序（NULL 在最后），再按校名（不区分大小写）、ID"""
+    return (
+        school.school_group is None,
+        (school.school_group or '').casefold(),
+        (school.school_name or '').casefold(),
+        school.id
+    )
+
+
+# secondary_sort_key 每一项的类型，用于校验游标中的排序键
+SECONDARY_SORT_KEY_TYPES = (bool, str, str, int)
+
+
+# 推荐接口：同区学校按以下特征的相同程度排序，再从前几名中随机抽取
+SECONDARY_SIMILARITY_WEIGHTS = {
+    'school_net': 3,
+    'school_group': 2,
+    'school_category': 1,
+    'student_gender': 1,
+    'religion': 1,
+}
+RECOMMENDATION_SIZE = 6
+
+# 热门推荐的学校分组
+POPULAR_SCHOOL_GROUPS = ('BAND 1A', 'BAND 1B', 'BAND 1C')
+
+
+def build_secondary_snapshot():
+    """
+    构建中学列表快照
+    行按 secondary_sort_key 排序（school_group 升序且 NULL 在最后，再按校名），id 兜底保证顺序稳定
+    """
+    schools = TbSecondarySchools.objects.only(
+        # 筛选 / 搜索字段
+        'id', 'school_name', 'school_name_traditional', 'school_name_english',
+        'school_category', 'district', 'school_net', 'student_gender',
+        'religion', 'teaching_language', 'school_group',
+        # 卡片：预计算的 list_card + 申请状态时间线（过期时用 transfer_info 实时计算）
+        'list_card', 'status_timeline', 'transfer_info'
+    )
+    schools = load_stale_list_card_rows(TbSecondarySchools, schools)
+    aliases = load_school_aliases('secondary')
+    return SchoolSnapshot.build(
+        schools,
+        serialize_secondary_school_for_list,
+        fields=(
+            'school_name', 'school_name_traditional', 'school_name_english',
+            'school_category', 'district', 'school_net', 'student_gender',
+            'religion', 'teaching_language', 'school_group',
+        ),
+        derived={
+            'application_status': lambda card: card['transferInfo'].get('application_status'),
+            SchoolSnapshot.ALIAS_COLUMN: lambda card: (
+                aliases.get(card['name']) or aliases.get(card['nameTraditional']) or []
+            ),
+        },
+        sort_key=secondary_sort_key
+    )
+
+
+secondary_snapshot = SnapshotStore('secondary_schools', build_secondary_snapshot)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def secondary_schools_list(request):
     """
     获取中学列表（从 tb_secondary_schools 表）- 带缓存优化
     GET /api/schools/secondary
+    
+    支持游标分页: 传 cursor（第一页传空值）时返回 nextCursor，用于无限滚动
     """
     # 性能监控：记录开始时间
     start_time = time.time()
@@ -202,6 +241,12 @@ def secondary_schools_list(request):
         step_times['param_parse'] = (time.time() - step_start) * 1000
         step_start = time.time()
         
+        # 🔥 游标分页（无限滚动）: 传 cursor 参数时按游标翻页，cursor 为空表示第一页
+        # 响应返回 nextCursor，下一页从上一页最后一所学校之后开始，不需要页码和总页数
+        cursor = request.GET.get('cursor')
+        use_cursor = cursor is not None
+        cursor_position = SchoolSnapshot.decode_cursor(cursor, SECONDARY_SORT_KEY_TYPES) if cursor else None
+        
         # 🔥 缓存优化: 基于查询参数生成缓存键
         cache_params = {
             'category': category,
@@ -213,173 +258,130 @@ def secondary_schools_list(request):
             'page': page,
             'page_size': page_size
         }
+        if use_cursor:
+            cache_params['page'] = None
+            cache_params['cursor'] = cursor
         cache_key = get_cache_key_for_secondary_query(cache_params)
         step_times['cache_key_gen'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 尝试从缓存获取数据
-        cached_data = cache.get(cache_key)
-        cache_get_time = (time.time() - step_start) * 1000
-        step_times['cache_get'] = cache_get_time
-        step_start = time.time()
         
-        # 🔥 监控：如果缓存读取超过100ms，记录警告
-        if cache_get_time > 100:
-            loginfo(
-                f"[WARN] Slow cache read detected | "
-                f"CacheKey: {cache_key[:50]}... | "
-                f"CacheGet: {cache_get_time:.2f}ms | "
-                f"This may indicate Redis performance issues or network latency"
-            )
-        
-        if cached_data:
-            # 兼容两种缓存格式：
-            # 1. warmup_cache 格式：直接是 data 部分 {'list': ..., 'total': ...}
-            # 2. API 格式：完整的响应格式 {'code': 200, 'data': {...}}
-            if 'data' in cached_data:
-                # API 格式，直接返回
-                result_data = cached_data
-                data_part = cached_data['data']
-            else:
-                # warmup_cache 格式，需要包装成完整响应格式
-                result_data = {
-                    "code": 200,
-                    "message": "成功",
-                    "success": True,
-                    "data": cached_data
-                }
-                data_part = cached_data
-            
-            step_times['data_process'] = (time.time() - step_start) * 1000
+        def build_response():
+            """
+            回源：从内存快照查询并构建响应
+            未命中缓存时由 single-flight 调度（同一查询只执行一次），缓存软过期后也会在后台线程中调用
+            """
+            step_times['cache_check'] = (time.time() - cache_start) * 1000
             step_start = time.time()
             
-            # 构建JsonResponse（这里会序列化数据）
-            response = JsonResponse(result_data)
+            # 🔥 内存快照: 全部中学按列表页排序常驻内存，筛选、排序、分页都不再访问数据库
+            snapshot = secondary_snapshot.get()
             
-            step_times['json_response'] = (time.time() - step_start) * 1000
-            total_time = (time.time() - start_time) * 1000
+            step_times['snapshot'] = (time.time() - step_start) * 1000
+            step_start = time.time()
             
-            loginfo(
-                f"[PERF] GET /api/schools/secondary/ (from-cache) | "
-                f"Total: {total_time:.2f}ms | "
-                f"KeyGen: {step_times.get('cache_key_gen', 0):.2f}ms | "
-                f"CacheGet: {step_times.get('cache_get', 0):.2f}ms | "
-                f"DataProcess: {step_times.get('data_process', 0):.2f}ms | "
-                f"JsonResponse: {step_times.get('json_response', 0):.2f}ms | "
-                f"Result: total={data_part.get('total', 0)}, page={data_part.get('page', page)}, pageSize={data_part.get('pageSize', page_size)}, items={len(data_part.get('list', []))}"
+            # 只搜索学校名称（简体、繁体、英文），繁体关键词会标准化为简体后一起匹配
+            rows = snapshot.filter(
+                equals={
+                    'school_category': category,
+                    'district': district,
+                    'school_group': school_group,
+                    'student_gender': gender,
+                    'religion': religion,
+                },
+                keyword=keyword
             )
-            return response
-        
-        step_times['cache_check'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 构建查询条件 - 从 tb_secondary_schools 表查询
-        queryset = TbSecondarySchools.objects.all()
-        
-        # 应用过滤条件
-        if category:
-            queryset = queryset.filter(school_category=category)
+            total = len(rows)
             
-        if district:
-            queryset = queryset.filter(district=district)
-        
-        if school_group:
-            queryset = queryset.filter(school_group=school_group)
-        
-        if gender:
-            queryset = queryset.filter(student_gender=gender)
-        
-        if religion:
-            queryset = queryset.filter(religion=religion)
+            step_times['filter'] = (time.time() - step_start) * 1000
+            step_start = time.time()
+
+            if use_cursor:
+                # 🔥 游标分页: 在已排序的行号中二分定位游标位置，不计算页码
+                schools_data, next_cursor = snapshot.cursor_page(rows, cursor_position, page_size)
+
+                step_times['paginate'] = (time.time() - step_start) * 1000
+                response = PayloadResponse({
+                    "list": schools_data,
+                    "total": total,
+                    "pageSize": page_size,
+                    "nextCursor": next_cursor,
+                    "hasMore": next_cursor is not None
+                })
+                step_times['response_build'] = 0
+                loginfo(
+                    f"[PERF] GET /api/schools/secondary/ (snapshot, cursor) | "
+                    f"Total: {(time.time() - start_time) * 1000:.2f}ms | "
+                    f"Filter: {step_times.get('filter', 0):.2f}ms | "
+                    f"Paginate: {step_times.get('paginate', 0):.2f}ms | "
+                    f"Result: total={total}, pageSize={page_size}, items={len(schools_data)}"
+                )
+                return response
+
+            # 计算分页信息
+            total_pages = (total + page_size - 1) // page_size if total > 0 else 0
             
-        if keyword:
-            # 标准化关键词（将繁体转为简体，统一用于搜索）
-            normalized_keyword = normalize_keyword(keyword)
+            # 直接使用快照中预先序列化好的卡片数据
+            schools_data = snapshot.page(rows, page, page_size)
             
-            # 只搜索学校名称（简体、繁体、英文）
-            # 同时用标准化关键词和原始关键词搜索，确保无论用户输入简体还是繁体，都能匹配到
-            queryset = queryset.filter(
-                Q(school_name__icontains=normalized_keyword) | 
-                Q(school_name__icontains=keyword) |
-                Q(school_name_traditional__icontains=normalized_keyword) |
-                Q(school_name_traditional__icontains=keyword) |
-                Q(school_name_english__icontains=keyword)
-            ).order_by(F('school_group').asc(nulls_last=True), 'school_name')
-        else:
-            # 没有关键词时，按照 school_group 和 school_name 排序（NULL 值排在最后）
-            queryset = queryset.order_by(F('school_group').asc(nulls_last=True), 'school_name')
-        
-        step_times['query_build'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 优化COUNT查询：使用缓存避免重复执行COUNT(*)
-        total = queryset.count()
-        
-        step_times['count_query'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 计算分页信息
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        
-        # 列表页只查询卡片必需字段（减少数据库I/O和网络传输）
-        queryset = queryset.only(
-            # 基本字段
-            'id', 'school_name', 'school_name_traditional', 'school_name_english',
-            'district', 'school_net', 'religion', 'student_gender',
-            'tuition', 'school_category', 'school_group',
-            # 卡片需要的JSON字段
-            'transfer_info'  # 申请状态
-        )
-        
-        # 使用切片获取当前页数据（避免Paginator的额外查询）
-        schools_page = queryset[start_index:end_index]
-        
-        step_times['data_query'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 使用精简序列化（只返回卡片必需字段）
-        schools_data = [serialize_secondary_school_for_list(school) for school in schools_page]
-        
-        step_times['serialize'] = (time.time() - step_start) * 1000
-        step_start = time.time()
-        
-        # 构建响应
-        response_data = {
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": {
+            step_times['paginate'] = (time.time() - step_start) * 1000
+            step_start = time.time()
+            
+            # 构建响应
+            response = PayloadResponse({
                 "list": schools_data,
                 "total": total,
                 "page": page,
                 "pageSize": page_size,
                 "totalPages": total_pages
-            }
-        }
+            })
+            
+            step_times['response_build'] = (time.time() - step_start) * 1000
+            total_time = (time.time() - start_time) * 1000
+            
+            # 记录性能日志
+            loginfo(
+                f"[PERF] GET /api/schools/secondary/ (snapshot) | "
+                f"Total: {total_time:.2f}ms | "
+                f"ParamParse: {step_times.get('param_parse', 0):.2f}ms | "
+                f"CacheCheck: {step_times.get('cache_check', 0):.2f}ms | "
+                f"Snapshot: {step_times.get('snapshot', 0):.2f}ms | "
+                f"Filter: {step_times.get('filter', 0):.2f}ms | "
+                f"Paginate: {step_times.get('paginate', 0):.2f}ms | "
+                f"ResponseBuild: {step_times.get('response_build', 0):.2f}ms | "
+                f"Result: total={total}, page={page}, pageSize={page_size}, items={len(schools_data)}"
+            )
+            
+            return response
         
-        step_times['response_build'] = (time.time() - step_start) * 1000
-        total_time = (time.time() - start_time) * 1000
+        # 🔥 读取缓存（缓存的是编码好的响应字节）
+        # 防击穿: 同一查询同时只有一个请求回源，其他请求等待回源结果
+        # 过期后异步刷新: 缓存超过10分钟先返回旧数据并在后台刷新，超过1小时才阻塞回源
+        cache_start = time.time()
+        response = CacheManager.get_or_set_response(cache_key, build_response, 3600, soft_timeout=600)
         
-        # 🔥 缓存结果数据（10分钟）
-        cache.set(cache_key, response_data, 600)
-        
-        # 记录性能日志
-        loginfo(
-            f"[PERF] GET /api/schools/secondary/ (query-optimized) | "
-            f"Total: {total_time:.2f}ms | "
-            f"ParamParse: {step_times.get('param_parse', 0):.2f}ms | "
-            f"CacheCheck: {step_times.get('cache_check', 0):.2f}ms | "
-            f"QueryBuild: {step_times.get('query_build', 0):.2f}ms | "
-            f"CountQuery: {step_times.get('count_query', 0):.2f}ms | "
-            f"DataQuery: {step_times.get('data_query', 0):.2f}ms | "
-            f"Serialize: {step_times.get('serialize', 0):.2f}ms | "
-            f"ResponseBuild: {step_times.get('response_build', 0):.2f}ms | "
-            f"Result: total={total}, page={page}, pageSize={page_size}, items={len(schools_data)}"
-        )
+        if 'response_build' not in step_times:
+            # 命中缓存
+            cache_get_time = (time.time() - cache_start) * 1000
+            step_times['cache_get'] = cache_get_time
+            
+            # 🔥 监控：如果缓存读取超过100ms，记录警告
+            if cache_get_time > 100:
+                loginfo(
+                    f"[WARN] Slow cache read detected | "
+                    f"CacheKey: {cache_key[:50]}... | "
+                    f"CacheGet: {cache_get_time:.2f}ms | "
+                    f"This may indicate Redis performance issues or network latency"
+                )
+            
+            total_time = (time.time() - start_time) * 1000
+            loginfo(
+                f"[PERF] GET /api/schools/secondary/ (from-cache) | "
+                f"Total: {total_time:.2f}ms | "
+                f"KeyGen: {step_times.get('cache_key_gen', 0):.2f}ms | "
+                f"CacheGet: {step_times.get('cache_get', 0):.2f}ms | "
+                f"Result: page={page}, pageSize={page_size}, bytes={len(response.content)}"
+            )
         
-        return JsonResponse(response_data)
+        return response
         
     except ValueError as e:
         total_time = (time.time() - start_time) * 1000
@@ -413,38 +415,25 @@ def secondary_school_detail(request, school_id):
         school_id = int(school_id)
         
         # 🔥 缓存优化: 尝试从缓存获取数据
-        cache_key = f"secondary_school_detail:{school_id}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return JsonResponse({
-                "code": 200,
-                "message": "成功",
-                "success": True,
-                "data": cached_data
-            })
+        cache_key = get_secondary_detail_cache_key(school_id)
         
-        try:
+        def build_response():
+            """回源：查询并序列化学校详情（学校不存在时抛出 DoesNotExist，不写缓存）"""
             school = TbSecondarySchools.objects.get(id=school_id)
-        except TbSecondarySchools.DoesNotExist:
-            return JsonResponse({
-                "code": 404,
-                "message": "学校不存在",
-                "success": False,
-                "data": None
-            })
-        
-        # 序列化学校数据
-        school_data = serialize_secondary_school(school)
+            return build_secondary_detail_response(school)
         
-        # 🔥 缓存数据（30分钟）
-        cache.set(cache_key, school_data, 1800)
+        # 🔥 缓存数据：30分钟后先返回旧数据并后台刷新（最长保留1天），同一学校同时只有一个请求回源
+        return CacheManager.get_or_set_response(
+            cache_key, build_response, CacheManager.DETAIL_RESPONSE_TIMEOUT,
+            soft_timeout=CacheManager.DETAIL_RESPONSE_SOFT_TIMEOUT
+        )
         
+    except TbSecondarySchools.DoesNotExist:
         return JsonResponse({
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": school_data
+            "code": 404,
+            "message": "学校不存在",
+            "success": False,
+            "data": None
         })
         
     except ValueError:
@@ -469,70 +458,62 @@ def secondary_school_recommendations(request, school_id):
     """
     获取中学推荐列表（同区学校、热门学校）
     GET /api/schools/secondary/{id}/recommendations/
+    
+    🔥 优化: 从列表快照中取数，不查询数据库，也不再按学校缓存响应
+    - 同区推荐：从预先算好的相似学校（同区，网、Banding、类别等越接近越靠前）中随机取6个
+    - 热门推荐：Band 1A/1B/1C 学校中随机取6个（候选学校所有学校共用一份）
     """
     try:
         school_id = int(school_id)
+        snapshot = secondary_snapshot.get()
+        row = snapshot.positions.get(school_id)
+        if row is None:
+            raise TbSecondarySchools.DoesNotExist()
+        
+        # 1. 同区推荐 (Same District) - 从相似学校中随机取6个
+        related_rows = snapshot.neighbour_index('district', SECONDARY_SIMILARITY_WEIGHTS).sample(
+            row, RECOMMENDATION_SIZE
+        )
         
-        # 缓存优化
-        cache_key = f"secondary_school_recommendations:{school_id}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return JsonResponse({
-                "code": 200,
-                "message": "成功",
-                "success": True,
-                "data": cached_data
-            })
-            
-        try:
-            current_school = TbSecondarySchools.objects.get(id=school_id)
-        except TbSecondarySchools.DoesNotExist:
-            return JsonResponse({
-                "code": 404,
-                "message": "学校不存在",
-                "success": False,
-                "data": None
-            })
-            
-        # 1. 同区推荐 (Same District) - 随机取4个
-        related_schools = TbSecondarySchools.objects.filter(
-            district=current_school.district
-        ).exclude(id=school_id).order_by('?')[:6]
-        
-        # 2. 热门推荐 (Popular) - 取 Band 1A/1B 学校中随机6个
-        popular_schools = TbSecondarySchools.objects.filter(
-            school_group__in=['BAND 1A', 'BAND 1B', 'BAND 1C']
-        ).exclude(
-            id=school_id
-        ).exclude(
-            id__in=[s.id for s in related_schools]
-        ).order_by('?')[:6]
-        
-        # 序列化函数 (精简版)
-        def serialize_simple(school):
+        # 2. 热门推荐 (Popular) - 取 Band 1A/1B/1C 学校中随机6个
+        def build_popular_pool(snapshot):
+            bitmaps = snapshot.bitmap('school_group')
+            mask = 0
+            for group in POPULAR_SCHOOL_GROUPS:
+                mask |= bitmaps.get(group, 0)
+            return snapshot.to_rows(mask)
+        
+        excluded = set(related_rows)
+        excluded.add(row)
+        popular_pool = [i for i in snapshot.derived('popular', build_popular_pool) if i not in excluded]
+        popular_rows = random.sample(popular_pool, min(RECOMMENDATION_SIZE, len(popular_pool)))
+        
+        # 序列化函数 (精简版，字段取自列表卡片)
+        def serialize_simple(i):
+            card = snapshot.cards[i]
             return {
-                "id": school.id,
-                "name": school.school_name,
+                "id": card["id"],
+                "name": card["name"],
                 "type": "secondary",
-                "district": school.district,
-                "category": school.school_category,
-                "tuition": school.tuition or "-",
-                "schoolGroup": school.school_group
+                "district": card["district"],
+                "category": card["category"],
+                "tuition": card["tuition"] or "-",
+                "schoolGroup": card["schoolGroup"]
             }
-            
+        
         data = {
-            "related": [serialize_simple(s) for s in related_schools],
-            "popular": [serialize_simple(s) for s in popular_schools]
+            "related": [serialize_simple(i) for i in related_rows],
+            "popular": [serialize_simple(i) for i in popular_rows]
         }
         
-        # 缓存 6 小时
-        cache.set(cache_key, data, 21600)
+        return PayloadResponse(data)
         
+    except TbSecondarySchools.DoesNotExist:
         return JsonResponse({
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": data
+            "code": 404,
+            "message": "学校不存在",
+            "success": False,
+            "data": None
         })
         
     except Exception as e:
@@ -548,28 +529,26 @@ def secondary_school_recommendations(request, school_id):
 @require_http_methods(["GET"])
 def secondary_schools_stats(request):
     """
-    获取中学统计信息（简化版本，只返回学校总数）- 带缓存优化
+    获取中学统计信息
     GET /api/schools/secondary/stats
+    
+    🔥 优化: 从列表快照中统计（位图计数），不查询数据库
+    返回学校总数、开放申请数，以及按申请状态、地区、类别、Banding 的分布
     """
     try:
-        # 🔥 缓存优化: 尝试从缓存获取数据
-        cache_key = "secondary_schools_total_count"
-        total_schools = cache.get(cache_key)
-        
-        if total_schools is None:
-            # 只返回所有学校的总数
-            total_schools = TbSecondarySchools.objects.count()
-            # 🔥 缓存1天（总数变化不频繁）
-            cache.set(cache_key, total_schools, 60 * 60 * 24)
-        
-        return JsonResponse({
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": {
-                "totalSchools": total_schools,
-                "openApplications": 0  # 为了兼容前端接口，保留此字段
-            }
+        snapshot = secondary_snapshot.get()
+        counts = snapshot.facet_counts(
+            ('application_status', 'district', 'school_category', 'school_group')
+        )
+        status_stats = counts['application_status']
+        
+        return PayloadResponse({
+            "totalSchools": snapshot.size,
+            "openApplications": sum(status_stats.get(status, 0) for status in OPEN_APPLICATION_STATUSES),
+            "statusStats": status_stats,
+            "districtStats": counts['district'],
+            "categoryStats": counts['school_category'],
+            "groupStats": dict(sorted(counts['school_group'].items()))
         })
         
     except Exception as e:
@@ -586,77 +565,76 @@ def secondary_schools_stats(request):
 @require_http_methods(["GET"])
 def secondary_schools_filters(request):
     """
-    优化后的中学筛选器接口 - 带缓存优化
+    优化后的中学筛选器接口 - 带缓存优化和分面计数
     GET /api/schools/secondary/filters/
     
+    可选参数与列表接口相同（category、district、schoolGroup、gender、religion、keyword），
+    counts 返回在当前筛选条件下再选中每个选项时匹配的学校数
+    
     性能优化：
     1. 🔥 使用缓存提升响应速度
-    2. 使用单次查询获取所有字段，减少数据库查询次数（从5次减少到1次）
-    3. 在Python中处理去重和排序，避免多次数据库扫描
+    2. 选项和计数都来自内存快照的位图索引，不访问数据库
+    3. 计数是位图按位与后数 1 的个数，不需要为每个选项单独查询
     """
     try:
-        # 🔥 缓存优化: 尝试从缓存获取数据
-        cache_key = "secondary_schools_filters"
-        cached_filters = cache.get(cache_key)
-        
-        if cached_filters:
-            return JsonResponse({
-                "code": 200,
-                "message": "成功",
-                "success": True,
-                "data": cached_filters
-            })
-        
-        # 优化：使用单次查询获取所有需要的字段，而不是每个字段一个查询
-        # 这样可以减少数据库查询次数从5次减少到1次
-        all_data = TbSecondarySchools.objects.values(
-            'district', 
-            'school_category', 
-            'school_group', 
-            'student_gender', 
-            'religion'
-        ).distinct()
-        
-        # 在Python中处理去重和排序，避免多次数据库扫描
-        districts_set = set()
-        categories_set = set()
-        school_groups_set = set()
-        genders_set = set()
-        religions_set = set()
-        
-        for item in all_data:
-            if item.get('district'):
-                districts_set.add(item['district'])
-            if item.get('school_category'):
-                categories_set.add(item['school_category'])
-            if item.get('school_group'):
-                school_groups_set.add(item['school_group'])
-            if item.get('student_gender'):
-                genders_set.add(item['student_gender'])
-            if item.get('religion'):
-                religions_set.add(item['religion'])
-        
-        # 转换为排序后的列表
-        filters_data = {
-            "districts": sorted(districts_set),
-            "categories": sorted(categories_set),
-            "schoolGroups": sorted(school_groups_set),
-            "genders": sorted(genders_set),
-            "religions": sorted(religions_set)
+        filter_params = {
+            'category': request.GET.get('category'),
+            'district': request.GET.get('district'),
+            'school_group': request.GET.get('schoolGroup'),
+            'gender': request.GET.get('gender'),
+            'religion': request.GET.get('religion'),
+            'keyword': request.GET.get('keyword'),
         }
         
-        # 🔥 缓存1天（筛选选项变化不频繁）
-        cache.set(cache_key, filters_data, 60 * 60 * 24)
+        # 🔥 缓存优化: 按筛选条件区分缓存
+        cache_key = CacheManager.generate_cache_key(
+            "secondary_schools_filters:",
+            **{k: v for k, v in filter_params.items() if v}
+        )
         
-        # 构建响应
-        response_data = {
-            "code": 200,
-            "message": "成功",
-            "success": True,
-            "data": filters_data
-        }
+        def build_response():
+            """回源：从快照位图索引计算筛选选项和分面计数"""
+            snapshot = secondary_snapshot.get()
+            
+            def options(column):
+                return sorted(v for v in snapshot.bitmap(column) if v)
+            
+            counts = snapshot.facet_counts(
+                ('district', 'school_category', 'school_group', 'student_gender', 'religion', 'teaching_language'),
+                equals={
+                    'school_category': filter_params['category'],
+                    'district': filter_params['district'],
+                    'school_group': filter_params['school_group'],
+                    'student_gender': filter_params['gender'],
+                    'religion': filter_params['religion'],
+                },
+                keyword=filter_params['keyword']
+            )
+            
+            filters_data = {
+                "districts": options('district'),
+                "categories": options('school_category'),
+                "schoolGroups": options('school_group'),
+                "genders": options('student_gender'),
+                "religions": options('religion'),
+                "teachingLanguages": options('teaching_language'),
+                "counts": {
+                    "districts": counts['district'],
+                    "categories": counts['school_category'],
+                    "schoolGroups": counts['school_group'],
+                    "genders": counts['student_gender'],
+                    "religions": counts['religion'],
+                    "teachingLanguages": counts['teaching_language'],
+                }
+            }
+            
+            # 构建响应
+            return PayloadResponse(filters_data)
         
-        return JsonResponse(response_data)
+        # 🔥 缓存1天（筛选选项变化不频繁），过期后先返回旧数据并后台刷新，最长保留2天
+        return CacheManager.get_or_set_response(
+            cache_key, build_response, 60 * 60 * 24 * 2, soft_timeout=60 * 60 * 24
+        )
         
     except Exception as e:
         return JsonResponse({
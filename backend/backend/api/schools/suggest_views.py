@@ -0,0 +1,90 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from backend.api.schools.primary_views import primary_snapshot
+from backend.api.schools.secondary_views import secondary_snapshot
+from backend.utils.payload_response import PayloadResponse
+from common.logger import logerror
+import traceback
+
+
+# 联想结果条数上限（与前缀树每个节点保留的条数一致）
+SUGGEST_MAX_LIMIT = 10
+SUGGEST_DEFAULT_LIMIT = 8
+
+
+def serialize_suggestion(card, school_type):
+    """联想结果只返回下拉框需要的字段"""
+    suggestion = {
+        "id": card["id"],
+        "type": school_type,
+        "name": card["name"],
+        "nameTraditional": card["nameTraditional"],
+        "nameEnglish": card["nameEnglish"],
+        "district": card.get("district"),
+    }
+    if school_type == "primary":
+        suggestion["band1Rate"] = card.get("band1Rate")
+    else:
+        suggestion["schoolGroup"] = card.get("schoolGroup")
+    return suggestion
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def schools_suggest(request):
+    """
+    学校名称联想（输入框逐字联想）
+    GET /api/schools/suggest/?q=圣保罗&type=primary&limit=8
+
+    参数:
+    - q: 输入内容，按名称前缀匹配（简体/繁体/英文名称及别名，繁体输入会转简体后一起匹配）
+    - type: primary / secondary，不传时两类都返回
+    - limit: 每类返回条数，默认 8，最多 10
+
+    排序: 小学按 Band1 比例、中学按学校分组（与列表页排序一致）
+
+    性能优化:
+    🔥 结果来自内存快照上的前缀树，每个节点预存 top-k，只需沿输入走到对应节点，不访问数据库和 Redis
+    """
+    try:
+        query = (request.GET.get('q') or '').strip()
+        school_type = request.GET.get('type')
+
+        try:
+            limit = int(request.GET.get('limit', SUGGEST_DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            limit = SUGGEST_DEFAULT_LIMIT
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+        if school_type and school_type not in ('primary', 'secondary'):
+            return JsonResponse({
+                "code": 400,
+                "message": "type 参数只能是 primary 或 secondary",
+                "success": False,
+                "data": None
+            })
+
+        data = {"query": query}
+        for current_type, store in (('primary', primary_snapshot), ('secondary', secondary_snapshot)):
+            if school_type and school_type != current_type:
+                continue
+            suggestions = []
+            if query:
+                snapshot = store.get()
+                suggestions = [
+                    serialize_suggestion(snapshot.cards[i], current_type)
+                    for i in snapshot.suggest(query, limit=limit)
+                ]
+            data[current_type] = suggestions
+
+        return PayloadResponse(data)
+
+    except Exception as e:
+        logerror(f"学校联想失败: {str(e)}\n{traceback.format_exc()}")
+        return JsonResponse({
+            "code": 500,
+            "message": f"服务器错误: {str(e)}",
+            "success": False,
+            "data": None
+        })
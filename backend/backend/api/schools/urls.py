@@ -2,6 +2,8 @@ from django.urls import re_path
 from . import views
 from . import secondary_views
 from . import primary_views
+from . import suggest_views
+from . import batch_views
 
 
 urlpatterns = [
@@ -11,15 +13,19 @@ urlpatterns = [
     # re_path(r'^(?P<school_id>\d+)/$', views.school_detail, name='school_detail'),
 
 
+    re_path(r'^suggest/?$', suggest_views.schools_suggest, name='schools_suggest'),
+
     re_path(r'^primary/$', primary_views.primary_schools_list, name='primary_schools_list'),
     re_path(r'^primary/stats/$', primary_views.primary_schools_stats, name='primary_schools_stats'),
     re_path(r'^primary/filters/$', primary_views.primary_schools_filters, name='primary_schools_filters'),
+    re_path(r'^primary/batch/?$', batch_views.primary_schools_batch, name='primary_schools_batch'),
     re_path(r'^primary/(?P<school_id>\d+)/recommendations/$', primary_views.primary_school_recommendations, name='primary_school_recommendations'),
     re_path(r'^primary/(?P<school_id>\d+)/$', primary_views.primary_school_detail, name='primary_school_detail'),
 
     re_path(r'^secondary/$', secondary_views.secondary_schools_list, name='secondary_schools_list'),
     re_path(r'^secondary/stats/$', secondary_views.secondary_schools_stats, name='secondary_schools_stats'),
     re_path(r'^secondary/filters/$', secondary_views.secondary_schools_filters, name='secondary_schools_filters'),
+    re_path(r'^secondary/batch/?$', batch_views.secondary_schools_batch, name='secondary_schools_batch'),
     re_path(r'^secondary/(?P<school_id>\d+)/recommendations/$', secondary_views.secondary_school_recommendations, name='secondary_school_recommendations'),
     re_path(r'^secondary/(?P<school_id>\d+)/$', secondary_views.secondary_school_detail, name='secondary_school_detail'),
 
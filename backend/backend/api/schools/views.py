@@ -2,13 +2,30 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q, Case, When, Value, IntegerField
+from django.db.models import Q, Case, When, Value, IntegerField, Count
 from backend.models.tb_schools import TbSchools
 from backend.models.tb_primary_schools import TbPrimarySchools
 from backend.models.tb_secondary_schools import TbSecondarySchools
 import json
 
 
+# 旧接口的"开放申请"只统计 open（新的 stats 接口还包括即将截止的 deadline），保持原有返回值不变
+LEGACY_OPEN_APPLICATION_STATUSES = ('open',)
+
+
+def count_by_application_status(model):
+    """
+    按 application_status 列分组计数（一次 GROUP BY，走索引）
+    :return: (学校总数, 开放申请数)
+    """
+    status_counts = dict(
+        model.objects.order_by().values_list('application_status').annotate(count=Count('id'))
+    )
+    total_schools = sum(status_counts.values())
+    open_applications = sum(status_counts.get(status, 0) for status in LEGACY_OPEN_APPLICATION_STATUSES)
+    return total_schools, open_applications
+
+
 def serialize_school(school):
     """
     序列化学校数据为前端需要的格式
@@ -217,14 +234,8 @@ def schools_stats(request):
         
         # 根据类型选择不同的数据库表
         if school_type == 'primary':
-            # 查询小学表
-            queryset = TbPrimarySchools.objects.all()
-            total_schools = queryset.count()
-            
-            # 计算开放申请的学校数量
-            open_applications = queryset.filter(
-                transfer_info__icontains='"application_status":"open"'
-            ).count() if queryset.filter(transfer_info__isnull=False).exists() else 0
+            # 学校总数和开放申请的学校数量（按 application_status 列一次分组统计）
+            total_schools, open_applications = count_by_application_status(TbPrimarySchools)
             
             # # 按地区统计
             # district_stats = {}
@@ -255,14 +266,8 @@ def schools_stats(request):
             })
             
         elif school_type == 'secondary':
-            # 查询中学表
-            queryset = TbSecondarySchools.objects.all()
-            total_schools = queryset.count()
-            
-            # 计算开放申请的学校数量
-            open_applications = queryset.filter(
-                transfer_info__icontains='"application_status":"open"'
-            ).count() if queryset.filter(transfer_info__isnull=False).exists() else 0
+            # 学校总数和开放申请的学校数量（按 application_status 列一次分组统计）
+            total_schools, open_applications = count_by_application_status(TbSecondarySchools)
             
             # # 按地区统计
             # district_stats = {}
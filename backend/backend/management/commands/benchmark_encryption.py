@@ -0,0 +1,93 @@
+"""
+对比各加密格式的速度和响应体大小
+数据取自 common/data/all_*_schools.json（详情 = 单个学校，列表 = 一页 / 全部学校）
+
+用法:
+    python manage.py benchmark_encryption                   # 默认每项 200 次
+    python manage.py benchmark_encryption --iterations 1000
+"""
+import json
+import os
+import time
+import zlib
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.utils.payload_response import PayloadResponse
+from utils.data_encryptor import DataEncryptor
+
+
+class Command(BaseCommand):
+    help = '对比 v1(CBC) / v2(GCM) / v2 二进制传输的加解密速度和响应体大小'
+
+    DATA_FILES = {
+        'primary': 'common/data/all_primary_schools.json',
+        'secondary': 'common/data/all_secondary_schools.json',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='每项测试的次数')
+        parser.add_argument('--page-size', type=int, default=20, help='列表一页的条数')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        page_size = options['page_size']
+
+        for school_type, path in self.DATA_FILES.items():
+            with open(os.path.join(settings.BASE_DIR, path), 'r', encoding='utf-8') as f:
+                schools = json.load(f)
+            payloads = [
+                ('详情', schools[len(schools) // 2]),
+                (f'列表({page_size}条)', {'list': schools[:page_size], 'total': len(schools)}),
+                (f'全部({len(schools)}条)', {'list': schools, 'total': len(schools)}),
+            ]
+            for label, data in payloads:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{school_type} {label}'))
+                self._run_payload(PayloadResponse(data), iterations)
+
+    def _run_payload(self, response, iterations):
+        body = response.content
+        data_bytes = response.data_bytes
+        start, end = response.data_span
+
+        def encrypt_json(version):
+            # 与 DataSecurityMiddleware 的 PayloadResponse 路径相同：加密 data 字节并拼回原位置
+            encrypted = DataEncryptor.encrypt_bytes(data_bytes, version)
+            return body[:start] + json.dumps(encrypted).encode('utf-8') + body[end:]
+
+        def decrypt_json(content):
+            return DataEncryptor.decrypt_envelope(json.loads(content)['data'])
+
+        modes = [
+            ('不加密', lambda: body, None),  # 只作为大小的参照
+            ('v1 CBC+base64', lambda: encrypt_json(DataEncryptor.VERSION_CBC), decrypt_json),
+            ('v2 GCM+base64', lambda: encrypt_json(DataEncryptor.VERSION_GCM), decrypt_json),
+            ('v2 GCM 二进制', lambda: DataEncryptor.encrypt_binary(body), DataEncryptor.decrypt_binary),
+        ]
+
+        self.stdout.write(
+            f'{"格式":<16}{"大小":>10}{"gzip后":>10}{"加密(ms)":>12}{"加密(MB/s)":>12}{"解密(ms)":>12}'
+        )
+        for name, encrypt, decrypt in modes:
+            content = encrypt()
+            if decrypt is None:
+                self.stdout.write(f'{name:<16}{len(content):>10}{len(zlib.compress(content, 6)):>10}')
+                continue
+            if decrypt(content) is None:
+                self.stdout.write(self.style.ERROR(f'{name}: 解密失败'))
+                continue
+            encrypt_seconds = self._time(encrypt, iterations)
+            decrypt_seconds = self._time(lambda: decrypt(content), iterations)
+            throughput = len(data_bytes) / encrypt_seconds / 1024 / 1024
+            self.stdout.write(
+                f'{name:<16}{len(content):>10}{len(zlib.compress(content, 6)):>10}'
+                f'{encrypt_seconds * 1000:>12.3f}{throughput:>12.1f}{decrypt_seconds * 1000:>12.3f}'
+            )
+
+    def _time(self, func, iterations):
+        """平均每次耗时（秒）"""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - started) / iterations
@@ -0,0 +1,17 @@
+"""
+检查学校申请状态是否有变化，有变化时使学校缓存失效
+用法: python manage.py check_application_status
+（定时任务每天零点后执行一次）
+"""
+from django.core.management.base import BaseCommand
+from backend.utils.list_card import check_application_status_changes
+
+
+class Command(BaseCommand):
+    help = '检查申请状态是否有变化（有变化时递增缓存代数）'
+
+    def handle(self, *args, **options):
+        if check_application_status_changes():
+            self.stdout.write(self.style.SUCCESS('✓ 申请状态有变化，已清除学校缓存'))
+        else:
+            self.stdout.write('申请状态无变化')
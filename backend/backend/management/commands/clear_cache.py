@@ -26,12 +26,13 @@ class Command(BaseCommand):
             self.stdout.write('清除所有缓存...')
             from django.core.cache import cache
             cache.clear()
+            CacheManager.clear_local()
             self.stdout.write(self.style.SUCCESS('✓ 已清除所有缓存'))
         
         elif options['schools']:
             self.stdout.write('清除学校相关缓存...')
-            CacheManager.clear_school_cache()
-            self.stdout.write(self.style.SUCCESS('✓ 已清除学校缓存'))
+            generation = CacheManager.clear_school_cache()
+            self.stdout.write(self.style.SUCCESS(f'✓ 已清除学校缓存（缓存代数 -> {generation}）'))
         
         else:
             self.stdout.write(self.style.WARNING(
@@ -0,0 +1,22 @@
+"""
+重新生成学校列表卡片（list_card 列）、申请状态时间线（status_timeline 列）和小学升学信息顺序（promotion_order 列）
+用法: python manage.py rebuild_list_cards
+"""
+from django.core.management.base import BaseCommand
+from backend.utils.cache import CacheManager
+from backend.utils.list_card import refresh_all_list_cards
+
+
+class Command(BaseCommand):
+    help = '重新生成学校列表卡片（list_card 列）、申请状态时间线（status_timeline 列）和小学升学信息顺序（promotion_order 列）'
+
+    def handle(self, *args, **options):
+        self.stdout.write('重新生成列表卡片...')
+        primary_count, secondary_count = refresh_all_list_cards()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ 已更新列表卡片：小学 {primary_count} 条，中学 {secondary_count} 条'
+        ))
+        
+        if primary_count or secondary_count:
+            generation = CacheManager.clear_school_cache()
+            self.stdout.write(self.style.SUCCESS(f'✓ 已清除学校缓存（缓存代数 -> {generation}）'))
@@ -0,0 +1,55 @@
+"""
+更新搜索引擎公布的爬虫 IP 段（common/data/crawler_ip_ranges.json）
+用法: python manage.py update_crawler_ranges
+（各 worker 会在几分钟内自动重新加载，不需要重启）
+"""
+import json
+import os
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.utils.bot_verification import get_ranges_file
+
+
+class Command(BaseCommand):
+    help = '下载搜索引擎公布的爬虫IP段，更新本地白名单'
+
+    TIMEOUT = 15
+
+    def handle(self, *args, **options):
+        path = get_ranges_file()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            raise CommandError(f'读取 {path} 失败: {e}')
+
+        ranges = data.setdefault('ranges', {})
+        for name, url in (data.get('sources') or {}).items():
+            try:
+                with urllib.request.urlopen(url, timeout=self.TIMEOUT) as response:
+                    published = json.loads(response.read().decode('utf-8'))
+            except Exception as e:
+                # 下载失败时保留原有的网段
+                self.stdout.write(self.style.WARNING(f'✗ {name}: 下载失败，保留原有网段 ({e})'))
+                continue
+
+            prefixes = [
+                prefix.get('ipv4Prefix') or prefix.get('ipv6Prefix')
+                for prefix in published.get('prefixes') or []
+            ]
+            prefixes = [prefix for prefix in prefixes if prefix]
+            if not prefixes:
+                self.stdout.write(self.style.WARNING(f'✗ {name}: 没有网段，保留原有网段'))
+                continue
+            ranges[name] = prefixes
+            self.stdout.write(f'{name}: {len(prefixes)} 个网段')
+
+        # 先写临时文件再替换，避免 worker 读到写了一半的文件
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, path)
+        self.stdout.write(self.style.SUCCESS(f'✓ 已更新 {path}'))
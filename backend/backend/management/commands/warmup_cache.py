@@ -9,24 +9,24 @@
     python manage.py warmup_cache --stats      # 只预热统计信息
 """
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
 from django.db import close_old_connections
-from django.db.models import Q, F
 from backend.models.tb_primary_schools import TbPrimarySchools
 from backend.models.tb_secondary_schools import TbSecondarySchools
 from backend.api.schools.primary_views import (
-    serialize_primary_school,  # 用于详情页缓存
-    serialize_primary_school_for_list,  # 🔥 用于列表页缓存（精简版）
+    get_primary_detail_cache_key,  # 详情缓存与详情接口、批量接口共用同一个 key 和响应格式
+    build_primary_detail_response,
+    primary_snapshot,  # 🔥 用于列表页缓存（与 API 共用内存快照）
     get_cache_key_for_query,
     # get_primary_filters
 )
 from backend.api.schools.secondary_views import (
-    serialize_secondary_school_for_list,
-    serialize_secondary_school,
+    get_secondary_detail_cache_key,
+    build_secondary_detail_response,
+    secondary_snapshot,
     get_cache_key_for_secondary_query
 )
-from backend.utils.text_converter import normalize_keyword
 from backend.utils.cache import CacheManager
+from backend.utils.payload_response import PayloadResponse
 from common.logger import loginfo
 import json
 import time
@@ -264,70 +264,40 @@ class Command(BaseCommand):
                 if self.verbose:
                     self.stdout.write(f'  预热查询: {cache_params}')
                 
-                # 构建查询
-                queryset = TbPrimarySchools.objects.all()
-                
-                # 应用筛选条件
-                if cache_params.get('district'):
-                    queryset = queryset.filter(district=cache_params['district'])
-                if cache_params.get('school_net'):
-                    queryset = queryset.filter(school_net=cache_params['school_net'])
-                if cache_params.get('category'):
-                    queryset = queryset.filter(school_category=cache_params['category'])
-                if cache_params.get('gender'):
-                    queryset = queryset.filter(student_gender=cache_params['gender'])
-                if cache_params.get('religion'):
-                    queryset = queryset.filter(religion=cache_params['religion'])
-                if cache_params.get('teaching_language'):
-                    queryset = queryset.filter(teaching_language__icontains=cache_params['teaching_language'])
-                if cache_params.get('keyword'):
-                    keyword = cache_params['keyword']
-                    queryset = queryset.filter(
-                        Q(school_name__icontains=keyword) |
-                        Q(school_name_traditional__icontains=keyword) |
-                        Q(school_name_english__icontains=keyword) |
-                        Q(district__icontains=keyword) |
-                        Q(school_net__icontains=keyword)
-                    )
-                
-                # 应用排序逻辑 - 与 API 视图保持一致
-                # 按 band1_rate 降序，然后按 school_name 升序
-                queryset = queryset.order_by('-band1_rate', 'school_name')
+                # 🔥 使用与 API 视图相同的内存快照筛选、排序、分页
+                snapshot = primary_snapshot.get()
+                rows = snapshot.filter(
+                    equals={
+                        'school_category': cache_params.get('category'),
+                        'district': cache_params.get('district'),
+                        'school_net': cache_params.get('school_net'),
+                        'student_gender': cache_params.get('gender'),
+                        'religion': cache_params.get('religion'),
+                    },
+                    contains={'teaching_language': cache_params.get('teaching_language')},
+                    keyword=cache_params.get('keyword')
+                )
+                total = len(rows)
                 
                 # 分页
                 page = cache_params.get('page', 1)
                 page_size = cache_params.get('page_size', 20)
-                offset = (page - 1) * page_size
-                
-                # 先获取总数（在排序后）
-                total = queryset.count()
-                
-                # 获取数据
-                schools = list(queryset[offset:offset + page_size])
-                
-                # 🔥 使用列表页精简序列化函数（与API接口保持一致）
-                # 这样可以减少缓存大小，提升性能
-                schools_data = [serialize_primary_school_for_list(s) for s in schools]
+                schools_data = snapshot.page(rows, page, page_size)
                 
                 # 构建响应数据 - 与 API 返回格式完全一致
                 result = {
-                    "code": 200,
-                    "message": "成功",
-                    "success": True,
-                    "data": {
-                        'list': schools_data,
-                        'page': page,
-                        'pageSize': page_size,
-                        'total': total,
-                        'totalPages': (total + page_size - 1) // page_size
-                    }
+                    'list': schools_data,
+                    'total': total,
+                    'page': page,
+                    'pageSize': page_size,
+                    'totalPages': (total + page_size - 1) // page_size
                 }
                 
                 # 生成缓存键 - 使用与 API 完全一致的参数格式
                 cache_key = get_cache_key_for_query(cache_params)
                 
-                # 🔥 缓存数据（10分钟）- 与 API 接口保持一致
-                cache.set(cache_key, result, timeout=600)
+                # 🔥 缓存编码好的响应字节（10分钟软过期，1小时硬过期）- 与 API 接口保持一致
+                CacheManager.set_response(cache_key, PayloadResponse(result), timeout=3600, soft_timeout=600)
                 count += 1
                 
                 if self.verbose:
@@ -437,69 +407,39 @@ class Command(BaseCommand):
                 if self.verbose:
                     self.stdout.write(f'  预热查询: {cache_params}')
                 
-                # 构建查询
-                queryset = TbSecondarySchools.objects.all()
-                
-                # 应用筛选条件
-                if cache_params.get('district'):
-                    queryset = queryset.filter(district=cache_params['district'])
-                if cache_params.get('school_group'):
-                    queryset = queryset.filter(school_group=cache_params['school_group'])
-                if cache_params.get('category'):
-                    queryset = queryset.filter(school_category=cache_params['category'])
-                if cache_params.get('gender'):
-                    queryset = queryset.filter(student_gender=cache_params['gender'])
-                if cache_params.get('religion'):
-                    queryset = queryset.filter(religion=cache_params['religion'])
-                if cache_params.get('keyword'):
-                    keyword = cache_params['keyword']
-                    # 标准化关键词（与 API 视图保持一致）
-                    normalized_keyword = normalize_keyword(keyword)
-                    queryset = queryset.filter(
-                        Q(school_name__icontains=normalized_keyword) | 
-                        Q(school_name__icontains=keyword) |
-                        Q(school_name_traditional__icontains=normalized_keyword) |
-                        Q(school_name_traditional__icontains=keyword) |
-                        Q(school_name_english__icontains=keyword)
-                    )
-                
-                # 应用排序逻辑 - 与 API 视图保持一致
-                # 按 school_group 升序（NULL 值排在最后），然后按 school_name 升序
-                queryset = queryset.order_by(F('school_group').asc(nulls_last=True), 'school_name')
+                # 🔥 使用与 API 视图相同的内存快照筛选、排序、分页
+                snapshot = secondary_snapshot.get()
+                rows = snapshot.filter(
+                    equals={
+                        'school_category': cache_params.get('category'),
+                        'district': cache_params.get('district'),
+                        'school_group': cache_params.get('school_group'),
+                        'student_gender': cache_params.get('gender'),
+                        'religion': cache_params.get('religion'),
+                    },
+                    keyword=cache_params.get('keyword')
+                )
+                total = len(rows)
                 
                 # 分页
                 page = cache_params.get('page', 1)
                 page_size = cache_params.get('page_size', 20)
-                offset = (page - 1) * page_size
-                
-                # 先获取总数（在排序后）
-                total = queryset.count()
-                
-                # 获取数据
-                schools = list(queryset[offset:offset + page_size])
-                
-                # 序列化（列表页使用精简版本）
-                schools_data = [serialize_secondary_school_for_list(s) for s in schools]
+                schools_data = snapshot.page(rows, page, page_size)
                 
                 # 构建响应数据 - 与 API 返回格式完全一致
                 result = {
-                    "code": 200,
-                    "message": "成功",
-                    "success": True,
-                    "data": {
-                        'list': schools_data,
-                        'page': page,
-                        'pageSize': page_size,
-                        'total': total,
-                        'totalPages': (total + page_size - 1) // page_size
-                    }
+                    'list': schools_data,
+                    'total': total,
+                    'page': page,
+                    'pageSize': page_size,
+                    'totalPages': (total + page_size - 1) // page_size
                 }
                 
                 # 生成缓存键 - 使用与 API 完全一致的参数格式
                 cache_key = get_cache_key_for_secondary_query(cache_params)
                 
-                # 🔥 缓存数据（10分钟）- 与 API 接口保持一致
-                cache.set(cache_key, result, timeout=600)
+                # 🔥 缓存编码好的响应字节（10分钟软过期，1小时硬过期）- 与 API 接口保持一致
+                CacheManager.set_response(cache_key, PayloadResponse(result), timeout=3600, soft_timeout=600)
                 count += 1
                 
                 if self.verbose:
@@ -572,7 +512,7 @@ class Command(BaseCommand):
                 CacheManager.PREFIX_SCHOOL_STATS,
                 type='primary'
             )
-            cache.set(cache_key, primary_stats, timeout=3600)
+            CacheManager.set(cache_key, primary_stats, timeout=3600)
             count += 1
             
             if self.verbose:
@@ -588,7 +528,7 @@ class Command(BaseCommand):
                 CacheManager.PREFIX_SCHOOL_STATS,
                 type='secondary'
             )
-            cache.set(cache_key, secondary_stats, timeout=3600)
+            CacheManager.set(cache_key, secondary_stats, timeout=3600)
             count += 1
             
             if self.verbose:
@@ -612,9 +552,12 @@ class Command(BaseCommand):
                 
             for school in primary_schools:
                 try:
-                    cache_key = f"primary_school_detail:{school.id}"
-                    data = serialize_primary_school(school)
-                    cache.set(cache_key, data, timeout=86400) # 24小时
+                    # 与详情接口一致的 key、响应和过期时间（全量详情不进入 L1，避免挤掉热点数据）
+                    CacheManager.set_response(
+                        get_primary_detail_cache_key(school.id), build_primary_detail_response(school),
+                        timeout=CacheManager.DETAIL_RESPONSE_TIMEOUT, local=False,
+                        soft_timeout=CacheManager.DETAIL_RESPONSE_SOFT_TIMEOUT
+                    )
                     count += 1
                 except Exception as e:
                     if self.verbose:
@@ -633,9 +576,12 @@ class Command(BaseCommand):
                 
             for school in secondary_schools:
                 try:
-                    cache_key = f"secondary_school_detail:{school.id}"
-                    data = serialize_secondary_school(school)
-                    cache.set(cache_key, data, timeout=86400) # 24小时
+                    # 与详情接口一致的 key、响应和过期时间（全量详情不进入 L1，避免挤掉热点数据）
+                    CacheManager.set_response(
+                        get_secondary_detail_cache_key(school.id), build_secondary_detail_response(school),
+                        timeout=CacheManager.DETAIL_RESPONSE_TIMEOUT, local=False,
+                        soft_timeout=CacheManager.DETAIL_RESPONSE_SOFT_TIMEOUT
+                    )
                     count += 1
                 except Exception as e:
                     if self.verbose:
@@ -1,34 +1,32 @@
 """
 反爬虫中间件
 用于检测和阻止爬虫访问
+作为 SecurityPipelineMiddleware 的一个阶段执行
 """
 
+import time
+
 from django.http import JsonResponse
+from backend.middleware.SecurityPipelineMiddleware import SecurityStage
+from backend.utils import user_agent as user_agent_rules
+from backend.utils.heavy_hitters import HeavyHitterTracker
 from common.logger import loginfo
-import re
 
 
-class AntiCrawlerMiddleware:
+class AntiCrawlerMiddleware(SecurityStage):
     """
     反爬虫中间件
     
     检测常见爬虫的User-Agent和行为模式
     """
     
+    name = 'anti_crawler'
+    
     # 爬虫User-Agent黑名单（常见爬虫标识）
-    CRAWLER_USER_AGENTS = [
-        r'bot', r'crawl', r'spider', r'scrape', r'curl', r'wget',
-        r'python-requests', r'scrapy', r'httpclient', r'okhttp',
-        r'java/', r'go-http-client', r'axios', r'node-fetch',
-        r'headless', r'phantom', r'selenium', r'puppeteer',
-        r'mechanize', r'aiohttp', r'httpx', r'urllib'
-    ]
+    CRAWLER_USER_AGENTS = user_agent_rules.CRAWLER_USER_AGENTS
     
     # 白名单User-Agent（允许的爬虫，如搜索引擎）
-    WHITELIST_USER_AGENTS = [
-        r'Googlebot', r'Bingbot', r'Slurp', r'DuckDuckBot',
-        r'Baiduspider', r'YandexBot', r'Sogou', r'Exabot'
-    ]
+    WHITELIST_USER_AGENTS = user_agent_rules.WHITELIST_USER_AGENTS
     
     # 可疑行为模式
     SUSPICIOUS_PATTERNS = {
@@ -36,8 +34,21 @@ class AntiCrawlerMiddleware:
         'too_simple': 'User-Agent过于简单',
         'no_accept_header': '缺少Accept请求头',
         'no_accept_language': '缺少Accept-Language',
+        'heavy_hitter': '请求频率异常',
     }
     
+    # 高频客户端阈值（每个 worker 每分钟的请求数），None 表示只记录日志不拦截
+    # 设备ID可以伪造，轮换设备ID的爬虫会绕过 RateLimitMiddleware，但同一 IP 的总量仍会超过阈值；
+    # 同一个浏览器 User-Agent 会被大量正常用户共用，只用于观察
+    HEAVY_HITTER_WINDOW = 60
+    HEAVY_HITTER_THRESHOLDS = {
+        'ip': 600,
+        'device': 300,
+        'ua': None,
+    }
+    # 只记录日志的维度达到这个值时记一次日志（每个 key 每个统计窗口最多一次）
+    HEAVY_HITTER_LOG_THRESHOLD = 3000
+    
     # 白名单路径
     WHITELIST_PATHS = [
         '/nginx-health',
@@ -51,41 +62,26 @@ class AntiCrawlerMiddleware:
     # 检测模式：'strict'（严格）或 'moderate'（适中）
     DETECTION_MODE = 'moderate'
     
-    def __init__(self, get_response):
-        self.get_response = get_response
-        # 编译正则表达式以提高性能
-        self.crawler_patterns = [
-            re.compile(pattern, re.IGNORECASE) 
-            for pattern in self.CRAWLER_USER_AGENTS
-        ]
-        self.whitelist_patterns = [
-            re.compile(pattern, re.IGNORECASE)
-            for pattern in self.WHITELIST_USER_AGENTS
-        ]
+    def __init__(self):
+        # 固定内存的请求频率统计（Count-Min Sketch），客户端再多内存也不会增长
+        self.heavy_hitters = HeavyHitterTracker(window=self.HEAVY_HITTER_WINDOW)
+        # 当前窗口内已记过日志的 key（估计值不是逐次加一，不能用等于阈值来判断只记一次）
+        self._logged_window = None
+        self._logged_keys = set()
     
-    def __call__(self, request):
-        # 检查是否启用反爬虫
-        if not self.ENABLE_ANTI_CRAWLER:
-            return self.get_response(request)
-        
-        # 检查路径是否在白名单中
-        path = request.path
-        for whitelist_path in self.WHITELIST_PATHS:
-            if path.startswith(whitelist_path):
-                return self.get_response(request)
-        
+    def is_enabled(self):
+        return self.ENABLE_ANTI_CRAWLER
+    
+    def process_request(self, request, context):
         # 检测爬虫
-        is_crawler, reason = self._detect_crawler(request)
+        is_crawler, reason = self._detect_crawler(request, context)
         
         if is_crawler:
-            client_ip = self._get_client_ip(request)
-            user_agent = request.META.get('HTTP_USER_AGENT', 'unknown')
-            
             loginfo(
                 f"检测到爬虫访问: {reason}, "
-                f"IP: {client_ip}, "
-                f"User-Agent: {user_agent}, "
-                f"Path: {path}"
+                f"IP: {context.client_ip}, "
+                f"User-Agent: {context.user_agent or 'unknown'}, "
+                f"Path: {context.path}"
             )
             
             return JsonResponse({
@@ -95,27 +91,26 @@ class AntiCrawlerMiddleware:
                 'data': None
             }, status=403)
         
-        # 继续处理请求
-        return self.get_response(request)
+        return None
     
-    def _detect_crawler(self, request):
+    def _detect_crawler(self, request, context):
         """
         检测是否为爬虫
         
         Returns:
             (is_crawler, reason)
         """
-        user_agent = request.META.get('HTTP_USER_AGENT', '')
+        user_agent = context.user_agent
+        # UA 识别结果按 UA 缓存，并挂在 request 上供后续阶段复用
+        verdict = context.ua_verdict
         
         # 1. 检查是否在白名单中（允许的爬虫）
-        for pattern in self.whitelist_patterns:
-            if pattern.search(user_agent):
-                return False, None
+        if verdict.whitelist:
+            return False, None
         
         # 2. 检查User-Agent黑名单
-        for pattern in self.crawler_patterns:
-            if pattern.search(user_agent):
-                return True, f"匹配爬虫特征: {pattern.pattern}"
+        if verdict.crawler:
+            return True, f"匹配爬虫特征: {verdict.crawler}"
         
         # 3. 检查可疑行为（仅在严格模式下）
         if self.DETECTION_MODE == 'strict':
@@ -135,17 +130,42 @@ class AntiCrawlerMiddleware:
             if not request.META.get('HTTP_ACCEPT_LANGUAGE'):
                 return True, self.SUSPICIOUS_PATTERNS['no_accept_language']
         
-        # 4. 检查请求频率模式（如果需要更复杂的检测）
-        # 这里可以添加更多的启发式检测规则
+        # 4. 检查请求频率模式：按 IP / 设备ID / User-Agent 统计，识别高频客户端
+        return self._detect_heavy_hitter(context)
+    
+    def _detect_heavy_hitter(self, context):
+        """
+        高频客户端检测
+        
+        Returns:
+            (is_crawler, reason)
+        """
+        keys = {'ip': context.client_ip}
+        if context.device_id:
+            keys['device'] = context.device_id
+        if context.user_agent:
+            keys['ua'] = context.user_agent
+        
+        for dimension, value in keys.items():
+            key = f"{dimension}:{value}"
+            count = self.heavy_hitters.add(key)
+            threshold = self.HEAVY_HITTER_THRESHOLDS.get(dimension)
+            if threshold is None:
+                if count >= self.HEAVY_HITTER_LOG_THRESHOLD and self._mark_logged(key):
+                    loginfo(f"高频客户端（仅记录）: {dimension}={value}, 最近{self.HEAVY_HITTER_WINDOW}秒约{count}次请求")
+                continue
+            if count > threshold:
+                return True, f"{self.SUSPICIOUS_PATTERNS['heavy_hitter']}: {dimension}, 最近{self.HEAVY_HITTER_WINDOW}秒约{count}次请求"
         
         return False, None
     
-    def _get_client_ip(self, request):
-        """获取客户端IP"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0].strip()
-        else:
-            ip = request.META.get('REMOTE_ADDR', 'unknown')
-        return ip
-
+    def _mark_logged(self, key):
+        """记录 key 在当前窗口已记过日志，本窗口内第一次调用返回 True"""
+        window = int(time.time() // self.HEAVY_HITTER_WINDOW)
+        if window != self._logged_window:
+            self._logged_window = window
+            self._logged_keys = set()
+        if key in self._logged_keys:
+            return False
+        self._logged_keys.add(key)
+        return True
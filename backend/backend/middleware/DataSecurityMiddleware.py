@@ -1,18 +1,27 @@
 """
 数据安全中间件
 负责API响应数据的加密，实现"双模响应"
+作为 SecurityPipelineMiddleware 的最后一个阶段执行（最先处理视图返回的响应）
 """
 
-from django.http import JsonResponse, HttpResponse
+from django.utils.cache import patch_vary_headers
+from backend.middleware.SecurityPipelineMiddleware import SecurityStage
 from utils.data_encryptor import DataEncryptor
+from backend.utils.cache import CacheManager
+from backend.utils.payload_response import PayloadResponse
 from common.logger import loginfo, logerror
 import json
 
-class DataSecurityMiddleware:
+class DataSecurityMiddleware(SecurityStage):
     """
     数据安全中间件
     """
     
+    name = 'data_security'
+    
+    # 需要加密的路径标签
+    ENCRYPT_TAG = 'encrypt'
+    
     # 需要加密的路径前缀
     ENCRYPT_PATHS = [
         '/api/schools/',
@@ -21,72 +30,70 @@ class DataSecurityMiddleware:
     ]
     
     ENABLE_ENCRYPTION = True
+    
+    # 客户端通过 Accept 选择加密格式（见 DataEncryptor）：
+    # - BINARY_CONTENT_TYPE：二进制传输（v2），整个响应体加密，不经过 base64
+    # - GCM_JSON_CONTENT_TYPE：JSON 格式 v2（AES-GCM）
+    # - 其他：JSON 格式，版本为 DataEncryptor.get_default_version()
+    BINARY_CONTENT_TYPE = 'application/vnd.eca.encrypted'
+    GCM_JSON_CONTENT_TYPE = 'application/vnd.eca.encrypted+json'
+    
+    # 加密结果缓存：视图命中/写入响应缓存时会在响应上标记 cache_key，
+    # 同一份上游缓存 + 同一个密钥版本的加密结果可以直接复用，跳过 JSON 解析和 AES 加密
+    # 注意：复用意味着同一份数据在缓存有效期内使用同一个 IV
+    # （GCM 只是原样重发同一份密文，明文变化时 etag 随之变化，不会出现同一个 nonce 加密不同明文）
+    ENCRYPTED_CACHE_PREFIX = "enc:"
+    ENCRYPTED_CACHE_TIMEOUT = 600
 
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        response = self.get_response(request)
-        
+    def is_enabled(self):
         # 1. 全局开关检查
-        if not self.ENABLE_ENCRYPTION:
+        return self.ENABLE_ENCRYPTION
+    
+    def path_rules(self):
+        return [(path, self.ENCRYPT_TAG) for path in self.ENCRYPT_PATHS]
+
+    def process_response(self, request, context, response):
+        # 2. 检查路径
+        if self.ENCRYPT_TAG not in context.tags:
             return response
             
-        # 2. 检查是否为 JSON 响应
+        # 3. 检查是否为 JSON 响应
         content_type = response.get('Content-Type', '')
         if 'application/json' not in content_type:
             return response
             
-        # 3. 检查路径
-        if not any(request.path.startswith(p) for p in self.ENCRYPT_PATHS):
-            return response
-            
         # 4. SEO白名单检查
-        is_seo = getattr(request, 'is_verified_seo_bot', False)
-        if is_seo:
+        if context.is_verified_seo_bot:
             loginfo(f"SEO Bot访问，跳过加密: {request.path}")
             return response
             
-        # 5. 加密数据
+        # 5. 加密格式协商 + 加密结果缓存
+        version, binary = self._negotiate(request)
+        encrypted_cache_key = self._get_encrypted_cache_key(response, version, binary)
+        if encrypted_cache_key:
+            cached_content = CacheManager.get(encrypted_cache_key)
+            CacheManager.record_hit('enc', cached_content is not None)
+            if cached_content is not None:
+                return self._build_encrypted_response(response, cached_content, binary)
+        
+        # 6. 加密数据
         try:
-            if hasattr(response, 'render') and callable(response.render):
-                 response.render()
-                 
-            original_content = response.content.decode('utf-8')
-            json_data = json.loads(original_content)
-            
-            # 检查是否有 data 字段
-            if isinstance(json_data, dict) and 'data' in json_data:
-                if json_data['data'] is not None:
-                    # 执行加密
-                    encrypted_result = DataEncryptor.encrypt_data(json_data['data'])
-                    
-                    # 检查加密结果
-                    if not isinstance(encrypted_result, dict) or not encrypted_result.get('encrypted'):
-                        logerror(f"加密失败，返回了原始数据: {request.path}")
-                        return response
-
-                    json_data['data'] = encrypted_result
-                    
-                    # 重建响应
-                    new_content = json.dumps(json_data).encode('utf-8')
-                    new_response = HttpResponse(
-                        new_content, 
-                        content_type='application/json',
-                        status=response.status_code
-                    )
-                    
-                    # 复制原响应头
-                    for k, v in response.items():
-                        if k not in ['Content-Length', 'Content-Type']:
-                            new_response[k] = v
-                            
-                    # 添加调试头 (生产环境可移除)
-                    new_response['X-Encryption-Status'] = 'Encrypted'
-                    return new_response
+            if isinstance(response, PayloadResponse):
+                # 视图返回的 PayloadResponse 记录了 data 的字节区间，直接加密这段字节，不解析 JSON
+                new_content = self._encrypt_payload(request, response, version, binary)
             else:
-                # 响应格式不符合预期（没有data字段），不加密
-                pass
+                new_content = self._encrypt_json(request, response, version, binary)
+            if new_content is None:
+                return response
+            
+            if encrypted_cache_key:
+                CacheManager.set(
+                    encrypted_cache_key,
+                    new_content,
+                    self._get_encrypted_cache_timeout(response)
+                )
+            
+            return self._build_encrypted_response(response, new_content, binary)
                     
         except Exception as e:
             logerror(f"数据加密异常: {str(e)} Path: {request.path}")
@@ -94,3 +101,106 @@ class DataSecurityMiddleware:
             response['X-Encryption-Error'] = str(e)[:100]
             
         return response
+    
+    def _negotiate(self, request):
+        """根据 Accept 选择加密格式，返回 (版本, 是否二进制传输)"""
+        accept = request.META.get('HTTP_ACCEPT', '')
+        if self.BINARY_CONTENT_TYPE in accept:
+            media_types = {item.split(';', 1)[0].strip() for item in accept.split(',')}
+            if self.BINARY_CONTENT_TYPE in media_types:
+                return DataEncryptor.VERSION_GCM, True
+            if self.GCM_JSON_CONTENT_TYPE in media_types:
+                return DataEncryptor.VERSION_GCM, False
+        return DataEncryptor.get_default_version(), False
+    
+    def _encrypt_binary(self, request, content):
+        encrypted_content = DataEncryptor.encrypt_binary(content)
+        if encrypted_content is None:
+            logerror(f"加密失败，返回了原始数据: {request.path}")
+        return encrypted_content
+    
+    def _encrypt_payload(self, request, response, version, binary):
+        """加密 PayloadResponse 的 data 字节并拼回原位置，返回新的响应字节；data 为空时返回 None"""
+        data_bytes = response.data_bytes
+        if data_bytes == b'null':
+            return None
+        
+        if binary:
+            # 二进制传输加密整个响应体，客户端解密后得到与未加密时相同的 JSON
+            return self._encrypt_binary(request, response.content)
+        
+        encrypted_result = DataEncryptor.encrypt_bytes(data_bytes, version)
+        if not encrypted_result:
+            logerror(f"加密失败，返回了原始数据: {request.path}")
+            return None
+        
+        # data 在最后，外层字节保持不变
+        content = response.content
+        start, end = response.data_span
+        return content[:start] + json.dumps(encrypted_result).encode('utf-8') + content[end:]
+    
+    def _encrypt_json(self, request, response, version, binary):
+        """加密普通 JsonResponse：解析响应、加密 data 后重新编码，返回新的响应字节；不需要加密时返回 None"""
+        if hasattr(response, 'render') and callable(response.render):
+             response.render()
+             
+        original_content = response.content.decode('utf-8')
+        json_data = json.loads(original_content)
+        
+        # 检查是否有 data 字段，响应格式不符合预期（没有data字段）时不加密
+        if not isinstance(json_data, dict) or json_data.get('data') is None:
+            return None
+        
+        if binary:
+            return self._encrypt_binary(request, response.content)
+        
+        # 执行加密
+        encrypted_result = DataEncryptor.encrypt_data(json_data['data'], version)
+        
+        # 检查加密结果
+        if not isinstance(encrypted_result, dict) or not encrypted_result.get('encrypted'):
+            logerror(f"加密失败，返回了原始数据: {request.path}")
+            return None
+
+        json_data['data'] = encrypted_result
+        
+        # 重建响应
+        return json.dumps(json_data).encode('utf-8')
+    
+    def _get_encrypted_cache_key(self, response, version, binary):
+        """
+        根据上游缓存 key、响应体 etag、密钥版本和加密格式生成加密结果的缓存 key，响应未经缓存时返回 None
+        上游缓存在后台刷新后 key 不变但 etag 会变，旧的加密结果不会被误用
+        """
+        cache_key = getattr(response, 'cache_key', None)
+        if not cache_key or response.status_code != 200:
+            return None
+        etag = getattr(response, 'cache_etag', None) or ''
+        encryption_format = f"v{version}{'b' if binary else ''}"
+        return f"{self.ENCRYPTED_CACHE_PREFIX}{DataEncryptor.get_key_version()}:{encryption_format}:{cache_key}:{etag}"
+    
+    def _get_encrypted_cache_timeout(self, response):
+        """加密结果的缓存时间不超过上游缓存"""
+        timeout = getattr(response, 'cache_timeout', None)
+        if timeout is None:
+            return self.ENCRYPTED_CACHE_TIMEOUT
+        return min(timeout, self.ENCRYPTED_CACHE_TIMEOUT)
+    
+    def _build_encrypted_response(self, response, content, binary=False):
+        """把响应内容替换为加密后的内容（直接修改原响应，二进制传输时只改 Content-Type）"""
+        response.content = content
+        if binary:
+            response['Content-Type'] = self.BINARY_CONTENT_TYPE
+            if isinstance(response, PayloadResponse):
+                response.data_span = None
+        elif isinstance(response, PayloadResponse):
+            # 外层字节不变，data 仍在最后
+            response.data_span = (response.data_span[0], len(content) - 1)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(content))
+        # 同一个 URL 按 Accept 返回不同格式
+        patch_vary_headers(response, ('Accept',))
+                
+        # 添加调试头 (生产环境可移除)
+        response['X-Encryption-Status'] = 'Encrypted'
+        return response
@@ -1,20 +1,25 @@
 """
 频率限制中间件
 用于防止恶意爬虫和DDoS攻击
+计数存放在 Redis（见 backend/utils/rate_limit.py），多个 worker / 节点共享同一个限制
+作为 SecurityPipelineMiddleware 的第一个阶段执行
 """
 
 from django.http import JsonResponse
-from utils.crypto_utils import rate_limiter
+from backend.middleware.SecurityPipelineMiddleware import SecurityStage
+from backend.utils.rate_limit import rate_limiter
 from common.logger import loginfo
 
 
-class RateLimitMiddleware:
+class RateLimitMiddleware(SecurityStage):
     """
     频率限制中间件
     
     限制单个客户端在指定时间窗口内的请求次数
     """
     
+    name = 'rate_limit'
+    
     # 白名单路径（不受频率限制）
     WHITELIST_PATHS = [
         '/nginx-health',
@@ -24,28 +29,18 @@ class RateLimitMiddleware:
     # 是否启用频率限制
     ENABLE_RATE_LIMIT = True  # 设置为False可临时禁用频率限制
     
-    def __init__(self, get_response):
-        self.get_response = get_response
+    def is_enabled(self):
+        return self.ENABLE_RATE_LIMIT
     
-    def __call__(self, request):
-        # 检查是否启用频率限制
-        if not self.ENABLE_RATE_LIMIT:
-            return self.get_response(request)
-        
-        # 检查路径是否在白名单中
-        path = request.path
-        for whitelist_path in self.WHITELIST_PATHS:
-            if path.startswith(whitelist_path):
-                return self.get_response(request)
-        
-        # 获取客户端标识
-        client_id = self._get_client_identifier(request)
+    def process_request(self, request, context):
+        # 获取客户端标识（优先级：Device-ID > IP）
+        client_id = context.client_id
         
-        # 检查频率限制
-        is_allowed, error_msg = rate_limiter.is_allowed(client_id)
+        # 检查频率限制（一次 Redis 调用，同时返回剩余次数）
+        is_allowed, error_msg, remaining = rate_limiter.check(client_id)
         
         if not is_allowed:
-            loginfo(f"频率限制触发: {error_msg}, Client: {client_id}, Path: {path}")
+            loginfo(f"频率限制触发: {error_msg}, Client: {client_id}, Path: {context.path}")
             
             # 返回429 Too Many Requests
             response = JsonResponse({
@@ -62,42 +57,13 @@ class RateLimitMiddleware:
             
             return response
         
-        # 继续处理请求
-        response = self.get_response(request)
-        
+        context.rate_limit_remaining = remaining
+        return None
+    
+    def process_response(self, request, context, response):
         # 添加Rate Limit信息到响应头
-        remaining = rate_limiter.get_remaining_requests(client_id)
         response['X-RateLimit-Limit'] = str(rate_limiter.max_requests)
-        response['X-RateLimit-Remaining'] = str(remaining)
+        response['X-RateLimit-Remaining'] = str(context.rate_limit_remaining)
         response['X-RateLimit-Reset'] = str(rate_limiter.time_window)
         
         return response
-    
-    def _get_client_identifier(self, request):
-        """
-        获取客户端唯一标识
-        
-        优先级：Device-ID > IP
-        """
-        # 尝试从请求头获取设备ID
-        device_id = (
-            request.META.get('HTTP_X_DEVICE_ID') or
-            request.META.get('HTTP_X_DEVICE_FINGERPRINT')
-        )
-        
-        if device_id:
-            return f"device:{device_id}"
-        
-        # 使用IP作为标识
-        ip = self._get_client_ip(request)
-        return f"ip:{ip}"
-    
-    def _get_client_ip(self, request):
-        """获取客户端IP"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0].strip()
-        else:
-            ip = request.META.get('REMOTE_ADDR', 'unknown')
-        return ip
-
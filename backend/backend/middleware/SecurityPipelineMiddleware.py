@@ -0,0 +1,106 @@
+"""
+安全中间件流水线
+频率限制、反爬虫、动态Token、数据加密按顺序作为同一个中间件的各个阶段执行：
+请求信息（IP、设备ID、User-Agent、路径标签）只解析一次，见 backend/utils/request_context.py
+"""
+
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from backend.utils.request_context import PathTagTrie, RequestContext
+
+
+class SecurityStage:
+    """
+    安全流水线的一个阶段
+
+    子类按需实现：
+    - process_request(request, context)：返回响应则直接结束（后面的阶段和视图都不执行）
+    - process_response(request, context, response)：返回处理后的响应
+    - path_rules()：声明路径前缀对应的标签，默认把 WHITELIST_PATHS 标记为跳过本阶段
+    """
+
+    # 阶段名（用于路径标签 skip:<name>）
+    name = None
+
+    # 白名单路径（跳过本阶段）
+    WHITELIST_PATHS = []
+
+    def is_enabled(self):
+        return True
+
+    @property
+    def skip_tag(self):
+        return f"skip:{self.name}"
+
+    def path_rules(self):
+        return [(path, self.skip_tag) for path in self.WHITELIST_PATHS]
+
+    def process_request(self, request, context):
+        return None
+
+    def process_response(self, request, context, response):
+        return response
+
+
+class SecurityPipelineMiddleware:
+    """
+    安全中间件流水线
+
+    与原来几个中间件依次嵌套的行为一致：
+    - 阶段按 STAGES 顺序执行 process_request，某个阶段返回响应时直接返回该响应
+    - 已执行过 process_request 的阶段按相反顺序执行 process_response
+    """
+
+    # 阶段（按顺序执行），可通过 settings.SECURITY_PIPELINE_STAGES 覆盖
+    STAGES = [
+        'backend.middleware.RateLimitMiddleware.RateLimitMiddleware',  # 频率限制（最先执行，快速拒绝）
+        'backend.middleware.AntiCrawlerMiddleware.AntiCrawlerMiddleware',  # 反爬虫检测
+        'backend.middleware.DynamicTokenMiddleware.DynamicTokenMiddleware',  # 动态Token + SEO验证
+        'backend.middleware.DataSecurityMiddleware.DataSecurityMiddleware',  # 数据加密（双模响应）
+    ]
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # 在响应头 X-Security-Time 中返回流水线自身的耗时（不含视图），调试用：
+        # 默认只在 DEBUG 下开启，可通过 settings.SECURITY_TIMING_HEADER 覆盖
+        self.enable_timing_header = getattr(settings, 'SECURITY_TIMING_HEADER', settings.DEBUG)
+        self.stages = [
+            import_string(path)()
+            for path in getattr(settings, 'SECURITY_PIPELINE_STAGES', self.STAGES)
+        ]
+        # 所有阶段的路径规则编译成一棵前缀树，每个请求只匹配一次
+        self.path_trie = PathTagTrie(
+            rule for stage in self.stages for rule in stage.path_rules()
+        )
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        context = RequestContext(request, self.path_trie)
+        request.security_context = context
+
+        executed = []
+        response = None
+        for stage in self.stages:
+            if not stage.is_enabled() or stage.skip_tag in context.tags:
+                continue
+            response = stage.process_request(request, context)
+            if response is not None:
+                break
+            executed.append(stage)
+
+        view_elapsed = 0.0
+        if response is None:
+            view_started = time.perf_counter()
+            response = self.get_response(request)
+            view_elapsed = time.perf_counter() - view_started
+
+        for stage in reversed(executed):
+            response = stage.process_response(request, context, response)
+
+        if self.enable_timing_header:
+            elapsed = time.perf_counter() - started - view_elapsed
+            response['X-Security-Time'] = f'{elapsed * 1000:.3f}ms'
+        return response
@@ -5,6 +5,8 @@
 
 from django.http import JsonResponse
 from utils.crypto_utils import signature_validator
+from backend.utils import user_agent as user_agent_rules
+from backend.utils.user_agent import classify_request
 from common.logger import loginfo
 import json
 
@@ -27,16 +29,7 @@ class SignatureMiddleware:
     ]
     
     # 搜索引擎爬虫白名单（允许无签名访问）
-    SEARCH_ENGINE_USER_AGENTS = [
-        'Googlebot',
-        'Bingbot',
-        'Slurp',  # Yahoo
-        'DuckDuckBot',
-        'Baiduspider',
-        'YandexBot',
-        'Sogou',
-        'Exabot',
-    ]
+    SEARCH_ENGINE_USER_AGENTS = user_agent_rules.WHITELIST_USER_AGENTS
     
     # 是否启用签名验证
     ENABLE_SIGNATURE_CHECK = True  # 设置为False可临时禁用签名验证
@@ -129,14 +122,8 @@ class SignatureMiddleware:
         Returns:
             bool: True表示是搜索引擎爬虫
         """
-        user_agent = request.META.get('HTTP_USER_AGENT', '')
-        
-        # 检查User-Agent是否包含搜索引擎标识
-        for bot in self.SEARCH_ENGINE_USER_AGENTS:
-            if bot.lower() in user_agent.lower():
-                return True
-        
-        return False
+        # 检查User-Agent是否包含搜索引擎标识（复用本请求已有的识别结果）
+        return bool(classify_request(request).whitelist)
     
     def _get_client_ip(self, request):
         """获取客户端IP"""
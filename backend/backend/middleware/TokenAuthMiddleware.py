@@ -5,6 +5,8 @@ Token认证中间件
 
 from django.http import JsonResponse
 from utils.jwt_utils import verify_token, token_manager
+from backend.utils import user_agent as user_agent_rules
+from backend.utils.user_agent import classify_request
 from common.logger import loginfo
 
 
@@ -25,16 +27,7 @@ class TokenAuthMiddleware:
     ]
     
     # 搜索引擎爬虫白名单（允许无Token访问，支持SEO）
-    SEARCH_ENGINE_USER_AGENTS = [
-        'Googlebot',
-        'Bingbot',
-        'Slurp',  # Yahoo
-        'DuckDuckBot',
-        'Baiduspider',
-        'YandexBot',
-        'Sogou',
-        'Exabot',
-    ]
+    SEARCH_ENGINE_USER_AGENTS = user_agent_rules.WHITELIST_USER_AGENTS
     
     # 是否启用Token认证
     ENABLE_TOKEN_AUTH = True  # 设置为False可临时禁用
@@ -123,14 +116,8 @@ class TokenAuthMiddleware:
         Returns:
             bool: True表示是搜索引擎爬虫
         """
-        user_agent = request.META.get('HTTP_USER_AGENT', '')
-        
-        # 检查User-Agent是否包含搜索引擎标识
-        for bot in self.SEARCH_ENGINE_USER_AGENTS:
-            if bot.lower() in user_agent.lower():
-                return True
-        
-        return False
+        # 检查User-Agent是否包含搜索引擎标识（复用本请求已有的识别结果）
+        return bool(classify_request(request).whitelist)
     
     def _get_client_ip(self, request):
         """获取客户端IP"""
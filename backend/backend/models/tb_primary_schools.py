@@ -1,5 +1,9 @@
 from django.db import models
 from .base import Base
+from backend.utils.list_card import (
+    build_primary_list_card, build_primary_status_timeline, build_primary_transfer_status, pack_list_card
+)
+from backend.utils.promotion_order import build_promotion_order
 
 
 class TbPrimarySchools(models.Model, Base):
@@ -374,6 +378,39 @@ class TbPrimarySchools(models.Model, Base):
         help_text='升学信息'
     )
     
+    # 升学信息的显示顺序（MySQL JSON 不保留键的顺序，写入时排好存成数组，见 backend/utils/promotion_order.py）
+    promotion_order = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name='升学信息顺序',
+        help_text='yearly_stats 按年份降序、各年 schools 按 Band 排序后的键顺序，由 save() 和数据导入脚本生成'
+    )
+    
+    # 列表卡片（写入时预计算，见 backend/utils/list_card.py）
+    list_card = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name='列表卡片',
+        help_text='列表页卡片数据（不含申请状态），由 save() 和数据导入脚本生成'
+    )
+    
+    # 申请状态时间线（写入时由 transfer_info 编译，见 backend/utils/status_timeline.py）
+    status_timeline = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name='申请状态时间线',
+        help_text='各申请类型的状态变化日期，由 save() 和数据导入脚本生成'
+    )
+    
+    # 当天的申请状态（冗余列，带索引，用于统计；由 save()、数据导入脚本和每日申请状态检查维护）
+    application_status = models.CharField(
+        max_length=20,
+        blank=True,
+        null=True,
+        verbose_name='申请状态',
+        help_text='open / deadline / closed（UTC+8 当天），与列表卡片顶层的 application_status 一致'
+    )
+    
     # 系统字段
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -400,8 +437,25 @@ class TbPrimarySchools(models.Model, Base):
             models.Index(fields=['student_gender'], name='idx_pri_gender'),
             models.Index(fields=['religion'], name='idx_pri_religion'),
             models.Index(fields=['teaching_language'], name='idx_pri_teaching_lang'),
+            models.Index(fields=['application_status'], name='idx_pri_app_status'),
         ]
     
+    def save(self, *args, **kwargs):
+        # 写入时重新生成预计算列：列表卡片、申请状态、升学信息顺序（卡片包含 id，新建的行在插入后再补写）
+        creating = self.pk is None
+        self.status_timeline = build_primary_status_timeline(self)
+        self.application_status = build_primary_transfer_status(self).get('application_status')
+        self.promotion_order = build_promotion_order(self.promotion_info)
+        if not creating:
+            self.list_card = pack_list_card(build_primary_list_card(self))
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'list_card', 'status_timeline', 'promotion_order', 'application_status'}
+        super().save(*args, **kwargs)
+        if creating:
+            self.list_card = pack_list_card(build_primary_list_card(self))
+            type(self).objects.filter(pk=self.pk).update(list_card=self.list_card)
+    
     def __str__(self):
         return f"{self.school_name} ({self.district})"
     
@@ -6,6 +6,7 @@
 1. 每天凌晨 3:00 预热所有缓存
 2. 每天上午 8:00 再次预热（上班高峰期前）
 3. 每隔 2 小时预热筛选选项和统计信息
+4. 每天 0:01 检查申请状态是否变化（有变化才清除学校缓存）
 """
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -84,6 +85,30 @@ class CacheScheduler:
             misfire_grace_time=600
         )
         loginfo("已添加定时任务: 每天凌晨5:00全量预热(含详情)")
+        
+        # 任务6: 每天 0:01（UTC+8）检查申请状态，状态按日期变化，有变化时才使缓存失效
+        self.scheduler.add_job(
+            func=self._check_application_status,
+            trigger=CronTrigger(hour=0, minute=1, timezone='Asia/Shanghai'),
+            id='application_status_daily',
+            name='申请状态检查(每天0:01)',
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=600
+        )
+        loginfo("已添加定时任务: 每天0:01检查申请状态变化")
+        
+        # 每周一凌晨4点（UTC+8）更新搜索引擎爬虫IP段
+        self.scheduler.add_job(
+            func=self._update_crawler_ranges,
+            trigger=CronTrigger(day_of_week='mon', hour=4, minute=0, timezone='Asia/Shanghai'),
+            id='crawler_ranges_weekly',
+            name='爬虫IP段更新(每周一4:00)',
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=3600
+        )
+        loginfo("已添加定时任务: 每周一4:00更新爬虫IP段")
     
     def _warmup_all_cache(self):
         """完整预热所有缓存"""
@@ -143,6 +168,30 @@ class CacheScheduler:
         except Exception as e:
             logerror(f"全量预热失败: {str(e)}")
     
+    def _check_application_status(self):
+        """检查申请状态变化"""
+        try:
+            start_time = time.time()
+            loginfo("开始检查申请状态...")
+            
+            call_command('check_application_status')
+            
+            elapsed = time.time() - start_time
+            loginfo(f"申请状态检查完成，耗时: {elapsed:.2f}秒")
+            
+        except Exception as e:
+            logerror(f"申请状态检查失败: {str(e)}")
+    
+    def _update_crawler_ranges(self):
+        """更新搜索引擎爬虫IP段"""
+        try:
+            loginfo("开始更新爬虫IP段...")
+            call_command('update_crawler_ranges')
+            loginfo("爬虫IP段更新完成")
+            
+        except Exception as e:
+            logerror(f"爬虫IP段更新失败: {str(e)}")
+    
     def start(self):
         """启动调度器"""
         if not self.scheduler.running:
@@ -0,0 +1,41 @@
+"""
+MemoryNonceStore 测试
+用法: python -m unittest backend.tests.test_nonce_store
+"""
+import unittest
+from unittest import mock
+
+from backend.utils.nonce_store import MemoryNonceStore
+
+
+class MemoryNonceStoreTest(unittest.TestCase):
+
+    def _store_at(self, clock):
+        patcher = mock.patch('backend.utils.nonce_store.time.time', side_effect=lambda: clock[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return MemoryNonceStore(max_ttl=660, bucket_seconds=10)
+
+    def test_replay_just_before_ttl_is_rejected(self):
+        clock = [1005.0]
+        store = self._store_at(clock)
+        self.assertTrue(store.add('k', 300))
+
+        # 到期前重放（到期时间 1305 与桶边界不对齐）
+        clock[0] = 1300.0
+        self.assertFalse(store.add('k', 300))
+        clock[0] = 1304.9
+        self.assertFalse(store.add('k', 300))
+
+    def test_expired_nonce_is_forgotten(self):
+        clock = [1005.0]
+        store = self._store_at(clock)
+        self.assertTrue(store.add('k', 300))
+
+        # 到期后最多再保留一个桶的时间
+        clock[0] = 1005.0 + 300 + store.bucket_seconds
+        self.assertTrue(store.add('k', 300))
+
+
+if __name__ == '__main__':
+    unittest.main()
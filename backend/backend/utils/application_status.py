@@ -149,7 +149,7 @@ def parse_month_from_text(text: str) -> Optional[int]:
     return None
 
 
-def calculate_s1_p1_status(p1_info: Dict[str, Any]) -> Optional[str]:
+def calculate_s1_p1_status(p1_info: Dict[str, Any], today: Optional[date] = None) -> Optional[str]:
     """
     计算小一/S1申请状态
     
@@ -158,12 +158,15 @@ def calculate_s1_p1_status(p1_info: Dict[str, Any]) -> Optional[str]:
     - S1: 入学申请开始时间, 入学申请截至时间, 入学申请截止时间
     
     返回: 'open', 'closed', 'deadline' 或 None
+    
+    Args:
+        today: 按哪一天计算（默认 UTC+8 的今天，编译状态时间线时会传入其他日期）
     """
     if not p1_info or not isinstance(p1_info, dict):
         return None
     
-    now = get_utc8_now()
-    today = now.date()
+    if today is None:
+        today = get_utc8_now().date()
     
     # 获取开始和截止时间（兼容小一和S1的字段名）
     start_str = p1_info.get('小一入学申请开始时间') or p1_info.get('入学申请开始时间')
@@ -210,7 +213,8 @@ def calculate_s1_p1_status(p1_info: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def calculate_transfer_status(transfer_info: Dict[str, Any], debug_school_id: Optional[int] = None) -> Optional[str]:
+def calculate_transfer_status(transfer_info: Dict[str, Any], debug_school_id: Optional[int] = None,
+                              today: Optional[date] = None) -> Optional[str]:
     """
     计算插班申请状态
     
@@ -219,12 +223,13 @@ def calculate_transfer_status(transfer_info: Dict[str, Any], debug_school_id: Op
     Args:
         transfer_info: 插班信息字典
         debug_school_id: 调试用的学校ID（可选）
+        today: 按哪一天计算（默认 UTC+8 的今天，编译状态时间线时会传入其他日期）
     """
     if not transfer_info or not isinstance(transfer_info, dict):
         return None
     
-    now = get_utc8_now()
-    today = now.date()
+    if today is None:
+        today = get_utc8_now().date()
     
     # 检查是否明确标记为"未开放"
     start1_str = transfer_info.get('插班申请开始时间1')
@@ -277,12 +282,12 @@ def calculate_transfer_status(transfer_info: Dict[str, Any], debug_school_id: Op
     # 检查"每年X月"格式
     if start1_str and isinstance(start1_str, str) and '每年' in start1_str:
         month = parse_month_from_text(start1_str)
-        if month and now.month == month:
+        if month and today.month == month:
             return 'open'
     
     if start2_str and isinstance(start2_str, str) and '每年' in start2_str:
         month = parse_month_from_text(start2_str)
-        if month and now.month == month:
+        if month and today.month == month:
             return 'open'
     
     # 解析日期（跳过已经是文本状态的字段）
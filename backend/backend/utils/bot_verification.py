@@ -0,0 +1,256 @@
+"""
+搜索引擎爬虫 IP 验证（不阻塞请求线程）
+
+原来的严格验证在请求线程里同步调用 socket.gethostbyaddr / gethostbyname，
+DNS 慢的时候一个请求要卡好几秒（gthread 一共只有十几个线程），失败结果还会缓存 24 小时。
+
+现在分两步：
+1. CIDR 白名单：搜索引擎公布的爬虫 IP 段存放在 common/data/crawler_ip_ranges.json
+   （由 python manage.py update_crawler_ranges 更新），按区间二分查找，命中直接通过
+2. 反向 DNS：不在 IP 段里的（如百度、搜狗没有公布 IP 段）交给后台线程做反查 + 正向确认，
+   请求线程只读缓存，结果出来之前按普通用户处理；DNS 查询有超时，失败结果只缓存较短时间
+"""
+import bisect
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+
+from backend.utils.cache import LocalLRUCache
+from common.logger import loginfo, logerror
+
+
+# backend/backend/utils -> backend（不依赖启动时的工作目录）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 反查结果允许的域名后缀
+VERIFIED_BOT_DOMAINS = (
+    '.googlebot.com', '.google.com',
+    '.baidu.com', '.baidu.jp',
+    '.search.msn.com',  # Bing
+    '.yandex.com',
+    '.sogou.com',
+)
+
+
+def get_ranges_file():
+    return getattr(
+        settings, 'CRAWLER_IP_RANGES_FILE',
+        os.path.join(PROJECT_ROOT, 'common', 'data', 'crawler_ip_ranges.json')
+    )
+
+
+class CidrIndex:
+    """
+    IP 段查找：IPv4 / IPv6 各自把网段转成 [起始, 结束] 整数区间，合并重叠后排序，
+    查找时二分定位起始值不大于该 IP 的最后一个区间
+    """
+
+    def __init__(self, ranges):
+        """
+        :param ranges: {名称: [CIDR, ...]}，无效的网段会被忽略
+        """
+        intervals = {4: [], 6: []}
+        for name, networks in (ranges or {}).items():
+            for network in networks or []:
+                try:
+                    network = ipaddress.ip_network(str(network).strip(), strict=False)
+                except ValueError:
+                    continue
+                intervals[network.version].append(
+                    (int(network.network_address), int(network.broadcast_address), name)
+                )
+
+        # 重叠或相邻的网段合并成一个区间（名称取起始值最小的网段），区间之间互不重叠
+        self._starts = {}
+        self._intervals = {}
+        for version, items in intervals.items():
+            merged = []
+            for start, end, name in sorted(items):
+                if merged and start <= merged[-1][1] + 1:
+                    if end > merged[-1][1]:
+                        merged[-1] = (merged[-1][0], end, merged[-1][2])
+                else:
+                    merged.append((start, end, name))
+            self._intervals[version] = merged
+            self._starts[version] = [start for start, _, _ in merged]
+
+    def __len__(self):
+        return sum(len(items) for items in self._intervals.values())
+
+    def lookup(self, ip):
+        """
+        :return: IP 所在网段的名称（如 'googlebot'），不在任何网段中返回 None
+        """
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        value = int(address)
+        position = bisect.bisect_right(self._starts[address.version], value) - 1
+        if position < 0:
+            return None
+        _, end, name = self._intervals[address.version][position]
+        return name if value <= end else None
+
+
+class BotVerifier:
+    """搜索引擎爬虫 IP 验证（CIDR 白名单 + 后台反向 DNS）"""
+
+    # 缓存值为 (结果, 缓存时间)，与旧的 seo_verify:{ip}（24 小时的布尔值）区分开
+    CACHE_PREFIX = "bot_verify:"
+
+    # 验证结果缓存时间（秒）：通过 / 域名不符 / DNS 超时或出错
+    VERIFIED_TTL = 60 * 60 * 24
+    REJECTED_TTL = 60 * 60
+    FAILED_TTL = 60 * 5
+
+    # 单次 DNS 查询（反查 + 正向确认）的超时时间（秒）
+    DNS_TIMEOUT = 3
+    DNS_WORKERS = 4
+
+    # 同时排队的验证数上限，超出时丢弃（下次请求再排队）
+    MAX_PENDING = 256
+
+    # IP 段文件的检查间隔（秒），文件更新后自动重新加载
+    RANGES_RELOAD_INTERVAL = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor = None
+        self._dns_executor = None
+        self._index = None
+        self._ranges_mtime = None
+        self._ranges_checked_at = 0.0
+        # 本 worker 内的验证结果，避免每个请求都访问 Redis
+        self._verdicts = LocalLRUCache(max_entries=10000, max_bytes=2 * 1024 * 1024)
+
+    # ---------- CIDR ----------
+
+    def get_index(self):
+        now = time.monotonic()
+        if self._index is not None and now - self._ranges_checked_at < self.RANGES_RELOAD_INTERVAL:
+            return self._index
+        with self._lock:
+            if self._index is None or now - self._ranges_checked_at >= self.RANGES_RELOAD_INTERVAL:
+                self._ranges_checked_at = now
+                self._reload_ranges()
+        return self._index
+
+    def _reload_ranges(self):
+        path = get_ranges_file()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if self._index is not None and mtime == self._ranges_mtime:
+            return
+
+        ranges = {}
+        if mtime is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    ranges = json.load(f).get('ranges') or {}
+            except Exception as e:
+                logerror(f"读取爬虫IP段失败: {path}, {e}")
+                if self._index is not None:
+                    return
+        self._index = CidrIndex(ranges)
+        self._ranges_mtime = mtime
+        loginfo(f"[SEO_VERIFY] 已加载爬虫IP段: {len(self._index)} 个")
+
+    # ---------- 验证 ----------
+
+    def verify(self, ip):
+        """
+        验证 IP 是否属于搜索引擎爬虫（不会阻塞）
+        :return: True 已验证；False 未通过或验证中（验证中时已提交后台反查）
+        """
+        try:
+            ip = str(ipaddress.ip_address(ip))
+        except ValueError:
+            return False
+        if self.get_index().lookup(ip):
+            return True
+
+        verdict = self._verdicts.get(ip)
+        if verdict is not None:
+            return verdict
+        cache_key = f"{self.CACHE_PREFIX}{ip}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            verdict, ttl = cached
+            self._verdicts.set(ip, verdict, min(ttl, self.FAILED_TTL))
+            return verdict
+
+        self._schedule(ip)
+        return False
+
+    def _schedule(self, ip):
+        with self._lock:
+            if ip in self._pending or len(self._pending) >= self.MAX_PENDING:
+                return
+            self._pending.add(ip)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.DNS_WORKERS, thread_name_prefix='seo-verify'
+                )
+                self._dns_executor = ThreadPoolExecutor(
+                    max_workers=self.DNS_WORKERS, thread_name_prefix='seo-verify-dns'
+                )
+            executor = self._executor
+        executor.submit(self._run, ip)
+
+    def _run(self, ip):
+        try:
+            future = self._dns_executor.submit(self.resolve, ip)
+            try:
+                verdict = future.result(timeout=self.DNS_TIMEOUT)
+                ttl = self.VERIFIED_TTL if verdict else self.REJECTED_TTL
+            except FutureTimeoutError:
+                loginfo(f"[SEO_VERIFY] DNS 查询超时: {ip}")
+                verdict, ttl = False, self.FAILED_TTL
+            except Exception:
+                verdict, ttl = False, self.FAILED_TTL
+
+            if verdict:
+                loginfo(f"[SEO_VERIFY] 反向DNS验证通过: {ip}")
+            self._verdicts.set(ip, verdict, min(ttl, self.FAILED_TTL))
+            try:
+                cache.set(f"{self.CACHE_PREFIX}{ip}", (verdict, ttl), ttl)
+            except Exception as e:
+                logerror(f"[SEO_VERIFY] 写入验证结果失败: {ip}, {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(ip)
+
+    @staticmethod
+    def resolve(ip):
+        """
+        反向 DNS + 正向确认（阻塞，只在后台线程调用）
+        DNS 出错时抛出异常，由调用方按失败处理（较短的缓存时间）
+        """
+        try:
+            host = socket.gethostbyaddr(ip)[0].lower().rstrip('.')
+        except socket.herror:
+            # 没有 PTR 记录，属于确定的结果
+            return False
+        if not host.endswith(VERIFIED_BOT_DOMAINS):
+            return False
+        # 正向验证：防止伪造 PTR 记录
+        addresses = {
+            ipaddress.ip_address(info[4][0].split('%')[0])
+            for info in socket.getaddrinfo(host, None)
+        }
+        return ipaddress.ip_address(ip) in addresses
+
+
+# 全局实例
+bot_verifier = BotVerifier()
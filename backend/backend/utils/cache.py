@@ -1,16 +1,131 @@
 """
 Redis缓存工具类
 提供统一的缓存接口和装饰器
+
+两级缓存：
+- L1: 进程内 LRU（每个 gunicorn worker 独立），命中时不访问 Redis、不解压、不反序列化
+- L2: Redis（django_redis），所有 worker 共享
+
+响应体缓存：
+接口缓存存放的是最终编码好的响应字节（可选 zlib 压缩）和响应头，
+命中时直接用这些字节构建 HttpResponse，不再反序列化 dict、包装响应格式、重新 JSON 编码
+
+防击穿（single-flight）：
+同一个 key 未命中时只允许一个请求回源。同一 worker 内的其他线程等待进程内的 Event，
+其他 worker 通过 Redis 锁（SET NX）得知已有请求在回源，短暂轮询缓存；等待超时则自己回源兜底
+
+过期后异步刷新（stale-while-revalidate）：
+响应体缓存可以指定软过期时间 soft_timeout（timeout 为硬过期时间，即 Redis TTL）。
+超过软过期后仍然立即返回旧数据，同时在后台线程池中刷新；只有超过硬过期才会阻塞请求
+
+缓存代数（generation）：
+所有学校相关缓存 key 都带有数据集代数 g{N}。数据导入或管理操作后只需对代数做一次
+原子 INCR，旧 key 不再被访问、随 TTL 自然过期，无需 SCAN/DEL 整个 keyspace
 """
 import json
+import pickle
 import hashlib
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
 from functools import wraps
 from django.core.cache import cache
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from backend.utils.payload_response import PayloadResponse
+from common.logger import logerror
+
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """
+    进程内 LRU 缓存（L1）
+    - 条目数和内存占用双重上限，超出时按 LRU 淘汰
+    - 每个条目独立 TTL，过期条目在访问时惰性清除
+    - 线程安全（gthread worker 下多个线程共享同一实例）
+    """
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (expire_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_size(value) -> int:
+        """估算条目占用的内存（字节），只在写入时计算一次"""
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return len(value)
+        if isinstance(value, str):
+            return len(value.encode('utf-8'))
+        try:
+            return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return 1024
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expire_at, size, value = item
+            if expire_at <= time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        if not timeout or timeout <= 0:
+            return False
+        size = self.estimate_size(value)
+        # 单个条目超过总容量的 1/4 时不进入 L1，避免把热点数据全部挤出
+        if size > self.max_bytes // 4:
+            return False
+        expire_at = time.monotonic() + timeout
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expire_at, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self._bytes -= item[1]
+            return item is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
 
 
 class CacheManager:
-    """缓存管理器"""
+    """缓存管理器（L1 进程内 LRU + L2 Redis）"""
     
     # 缓存前缀
     PREFIX_SCHOOL_LIST = "school:list:"
@@ -22,10 +137,103 @@ class CacheManager:
     TIMEOUT_MEDIUM = 1800    # 30分钟 - 用于详情数据
     TIMEOUT_LONG = 3600      # 1小时 - 用于统计数据
     
+    # 学校详情响应：30分钟软过期（先返回旧数据并后台刷新），24小时硬过期
+    # 详情接口、批量接口和缓存预热共用，保证写入的缓存条目一致
+    DETAIL_RESPONSE_TIMEOUT = 86400
+    DETAIL_RESPONSE_SOFT_TIMEOUT = 1800
+    
+    # L1 本地缓存配置
+    # L1 的 TTL 单独封顶：其他 worker 删除/更新 Redis 后，本 worker 最多读到这么久的旧数据
+    LOCAL_CACHE_ENABLED = getattr(settings, 'LOCAL_CACHE_ENABLED', True)
+    LOCAL_CACHE_TIMEOUT = getattr(settings, 'LOCAL_CACHE_TIMEOUT', 30)
+    LOCAL_CACHE_MAX_ENTRIES = getattr(settings, 'LOCAL_CACHE_MAX_ENTRIES', 512)
+    LOCAL_CACHE_MAX_BYTES = getattr(settings, 'LOCAL_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+    
+    _local_cache = LocalLRUCache(LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_MAX_BYTES)
+    
+    # 命中统计（每个 worker 独立计数）
+    _stats = {
+        'l1_hits': 0,
+        'l1_misses': 0,
+        'l2_hits': 0,
+        'l2_misses': 0,
+        # DataSecurityMiddleware 的加密响应缓存
+        'enc_hits': 0,
+        'enc_misses': 0,
+        # 防击穿：实际回源次数 / 等待其他请求回源的次数 / 等待超时后自己回源的次数
+        'fills': 0,
+        'fill_waits': 0,
+        'fill_timeouts': 0,
+        # 过期后异步刷新：返回旧数据的次数 / 后台刷新次数
+        'stale_hits': 0,
+        'refreshes': 0,
+    }
+    _stats_lock = threading.Lock()
+    
+    # 数据集代数（generation）
+    GENERATION_KEY = "school:generation"
+    # 本 worker 缓存代数的时长（秒）：代数递增后，其他 worker 最多延迟这么久切换到新 key
+    GENERATION_LOCAL_TTL = getattr(settings, 'CACHE_GENERATION_LOCAL_TTL', 2)
+    _generation = None
+    _generation_checked_at = 0.0
+    _generation_lock = threading.Lock()
+    
+    @classmethod
+    def get_generation(cls) -> int:
+        """
+        获取当前数据集代数
+        在本 worker 内缓存 GENERATION_LOCAL_TTL 秒，热点请求不会每次都访问 Redis
+        """
+        now = time.monotonic()
+        if cls._generation is not None and now - cls._generation_checked_at < cls.GENERATION_LOCAL_TTL:
+            return cls._generation
+        
+        with cls._generation_lock:
+            if cls._generation is not None and now - cls._generation_checked_at < cls.GENERATION_LOCAL_TTL:
+                return cls._generation
+            try:
+                generation = cache.get(cls.GENERATION_KEY)
+                if generation is None:
+                    # 代数 key 丢失（首次启动或被淘汰）时用当前时间戳初始化，
+                    # 保证新代数一定大于之前用过的代数，不会读到残留的旧缓存
+                    cache.add(cls.GENERATION_KEY, int(time.time()), None)
+                    generation = cache.get(cls.GENERATION_KEY)
+                cls._generation = int(generation)
+            except Exception:
+                # Redis 不可用时沿用上一次的代数，不影响主业务
+                if cls._generation is None:
+                    cls._generation = 0
+            cls._generation_checked_at = now
+            return cls._generation
+    
+    @classmethod
+    def bump_generation(cls) -> int:
+        """
+        递增数据集代数（一次原子 INCR），使所有学校缓存立即失效
+        :return: 新的代数
+        """
+        try:
+            generation = cache.incr(cls.GENERATION_KEY)
+        except ValueError:
+            # key 不存在
+            cache.add(cls.GENERATION_KEY, int(time.time()), None)
+            generation = cache.incr(cls.GENERATION_KEY)
+        
+        with cls._generation_lock:
+            cls._generation = int(generation)
+            cls._generation_checked_at = time.monotonic()
+        cls.clear_local()
+        return cls._generation
+    
+    @classmethod
+    def versioned_key(cls, key: str) -> str:
+        """为缓存 key 加上当前数据集代数"""
+        return f"g{cls.get_generation()}:{key}"
+    
     @staticmethod
     def generate_cache_key(prefix: str, **kwargs) -> str:
         """
-        生成缓存key
+        生成缓存key（带数据集代数）
         :param prefix: 缓存前缀
         :param kwargs: 参数字典
         :return: 缓存key
@@ -37,22 +245,433 @@ class CacheManager:
         # 生成hash值（避免key过长）
         hash_value = hashlib.md5(params_str.encode()).hexdigest()
         
-        return f"{prefix}{hash_value}"
+        return CacheManager.versioned_key(f"{prefix}{hash_value}")
+    
+    @classmethod
+    def _incr_stat(cls, name: str, amount: int = 1):
+        with cls._stats_lock:
+            cls._stats[name] = cls._stats.get(name, 0) + amount
+    
+    @classmethod
+    def record_hit(cls, name: str, hit: bool):
+        """记录其他缓存层的命中情况（如 name='enc' 累加 enc_hits / enc_misses）"""
+        cls._incr_stat(f"{name}_hits" if hit else f"{name}_misses")
+    
+    @classmethod
+    def _local_timeout(cls, timeout):
+        """L1 TTL 不超过 Redis TTL，也不超过 LOCAL_CACHE_TIMEOUT"""
+        if timeout is None:
+            return cls.LOCAL_CACHE_TIMEOUT
+        return min(timeout, cls.LOCAL_CACHE_TIMEOUT)
+    
+    @classmethod
+    def get(cls, key: str, local: bool = True):
+        """
+        获取缓存：先查 L1，未命中再查 Redis 并回填 L1
+        注意：L1 返回的是同一个对象（不是副本），调用方不能修改返回值；
+        会被修改的对象（如 HttpResponse）请传 local=False
+        """
+        use_local = local and cls.LOCAL_CACHE_ENABLED
+        if use_local:
+            value = cls._local_cache.get(key, _MISSING)
+            if value is not _MISSING:
+                cls._incr_stat('l1_hits')
+                return value
+            cls._incr_stat('l1_misses')
+        
+        value = cache.get(key)
+        if value is None:
+            cls._incr_stat('l2_misses')
+            return None
+        
+        cls._incr_stat('l2_hits')
+        if use_local:
+            cls._local_cache.set(key, value, cls.LOCAL_CACHE_TIMEOUT)
+        return value
+    
+    @classmethod
+    def set(cls, key: str, value, timeout=None, local: bool = True):
+        """设置缓存（同时写入 L1 和 Redis）"""
+        result = cache.set(key, value, timeout)
+        if local and cls.LOCAL_CACHE_ENABLED:
+            cls._local_cache.set(key, value, cls._local_timeout(timeout))
+        return result
+    
+    @classmethod
+    def get_many(cls, keys, local: bool = True):
+        """
+        批量获取缓存：先查 L1，剩余的 key 用一次 Redis MGET 读取并回填 L1
+        :return: {key: value}，只包含命中的 key
+        """
+        use_local = local and cls.LOCAL_CACHE_ENABLED
+        result = {}
+        remaining = []
+        for key in keys:
+            if use_local:
+                value = cls._local_cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    cls._incr_stat('l1_hits')
+                    result[key] = value
+                    continue
+                cls._incr_stat('l1_misses')
+            remaining.append(key)
+        
+        if remaining:
+            found = cache.get_many(remaining)
+            for key in remaining:
+                value = found.get(key)
+                if value is None:
+                    cls._incr_stat('l2_misses')
+                    continue
+                cls._incr_stat('l2_hits')
+                result[key] = value
+                if use_local:
+                    cls._local_cache.set(key, value, cls.LOCAL_CACHE_TIMEOUT)
+        return result
+    
+    @classmethod
+    def set_many(cls, mapping, timeout=None, local: bool = True):
+        """批量设置缓存（一次 Redis 往返，同时写入 L1）"""
+        if not mapping:
+            return []
+        result = cache.set_many(mapping, timeout)
+        if local and cls.LOCAL_CACHE_ENABLED:
+            local_timeout = cls._local_timeout(timeout)
+            for key, value in mapping.items():
+                cls._local_cache.set(key, value, local_timeout)
+        return result
+    
+    @classmethod
+    def delete(cls, key: str):
+        """删除缓存（本 worker 的 L1 + Redis）"""
+        cls._local_cache.delete(key)
+        return cache.delete(key)
+    
+    @classmethod
+    def clear_local(cls):
+        """清空本 worker 的 L1 缓存"""
+        cls._local_cache.clear()
+    
+    # 响应体缓存：是否压缩（默认关闭，压缩能省 Redis 内存但命中时需要解压）
+    RESPONSE_COMPRESS = getattr(settings, 'CACHE_RESPONSE_COMPRESS', False)
+    RESPONSE_COMPRESS_MIN_SIZE = getattr(settings, 'CACHE_RESPONSE_COMPRESS_MIN_SIZE', 1024)
+    # 需要随响应体一起缓存的响应头
+    RESPONSE_CACHED_HEADERS = ('Content-Language', 'Cache-Control', 'Vary')
+    
+    @classmethod
+    def set_response(cls, key: str, response, timeout=None, local: bool = True, soft_timeout=None):
+        """
+        缓存最终的响应字节和响应头
+        :param response: HttpResponse（通常是刚构建好的 JsonResponse）
+        :param timeout: 硬过期时间（Redis TTL）
+        :param soft_timeout: 软过期时间，超过后由 get_or_set_response 返回旧数据并后台刷新
+        
+        会在 response 上标记 cache_key / cache_etag / cache_timeout，
+        下游（如 DataSecurityMiddleware）据此缓存自己的派生结果
+        """
+        entry = cls._make_response_entry(key, response, timeout, soft_timeout)
+        return cls.set(key, entry, timeout, local=local)
+    
+    @classmethod
+    def set_many_responses(cls, responses, timeout=None, local: bool = True, soft_timeout=None):
+        """
+        批量缓存响应（一次 Redis 往返），条目格式与 set_response 相同
+        :param responses: {key: HttpResponse}
+        """
+        entries = {
+            key: cls._make_response_entry(key, response, timeout, soft_timeout)
+            for key, response in responses.items()
+        }
+        return cls.set_many(entries, timeout, local=local)
+    
+    @classmethod
+    def get_response_bodies(cls, keys, local: bool = True):
+        """
+        批量读取响应体缓存，只返回响应字节（已解压），供需要拼接多个缓存响应的接口使用
+        :return: {key: (body, is_stale)}，只包含命中的 key
+        """
+        result = {}
+        for key, entry in cls.get_many(keys, local=local).items():
+            if not isinstance(entry, dict) or 'body' not in entry:
+                continue
+            body = entry['body']
+            if entry.get('compressed'):
+                body = zlib.decompress(body)
+            result[key] = (body, cls._is_stale(entry))
+        return result
+    
+    @classmethod
+    def _make_response_entry(cls, key: str, response, timeout=None, soft_timeout=None):
+        body = response.content
+        etag = hashlib.md5(body).hexdigest()[:16]
+        fresh_timeout = soft_timeout if soft_timeout is not None else timeout
+        cls._tag_response(response, key, etag, fresh_timeout)
+        
+        compressed = False
+        if cls.RESPONSE_COMPRESS and len(body) >= cls.RESPONSE_COMPRESS_MIN_SIZE:
+            body = zlib.compress(body)
+            compressed = True
+        
+        entry = {
+            'body': body,
+            'etag': etag,
+            'timeout': fresh_timeout,
+            'fresh_until': time.time() + soft_timeout if soft_timeout is not None else None,
+            'compressed': compressed,
+            'status': response.status_code,
+            'content_type': response.get('Content-Type'),
+            # PayloadResponse 的 data 字节区间，命中时还原，加密时不需要解析 JSON
+            'data_span': getattr(response, 'data_span', None),
+            'headers': {
+                name: response[name]
+                for name in cls.RESPONSE_CACHED_HEADERS
+                if response.has_header(name)
+            },
+        }
+        return entry
+    
+    @classmethod
+    def get_response(cls, key: str, local: bool = True):
+        """
+        读取响应体缓存，命中时返回新的 HttpResponse（每次都是新对象，可以放心修改）
+        :return: HttpResponse 或 None
+        """
+        entry = cls._get_response_entry(key, local)
+        if entry is None:
+            return None
+        return cls._build_response(key, entry)
+    
+    @classmethod
+    def _get_response_entry(cls, key: str, local: bool = True):
+        entry = cls.get(key, local=local)
+        # 兼容旧格式的缓存（dict 数据 / HttpResponse 对象），按未命中处理
+        if not isinstance(entry, dict) or 'body' not in entry:
+            return None
+        return entry
     
     @staticmethod
-    def get(key: str):
-        """获取缓存"""
-        return cache.get(key)
+    def _is_stale(entry) -> bool:
+        fresh_until = entry.get('fresh_until')
+        return fresh_until is not None and time.time() > fresh_until
+    
+    @classmethod
+    def _build_response(cls, key: str, entry):
+        body = entry['body']
+        if entry.get('compressed'):
+            body = zlib.decompress(body)
+        
+        if entry.get('data_span'):
+            response = PayloadResponse.from_body(
+                body, entry['data_span'], content_type=entry['content_type'], status=entry['status']
+            )
+        else:
+            response = HttpResponse(body, content_type=entry['content_type'], status=entry['status'])
+        for name, value in entry['headers'].items():
+            response[name] = value
+        cls._tag_response(response, key, entry.get('etag'), entry.get('timeout'))
+        return response
     
     @staticmethod
-    def set(key: str, value, timeout=None):
-        """设置缓存"""
-        return cache.set(key, value, timeout)
+    def _tag_response(response, key, etag, timeout):
+        response.cache_key = key
+        response.cache_etag = etag
+        response.cache_timeout = timeout
+    
+    # 防击穿配置
+    FILL_LOCK_PREFIX = "lock:fill:"
+    FILL_LOCK_TIMEOUT = getattr(settings, 'CACHE_FILL_LOCK_TIMEOUT', 10)   # 回源锁最长持有时间（秒）
+    FILL_WAIT_TIMEOUT = getattr(settings, 'CACHE_FILL_WAIT_TIMEOUT', 3)    # 等待其他请求回源的最长时间（秒）
+    FILL_POLL_INTERVAL = 0.05
+    _inflight = {}
+    _inflight_lock = threading.Lock()
+    
+    @classmethod
+    def _single_flight(cls, key: str, lookup, fill):
+        """
+        对同一个 key 合并回源
+        :param lookup: 读缓存，未命中返回 None
+        :param fill: 回源并写缓存，返回结果
+        
+        等待者拿到的是 lookup() 重新读出的结果，而不是回源者的返回值，
+        因此 HttpResponse 这类会被修改的对象不会在线程间共享
+        """
+        value = lookup()
+        if value is not None:
+            return value
+        
+        # 1. 进程内：同一 worker 的其他线程等待回源者
+        with cls._inflight_lock:
+            event = cls._inflight.get(key)
+            is_leader = event is None
+            if is_leader:
+                event = threading.Event()
+                cls._inflight[key] = event
+        
+        if not is_leader:
+            cls._incr_stat('fill_waits')
+            event.wait(cls.FILL_WAIT_TIMEOUT)
+            value = lookup()
+            if value is not None:
+                return value
+            # 回源者失败、超时或结果不可缓存，自己回源
+            return fill()
+        
+        try:
+            return cls._fill_with_lock(key, lookup, fill)
+        finally:
+            with cls._inflight_lock:
+                cls._inflight.pop(key, None)
+            event.set()
+    
+    @classmethod
+    def _fill_with_lock(cls, key: str, lookup, fill):
+        """2. 跨进程：用 Redis 锁保证只有一个 worker 回源"""
+        lock_key = cls.FILL_LOCK_PREFIX + key
+        token = uuid.uuid4().hex
+        try:
+            acquired = cache.add(lock_key, token, cls.FILL_LOCK_TIMEOUT)
+        except Exception:
+            # Redis 不可用时直接回源，不影响主业务
+            return fill()
+        
+        if not acquired:
+            cls._incr_stat('fill_waits')
+            deadline = time.monotonic() + cls.FILL_WAIT_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(cls.FILL_POLL_INTERVAL)
+                value = lookup()
+                if value is not None:
+                    return value
+            # 等待超时（回源者可能已崩溃），自己回源兜底
+            cls._incr_stat('fill_timeouts')
+            return fill()
+        
+        try:
+            # 拿到锁后再查一次：可能刚好有其他 worker 回源完成
+            value = lookup()
+            if value is not None:
+                return value
+            cls._incr_stat('fills')
+            return fill()
+        finally:
+            cls._release_fill_lock(lock_key, token)
     
     @staticmethod
-    def delete(key: str):
-        """删除缓存"""
-        return cache.delete(key)
+    def _release_fill_lock(lock_key: str, token: str):
+        try:
+            # 只释放自己持有的锁（锁可能已超时被其他 worker 拿走）
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        except Exception:
+            pass
+    
+    @classmethod
+    def get_or_set(cls, key: str, compute, timeout=None, local: bool = True):
+        """
+        读缓存，未命中时合并回源（同一个 key 只有一个请求执行 compute）
+        :param compute: 无参函数，返回要缓存的值；返回 None 时不缓存
+        """
+        def fill():
+            value = compute()
+            if value is not None:
+                cls.set(key, value, timeout, local=local)
+            return value
+        
+        return cls._single_flight(key, lambda: cls.get(key, local=local), fill)
+    
+    @classmethod
+    def get_or_set_response(cls, key: str, build, timeout=None, local: bool = True, soft_timeout=None):
+        """
+        读响应体缓存，未命中时合并回源
+        :param build: 无参函数，返回 HttpResponse；只缓存 200 响应，
+                      不应缓存的结果（如学校不存在）请在 build 中抛异常，由视图处理
+        :param timeout: 硬过期时间
+        :param soft_timeout: 软过期时间；超过后返回旧数据并在后台调用 build 刷新。
+                             build 会在请求结束后执行，只能依赖已解析好的参数
+        """
+        def fill():
+            response = build()
+            if response.status_code == 200 and not getattr(response, 'streaming', False):
+                cls.set_response(key, response, timeout, local=local, soft_timeout=soft_timeout)
+            return response
+        
+        def lookup():
+            entry = cls._get_response_entry(key, local)
+            if entry is None:
+                return None
+            if cls._is_stale(entry):
+                cls._incr_stat('stale_hits')
+                cls._refresh_in_background(key, fill, local)
+            return cls._build_response(key, entry)
+        
+        return cls._single_flight(key, lookup, fill)
+    
+    # 后台刷新线程池（每个 worker 首次使用时创建）
+    REFRESH_WORKERS = getattr(settings, 'CACHE_REFRESH_WORKERS', 2)
+    _refresh_executor = None
+    _refreshing = {}  # key -> 提交时间
+    
+    @classmethod
+    def _refresh_in_background(cls, key: str, fill, local: bool):
+        """提交后台刷新任务，同一个 key 在本 worker 内同时只有一个刷新任务"""
+        with cls._inflight_lock:
+            if key in cls._refreshing:
+                return
+            cls._refreshing[key] = time.monotonic()
+            if cls._refresh_executor is None:
+                cls._refresh_executor = ThreadPoolExecutor(
+                    max_workers=cls.REFRESH_WORKERS,
+                    thread_name_prefix='cache-refresh'
+                )
+        
+        try:
+            cls._refresh_executor.submit(cls._refresh, key, fill, local)
+        except RuntimeError:
+            # 解释器退出中，线程池已关闭
+            with cls._inflight_lock:
+                cls._refreshing.pop(key, None)
+    
+    @classmethod
+    def _refresh(cls, key: str, fill, local: bool):
+        """后台刷新：与回源共用 Redis 锁，跨 worker 只刷新一次"""
+        lock_key = cls.FILL_LOCK_PREFIX + key
+        token = uuid.uuid4().hex
+        try:
+            if not cache.add(lock_key, token, cls.FILL_LOCK_TIMEOUT):
+                # 其他 worker 正在回源/刷新
+                return
+            try:
+                # L1 里的可能只是旧副本，Redis 里已经是其他 worker 刷新过的新数据
+                entry = cache.get(key)
+                if isinstance(entry, dict) and 'body' in entry and not cls._is_stale(entry):
+                    if local and cls.LOCAL_CACHE_ENABLED:
+                        cls._local_cache.set(key, entry, cls._local_timeout(entry.get('timeout')))
+                    return
+                cls._incr_stat('refreshes')
+                fill()
+            finally:
+                cls._release_fill_lock(lock_key, token)
+        except Exception as e:
+            logerror(f"缓存后台刷新失败: {key} | {str(e)}")
+        finally:
+            with cls._inflight_lock:
+                cls._refreshing.pop(key, None)
+            # 后台线程不经过请求周期，需要自己关闭数据库连接
+            connections.close_all()
+    
+    @classmethod
+    def get_stats(cls) -> dict:
+        """获取两级缓存的命中统计"""
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        l1_total = stats['l1_hits'] + stats['l1_misses']
+        l2_total = stats['l2_hits'] + stats['l2_misses']
+        stats['l1_hit_rate'] = round(stats['l1_hits'] / l1_total, 4) if l1_total else 0
+        stats['l2_hit_rate'] = round(stats['l2_hits'] / l2_total, 4) if l2_total else 0
+        enc_total = stats['enc_hits'] + stats['enc_misses']
+        stats['enc_hit_rate'] = round(stats['enc_hits'] / enc_total, 4) if enc_total else 0
+        stats['l1'] = cls._local_cache.info()
+        return stats
     
     @staticmethod
     def delete_pattern(pattern: str):
@@ -71,17 +690,32 @@ class CacheManager:
     
     @staticmethod
     def clear_school_cache():
-        """清除所有学校相关缓存"""
-        CacheManager.delete_pattern(CacheManager.PREFIX_SCHOOL_LIST + "*")
-        CacheManager.delete_pattern(CacheManager.PREFIX_SCHOOL_DETAIL + "*")
-        CacheManager.delete_pattern(CacheManager.PREFIX_SCHOOL_STATS + "*")
+        """
+        清除所有学校相关缓存
+        通过递增数据集代数实现，不扫描 Redis keyspace
+        :return: 新的代数
+        """
+        return CacheManager.bump_generation()
+
+    @staticmethod
+    def clear_school_cache_after_import():
+        """
+        数据导入脚本结束时调用：清除所有学校相关缓存
+        失败时只打印提示（不中断脚本），可以之后手动执行 clear_cache --schools
+        """
+        try:
+            generation = CacheManager.clear_school_cache()
+            print(f"✓ 学校缓存已失效（缓存代数 -> {generation}）")
+        except Exception as e:
+            print(f"⚠️  学校缓存失效失败，请手动执行 python manage.py clear_cache --schools: {e}")
 
 
-def cache_response(prefix: str, timeout: int = 300):
+def cache_response(prefix: str, timeout: int = 300, soft_timeout: int = None):
     """
     缓存响应的装饰器
     :param prefix: 缓存key前缀
     :param timeout: 过期时间（秒）
+    :param soft_timeout: 软过期时间（秒），超过后返回旧响应并在后台刷新，此时 timeout 为硬过期时间
     """
     def decorator(func):
         @wraps(func)
@@ -95,19 +729,13 @@ def cache_response(prefix: str, timeout: int = 300):
             cache_params = dict(request.GET.items())
             cache_key = CacheManager.generate_cache_key(prefix, **cache_params)
             
-            # 尝试从缓存获取
-            cached_data = CacheManager.get(cache_key)
-            if cached_data is not None:
-                return cached_data
-            
-            # 执行函数获取数据
-            response = func(*args, **kwargs)
-            
-            # 缓存结果
-            if hasattr(response, 'status_code') and response.status_code == 200:
-                CacheManager.set(cache_key, response, timeout)
-            
-            return response
+            # 缓存的是响应字节，命中时直接构建新的响应；未命中时合并回源
+            return CacheManager.get_or_set_response(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                timeout,
+                soft_timeout=soft_timeout
+            )
         
         return wrapper
     return decorator
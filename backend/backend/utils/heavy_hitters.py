@@ -0,0 +1,121 @@
+"""
+高频客户端检测（Count-Min Sketch + Top-K）
+
+按 IP / 设备ID / User-Agent 统计请求频率时，如果每个客户端都保存一份记录，
+爬虫轮换设备ID（X-Device-ID 可以随意伪造）就能让内存无限增长。这里用固定大小的结构：
+
+- Count-Min Sketch：depth 行 × width 列计数器，每个 key 在每行命中一个计数器，
+  估计值取各行的最小值（只会高估，不会低估），内存与客户端数量无关
+- 保守更新：只把等于最小值的计数器加一，减少哈希冲突带来的高估
+- 滑动窗口：当前窗口和上一窗口各一份 sketch，估计值 = 上一窗口 × 仍在窗口内的比例 + 当前窗口
+- Top-K：只保留当前窗口请求最多的 K 个 key，用于日志和排查
+
+线程安全（gthread worker 下多个线程共享同一实例），每个 worker 独立统计
+"""
+import threading
+import time
+from array import array
+
+
+class CountMinSketch:
+    """固定内存的频率估计"""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array('L', bytes(array('L').itemsize * width)) for _ in range(depth)]
+
+    def indexes(self, key):
+        """
+        key 在每一行的位置（双重哈希：h1 + i * h2）
+        sketch 只在进程内使用，直接用内置 hash()（进程内稳定，比加密哈希快得多）
+        """
+        h1 = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h2 = ((h1 * 0x9E3779B97F4A7C15) >> 32) | 1
+        width = self.width
+        return [(h1 + i * h2) % width for i in range(self.depth)]
+
+    def estimate(self, indexes):
+        return min([row[index] for row, index in zip(self._rows, indexes)])
+
+    def add(self, indexes):
+        """保守更新，返回更新后的估计值"""
+        pairs = list(zip(self._rows, indexes))
+        value = min([row[index] for row, index in pairs]) + 1
+        for row, index in pairs:
+            if row[index] < value:
+                row[index] = value
+        return value
+
+
+class HeavyHitterTracker:
+    """滑动窗口内的高频 key 检测"""
+
+    def __init__(self, window=60, width=2048, depth=4, top_k=32):
+        """
+        :param window: 统计窗口（秒）
+        :param top_k: 保留的高频 key 数量
+        """
+        self.window = window
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._window_index = int(time.time() // window)
+        self._current = CountMinSketch(width, depth)
+        self._previous = CountMinSketch(width, depth)
+        self._top = {}  # key -> 当前窗口计数（最多 top_k 个）
+        self._top_floor = 0  # Top-K 中最小计数的下界，不超过它的 key 不需要再比较
+
+    def _rotate(self, now):
+        window_index = int(now // self.window)
+        if window_index == self._window_index:
+            return
+        # 跨过一个窗口：当前 -> 上一窗口；跨过多个窗口：两份都清空
+        if window_index == self._window_index + 1:
+            self._previous = self._current
+        else:
+            self._previous = CountMinSketch(self.width, self.depth)
+        self._current = CountMinSketch(self.width, self.depth)
+        self._top = {}
+        self._top_floor = 0
+        self._window_index = window_index
+
+    def add(self, key):
+        """
+        记录一次请求
+        :return: 滑动窗口内的估计请求数（含本次）
+        """
+        now = time.time()
+        with self._lock:
+            self._rotate(now)
+            indexes = self._current.indexes(key)
+            current = self._current.add(indexes)
+            previous = self._previous.estimate(indexes)
+            self._update_top(key, current)
+
+        elapsed = (now % self.window) / self.window
+        return int(previous * (1 - elapsed)) + current
+
+    def _update_top(self, key, count):
+        top = self._top
+        if key in top or len(top) < self.top_k:
+            top[key] = count
+            return
+        # 成员的计数只增不减，floor 始终不大于真实的最小值
+        if count <= self._top_floor:
+            return
+        min_key = min(top, key=top.get)
+        if count > top[min_key]:
+            del top[min_key]
+            top[key] = count
+            self._top_floor = min(top.values())
+        else:
+            self._top_floor = top[min_key]
+
+    def top(self, n=None):
+        """当前窗口请求最多的 key：[(key, 估计请求数)]，从多到少"""
+        with self._lock:
+            self._rotate(time.time())
+            items = sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+        return items[:n] if n else items
@@ -0,0 +1,338 @@
+"""
+列表卡片预计算（list_card 列）
+
+列表页卡片中与日期无关的部分（名称、地区、Band1比例、精简后的联系中学等）在写入时生成，
+存到 tb_primary_schools / tb_secondary_schools 的 list_card 列：
+- 模型 save() 时自动生成
+- 数据导入脚本结束时调用 refresh_list_cards_after_import()（脚本多用 update/bulk 写入，不经过 save）
+- 也可以手动执行 python manage.py rebuild_list_cards
+
+构建列表快照时只需读取 list_card，不再读取 secondary_info / promotion_info 等大字段。
+申请状态与当天日期有关，不放在 list_card 中；写入时把 transfer_info 编译成状态时间线
+（status_timeline 列，见 backend/utils/status_timeline.py），构建快照时按日期查表。
+小学详情页用的升学信息顺序（promotion_order 列，见 backend/utils/promotion_order.py）也在这里一并刷新。
+
+存储格式为 {"v": 版本号, "card": {...}}，卡片结构变化时递增 LIST_CARD_VERSION，
+旧版本的卡片会被当作不存在（回退到实时生成），执行一次 rebuild_list_cards 即可全部更新
+"""
+from datetime import timedelta
+import hashlib
+import json
+
+from backend.utils.application_status import get_utc8_now
+from backend.utils.promotion_order import build_promotion_order
+from backend.utils.status_timeline import build_status_timeline, get_statuses, is_timeline_valid
+from common.logger import loginfo
+
+
+LIST_CARD_VERSION = 1
+
+# 各学段卡片上显示的申请类型（第一项优先作为顶层 application_status）
+PRIMARY_STATUS_KINDS = ('小一', '插班')
+SECONDARY_STATUS_KINDS = ('S1', '插班')
+
+# 计入"开放申请"的状态（deadline 为即将截止，仍可申请）
+OPEN_APPLICATION_STATUSES = ('open', 'deadline')
+
+# 状态时间线距离过期不足这么多天时提前重新编译
+STATUS_TIMELINE_RENEW_DAYS = 30
+
+# 上一次检查时所有学校申请状态的摘要（不随缓存代数变化）
+STATUS_DIGEST_KEY = "school:status_digest"
+
+
+def get_band1_rate(school):
+    """
+    获取学校的 Band 1 比例
+    如果 promotion_info 中的 band1_rate_null 为 True，返回 None
+    否则优先使用 school.band1_rate，如果为 None 则从 promotion_info 中获取
+    """
+    # 检查 promotion_info 中的 band1_rate_null 标志
+    if school.promotion_info and isinstance(school.promotion_info, dict):
+        if school.promotion_info.get('band1_rate_null') is True:
+            return None
+
+    # 优先使用 school.band1_rate
+    if school.band1_rate is not None:
+        return float(school.band1_rate)
+
+    # 如果 school.band1_rate 为 None，尝试从 promotion_info 中获取
+    if school.promotion_info and isinstance(school.promotion_info, dict):
+        band1_rate = school.promotion_info.get('band1_rate')
+        if band1_rate is not None:
+            return float(band1_rate)
+
+    return None
+
+
+def build_primary_list_card(school):
+    """小学列表卡片（不含申请状态）"""
+    # 🔥 优化：精简 secondaryInfo，保留必要的字符串值但限制大小
+    secondary_info = school.secondary_info or {}
+    secondary_info_minimal = {}
+    if isinstance(secondary_info, dict):
+        # 保留前端需要的字段，但限制字符串长度（避免过大的数据）
+        # 前端使用: through_train, direct, associated
+        # 数据库可能存储为: 结龙, 直属, 联系
+        for db_key, frontend_key in [('结龙', 'through_train'), ('直属', 'direct'), ('联系', 'associated')]:
+            value = secondary_info.get(db_key) or secondary_info.get(frontend_key)
+            if value:
+                # 如果是字符串，限制长度（避免过大的数据）
+                if isinstance(value, str) and len(value) > 200:
+                    value = value[:200] + '...'
+                secondary_info_minimal[frontend_key] = value
+
+    return {
+        # 基本信息
+        "id": school.id,
+        "name": school.school_name,
+        "nameTraditional": school.school_name_traditional,
+        "nameEnglish": school.school_name_english,
+        "type": "primary",
+        "category": school.school_category,
+        "district": school.district,
+        "schoolNet": school.school_net,
+        "gender": school.student_gender,
+        "religion": school.religion,
+        "tuition": school.tuition or "-",
+
+        # 卡片显示：Band1比例（前端使用 school.band1Rate）
+        "band1Rate": get_band1_rate(school),
+
+        # 🔥 优化：精简的联系中学信息（只保留类型标识）
+        "secondaryInfo": secondary_info_minimal,
+    }
+
+
+def build_secondary_list_card(school):
+    """中学列表卡片（不含申请状态）"""
+    return {
+        # 基本信息
+        "id": school.id,
+        "name": school.school_name,
+        "nameTraditional": school.school_name_traditional,
+        "nameEnglish": school.school_name_english,
+        "type": "secondary",
+        "district": school.district,
+        "schoolNet": school.school_net,
+        "religion": school.religion,
+        "gender": school.student_gender,
+        "tuition": school.tuition if school.tuition else 0,
+        "category": school.school_category,
+        "schoolType": school.school_category,
+        "schoolGroup": school.school_group,
+    }
+
+
+def build_transfer_status(school, kinds, today=None):
+    """
+    卡片的申请状态（与当天日期有关）
+    只返回计算后的申请状态，不包含详细时间信息
+    优先查状态时间线，时间线缺失或过期时实时计算（结果相同）
+    """
+    statuses = get_statuses(
+        school.transfer_info, getattr(school, 'status_timeline', None), kinds,
+        today=today, debug_school_id=school.id
+    )
+    transfer_info_minimal = {}
+    for kind in kinds:
+        if statuses.get(kind):
+            transfer_info_minimal[kind] = {'application_status': statuses[kind]}
+
+    # 🔥 为了前端兼容性，在顶层添加 application_status
+    # 优先使用小一/S1的状态，其次插班
+    for kind in kinds:
+        if kind in transfer_info_minimal:
+            transfer_info_minimal['application_status'] = transfer_info_minimal[kind].get('application_status')
+            break
+
+    return transfer_info_minimal
+
+
+def build_primary_transfer_status(school, today=None):
+    """小学卡片的申请状态（小一、插班）"""
+    return build_transfer_status(school, PRIMARY_STATUS_KINDS, today=today)
+
+
+def build_secondary_transfer_status(school, today=None):
+    """中学卡片的申请状态（S1、插班）"""
+    return build_transfer_status(school, SECONDARY_STATUS_KINDS, today=today)
+
+
+def build_primary_status_timeline(school):
+    """小学的状态时间线（status_timeline 列）"""
+    return build_status_timeline(school.transfer_info, PRIMARY_STATUS_KINDS)
+
+
+def build_secondary_status_timeline(school):
+    """中学的状态时间线（status_timeline 列）"""
+    return build_status_timeline(school.transfer_info, SECONDARY_STATUS_KINDS)
+
+
+def is_status_timeline_current(timeline, today=None):
+    """状态时间线是否可用，且短期内不会过期"""
+    today = today or get_utc8_now().date()
+    return (
+        is_timeline_valid(timeline, today)
+        and is_timeline_valid(timeline, today + timedelta(days=STATUS_TIMELINE_RENEW_DAYS))
+    )
+
+
+def pack_list_card(card):
+    """卡片 -> list_card 列的存储格式"""
+    return {"v": LIST_CARD_VERSION, "card": card}
+
+
+def unpack_list_card(value):
+    """list_card 列 -> 卡片；为空或版本不一致时返回 None"""
+    if isinstance(value, dict) and value.get("v") == LIST_CARD_VERSION:
+        card = value.get("card")
+        if isinstance(card, dict):
+            return card
+    return None
+
+
+def load_stale_list_card_rows(model, schools):
+    """
+    list_card 缺失或版本过旧的行需要实时生成卡片，而查询时只读取了 list_card 等少数字段，
+    这里用一次 id__in 查询补全这些行的完整数据（避免逐行加载延迟字段）
+    状态时间线缺失或过期的行只记录日志（查询时已读取 transfer_info，会回退到实时计算）
+    :param schools: 只读取了部分字段的查询结果（保持顺序）
+    :return: 学校列表，顺序不变
+    """
+    schools = list(schools)
+    today = get_utc8_now().date()
+    stale_timelines = sum(1 for school in schools if not is_timeline_valid(school.status_timeline, today))
+    stale_ids = [school.id for school in schools if unpack_list_card(school.list_card) is None]
+    if stale_timelines:
+        loginfo(
+            f"[LIST_CARD] {model._meta.db_table}: {stale_timelines} rows without current status_timeline, "
+            f"run `python manage.py rebuild_list_cards`"
+        )
+    if not stale_ids:
+        return schools
+
+    loginfo(
+        f"[LIST_CARD] {model._meta.db_table}: {len(stale_ids)} rows without current list_card, "
+        f"run `python manage.py rebuild_list_cards`"
+    )
+    full_rows = model.objects.in_bulk(stale_ids)
+    return [full_rows.get(school.id, school) for school in schools]
+
+
+def refresh_list_cards(model, builders, batch_size=200):
+    """
+    重新生成某张表所有学校的预计算列，只写回有变化的行
+    :param builders: {列名: 函数(school)}
+    :return: 更新的行数
+    """
+    changed = []
+    for school in model.objects.all().iterator():
+        row_changed = False
+        for field, build in builders.items():
+            value = build(school)
+            if getattr(school, field) != value:
+                setattr(school, field, value)
+                row_changed = True
+        if row_changed:
+            changed.append(school)
+
+    if changed:
+        model.objects.bulk_update(changed, list(builders), batch_size=batch_size)
+    return len(changed)
+
+
+def refresh_all_list_cards():
+    """
+    重新生成小学和中学的预计算列（数据导入脚本结束时调用）：
+    list_card、status_timeline、application_status，以及小学的 promotion_order
+    :return: (小学更新行数, 中学更新行数)
+    """
+    from backend.models.tb_primary_schools import TbPrimarySchools
+    from backend.models.tb_secondary_schools import TbSecondarySchools
+
+    primary_builders = {
+        'list_card': lambda school: pack_list_card(build_primary_list_card(school)),
+        'status_timeline': build_primary_status_timeline,
+        'promotion_order': lambda school: build_promotion_order(school.promotion_info),
+        'application_status': lambda school: build_primary_transfer_status(school).get('application_status'),
+    }
+    secondary_builders = {
+        'list_card': lambda school: pack_list_card(build_secondary_list_card(school)),
+        'status_timeline': build_secondary_status_timeline,
+        'application_status': lambda school: build_secondary_transfer_status(school).get('application_status'),
+    }
+    return (
+        refresh_list_cards(TbPrimarySchools, primary_builders),
+        refresh_list_cards(TbSecondarySchools, secondary_builders),
+    )
+
+
+def refresh_list_cards_after_import():
+    """
+    数据导入脚本结束时调用：重新生成列表卡片等预计算列
+    失败时只打印提示（不中断脚本），可以之后手动执行 rebuild_list_cards
+    """
+    try:
+        primary_count, secondary_count = refresh_all_list_cards()
+        print(f"✓ 列表卡片已更新（小学 {primary_count} 条，中学 {secondary_count} 条）")
+    except Exception as e:
+        print(f"⚠️  列表卡片更新失败，请手动执行 python manage.py rebuild_list_cards: {e}")
+
+
+def check_application_status_changes(today=None):
+    """
+    每日检查申请状态是否有变化（定时任务在零点后执行）
+    列表缓存按缓存代数区分，申请状态按日期变化时缓存不会自动失效；
+    这里按时间线算出当天所有学校的状态并更新 application_status 列，以下情况递增缓存代数：
+    - 有学校的 application_status 被更新（以数据库为准，不依赖缓存中的摘要）
+    - 状态摘要与上一次不同（覆盖 application_status 之外的细分状态）
+    - 上一次的摘要不存在（首次执行、Redis 清空或被淘汰），无法确认没有变化
+    多个进程同时执行时最多多递增一次代数，不会漏掉；时间线缺失或即将过期时顺带重新编译
+    :return: 申请状态是否有变化
+    """
+    from backend.models.tb_primary_schools import TbPrimarySchools
+    from backend.models.tb_secondary_schools import TbSecondarySchools
+    from backend.utils.cache import CacheManager
+
+    today = today or get_utc8_now().date()
+    sources = (
+        (TbPrimarySchools, build_primary_transfer_status),
+        (TbSecondarySchools, build_secondary_transfer_status),
+    )
+
+    statuses = []
+    renew = False
+    updated_rows = 0
+    for model, build_status in sources:
+        changed_rows = []
+        schools = model.objects.order_by('id').only('id', 'transfer_info', 'status_timeline', 'application_status')
+        for school in schools:
+            renew = renew or not is_status_timeline_current(school.status_timeline, today)
+            status = build_status(school, today=today)
+            statuses.append([model._meta.db_table, school.id, status])
+            if school.application_status != status.get('application_status'):
+                school.application_status = status.get('application_status')
+                changed_rows.append(school)
+        if changed_rows:
+            updated_rows += len(changed_rows)
+            model.objects.bulk_update(changed_rows, ['application_status'], batch_size=200)
+            loginfo(f"[STATUS] {model._meta.db_table}: 更新 application_status {len(changed_rows)} 条")
+
+    if renew:
+        primary_count, secondary_count = refresh_all_list_cards()
+        loginfo(f"[STATUS] 已重新编译状态时间线：小学 {primary_count} 条，中学 {secondary_count} 条")
+
+    digest = hashlib.md5(json.dumps(statuses, sort_keys=True).encode()).hexdigest()
+    previous = CacheManager.get(STATUS_DIGEST_KEY, local=False)
+
+    changed = bool(updated_rows) or previous != digest
+    if changed:
+        generation = CacheManager.bump_generation()
+        reason = f"更新 {updated_rows} 条" if updated_rows else ("无上次摘要" if previous is None else "摘要变化")
+        loginfo(f"[STATUS] {today} 申请状态有变化（{reason}），缓存代数 -> {generation}")
+    else:
+        loginfo(f"[STATUS] {today} 申请状态无变化（{len(statuses)} 所学校）")
+    # 递增代数之后再记录摘要：递增失败时下一次检查仍会发现变化
+    CacheManager.set(STATUS_DIGEST_KEY, digest, None, local=False)
+    return changed
@@ -0,0 +1,69 @@
+"""
+相似学校索引（推荐接口）
+
+每所学校预先算好最相似的前 N 所学校，推荐时只需从中随机抽取，
+不再用 ORDER BY RAND() 让数据库对整张表随机排序。
+
+相似度：
+- 分组列（如地区）必须相同（推荐的是"同区学校"）
+- 其余特征列取值相同时加上对应的权重，空值不算相同
+- 同分按行号（列表页排序）靠前的优先
+
+计算时按取值分组累加分数，每所学校只和同组的学校比较，开销与各组大小的平方和成正比
+"""
+import heapq
+import random
+
+
+class NeighbourIndex:
+    """每行的前 N 个相似行（只读，构建后不再修改）"""
+
+    # 每所学校保留的相似学校数（推荐时从中随机抽取）
+    TOP_N = 12
+
+    def __init__(self, groups, features, weights, top_n=None):
+        """
+        :param groups: 每行的分组值（不同组之间不相似，空值的行没有相似行）
+        :param features: 每行的特征元组，与 weights 一一对应
+        :param weights: 每个特征相同时的加分
+        """
+        self.top_n = top_n or self.TOP_N
+        self.size = len(groups)
+
+        members = {}
+        for row, group in enumerate(groups):
+            if group:
+                members.setdefault(group, []).append(row)
+
+        self._neighbours = [[] for _ in range(self.size)]
+        for rows in members.values():
+            self._build_group(rows, features, weights)
+
+    def _build_group(self, rows, features, weights):
+        # 组内按 (特征序号, 取值) 建倒排表，累加每对学校的分数
+        postings = {}
+        for row in rows:
+            for position, value in enumerate(features[row]):
+                if value:
+                    postings.setdefault((position, value), []).append(row)
+
+        for row in rows:
+            scores = dict.fromkeys(rows, 0)
+            del scores[row]
+            for position, value in enumerate(features[row]):
+                if value:
+                    weight = weights[position]
+                    for other in postings[(position, value)]:
+                        if other != row:
+                            scores[other] += weight
+            best = heapq.nsmallest(self.top_n, scores.items(), key=lambda item: (-item[1], item[0]))
+            self._neighbours[row] = [other for other, _ in best]
+
+    def neighbours(self, row):
+        """相似行，按相似度从高到低"""
+        return self._neighbours[row]
+
+    def sample(self, row, k, rng=random):
+        """从相似行中随机抽取 k 个（不足 k 个时全部返回，顺序随机）"""
+        neighbours = self._neighbours[row]
+        return rng.sample(neighbours, min(k, len(neighbours)))
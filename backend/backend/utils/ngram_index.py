@@ -0,0 +1,101 @@
+"""
+学校名称 n-gram 倒排索引
+
+关键字搜索原来是多个 __icontains 条件的 OR，数据库只能全表扫描。这里在内存中为每行的名称
+（简体、繁体、英文，以及经 normalize_keyword 标准化后的版本）建立字符 1-gram / 2-gram 倒排表：
+- 倒排表的值是位图（Python int，第 i 位表示第 i 行），可以直接与筛选位图做与运算
+- 查询词先用 n-gram 位图求交得到候选行，再对候选行做一次子串确认，结果与 icontains 一致
+- 多个词（空格分隔）之间是 AND 关系，每个词在任意名称中出现即可
+
+查询开销只与查询词长度和候选行数有关，与表的大小无关
+"""
+from backend.utils.text_converter import normalize_keyword
+
+
+def _fold(text):
+    return (text or '').casefold()
+
+
+def _grams(text):
+    """字符 1-gram 和 2-gram"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class NgramIndex:
+    """名称 n-gram 倒排索引（只读，随快照一起构建）"""
+
+    def __init__(self, names_per_row):
+        """
+        :param names_per_row: 每行的名称列表，如 [[简体名, 繁体名, 英文名], ...]
+        """
+        self.size = len(names_per_row)
+        self._texts = []
+        self._postings = {}
+
+        for i, names in enumerate(names_per_row):
+            texts = []
+            for name in names:
+                if not name:
+                    continue
+                for variant in (_fold(name), _fold(normalize_keyword(name))):
+                    if variant and variant not in texts:
+                        texts.append(variant)
+            self._texts.append(texts)
+
+            bit = 1 << i
+            for text in texts:
+                for gram in _grams(text):
+                    self._postings[gram] = self._postings.get(gram, 0) | bit
+
+    @staticmethod
+    def split_terms(query):
+        """拆分查询词：按空白分词，每个词保留原文和标准化（繁转简）两种形式"""
+        terms = []
+        for word in (query or '').split():
+            forms = {_fold(word), _fold(normalize_keyword(word))}
+            forms.discard('')
+            if forms:
+                terms.append(forms)
+        return terms
+
+    def _candidates(self, form):
+        """n-gram 位图求交得到候选行（可能有误报，需要确认）"""
+        if len(form) == 1:
+            return self._postings.get(form, 0)
+        mask = -1
+        for i in range(len(form) - 1):
+            mask &= self._postings.get(form[i:i + 2], 0)
+            if not mask:
+                return 0
+        return mask
+
+    def _rows(self, mask):
+        bits = bin(mask)[:1:-1]
+        return [i for i, bit in enumerate(bits) if bit == '1']
+
+    def _term_mask(self, forms):
+        """单个词命中的行位图"""
+        mask = 0
+        for form in forms:
+            candidates = self._candidates(form) & ~mask
+            for i in self._rows(candidates):
+                if any(form in text for text in self._texts[i]):
+                    mask |= 1 << i
+        return mask
+
+    def match(self, query):
+        """
+        返回命中行的位图（所有词都命中）
+        查询为空时返回 -1（不过滤，与任意位图求交都不变）
+        """
+        terms = self.split_terms(query)
+        if not terms:
+            return -1
+        mask = -1
+        for forms in terms:
+            mask &= self._term_mask(forms)
+            if not mask:
+                return 0
+        return mask
@@ -0,0 +1,142 @@
+"""
+签名防重放的 nonce 存储
+
+SignatureValidator 原来把用过的 nonce 存在进程内的 dict 里，每小时整体重建一次：
+内存随流量增长、清理时卡一下，而且两个 gunicorn worker 各记各的，同一个请求换个 worker 就能重放。
+
+这里提供两种存储，接口相同：add(key, ttl) 在 key 未出现过时记录并返回 True，已存在返回 False
+- RedisNonceStore：SET key 1 NX EX ttl，一条命令完成检查和记录，所有 worker 共享，过期由 Redis 处理
+- MemoryNonceStore：进程内按过期时间分桶的环形队列，每次写入顺带清掉已到期的桶，
+  清理开销分摊到每次写入（均摊 O(1)），条目数有上限
+
+settings.SIGNATURE_NONCE_STORE 选择存储（'redis' / 'memory'，默认 'redis'），
+Redis 不可用时回退到进程内存储，并在一小段时间内不再尝试 Redis
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from common.logger import loginfo, logerror
+
+
+class MemoryNonceStore:
+    """进程内 nonce 存储（按过期时间分桶的环形队列）"""
+
+    def __init__(self, max_ttl=660, bucket_seconds=10, max_entries=200000):
+        """
+        Args:
+            max_ttl: 最长保留时间（秒），更长的 ttl 按这个值处理
+            bucket_seconds: 每个桶覆盖的时间（秒），过期时间精度
+            max_entries: 最多保留的 nonce 数，超出时提前淘汰最早到期的桶
+        """
+        self.max_ttl = max_ttl
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self.size = -(-max_ttl // bucket_seconds) + 2
+        self._ring = [[] for _ in range(self.size)]  # 桶号 % size -> 该桶到期的 key
+        self._expires = {}  # key -> 到期桶号
+        self._swept = self._epoch(time.time()) - 1  # 已清理到的桶号
+        self._lock = threading.Lock()
+
+    def _epoch(self, timestamp):
+        return int(timestamp // self.bucket_seconds)
+
+    def _sweep(self, upto):
+        """清理到期桶号不大于 upto 的 key（每个桶号只处理一次）"""
+        if upto - self._swept > self.size:
+            # 很久没有写入，环上所有桶都已到期，只需各处理一遍
+            self._swept = upto - self.size
+        while self._swept < upto:
+            self._swept += 1
+            self._drop_slot(self._swept % self.size, self._swept)
+
+    def _drop_slot(self, slot, upto):
+        expires = self._expires
+        for key in self._ring[slot]:
+            epoch = expires.get(key)
+            if epoch is not None and epoch <= upto:
+                del expires[key]
+        self._ring[slot] = []
+
+    def _evict_earliest(self, current):
+        """条目数达到上限：提前淘汰最早到期的一个桶"""
+        for epoch in range(current, current + self.size):
+            slot = epoch % self.size
+            if self._ring[slot]:
+                for key in self._ring[slot]:
+                    self._expires.pop(key, None)
+                self._ring[slot] = []
+                loginfo(f"[NONCE] 进程内nonce数量达到上限({self.max_entries})，提前淘汰一个时间桶")
+                return
+
+    def add(self, key, ttl):
+        now = time.time()
+        ttl = min(max(ttl, 1), self.max_ttl)
+        current = self._epoch(now)
+        # 桶号 epoch 的桶在 (epoch + 1) * bucket_seconds 之后才清理（只清理桶号小于当前桶号的桶），
+        # 不会早于 now + ttl
+        epoch = self._epoch(now + ttl)
+        with self._lock:
+            self._sweep(current - 1)
+            if key in self._expires:
+                return False
+            if len(self._expires) >= self.max_entries:
+                self._evict_earliest(current)
+            self._expires[key] = epoch
+            self._ring[epoch % self.size].append(key)
+        return True
+
+    def __len__(self):
+        return len(self._expires)
+
+
+class RedisNonceStore:
+    """Redis nonce 存储（所有 worker 共享）"""
+
+    KEY_PREFIX = "nonce:"
+
+    # Redis 出错后这么多秒内直接使用进程内存储
+    REDIS_RETRY_INTERVAL = 5
+
+    def __init__(self, fallback=None):
+        self._redis = None
+        self._redis_lock = threading.Lock()
+        self._redis_retry_at = 0.0
+        # Redis 不可用时的兜底
+        self._fallback = fallback or MemoryNonceStore()
+
+    def _get_redis(self):
+        if self._redis is None:
+            with self._redis_lock:
+                if self._redis is None:
+                    from django_redis import get_redis_connection
+                    self._redis = get_redis_connection("default")
+        return self._redis
+
+    def add(self, key, ttl):
+        now = time.time()
+        if now < self._redis_retry_at:
+            return self._fallback.add(key, ttl)
+        try:
+            return bool(self._get_redis().set(f"{self.KEY_PREFIX}{key}", 1, nx=True, ex=max(int(ttl), 1)))
+        except Exception as e:
+            logerror(f"[NONCE] Redis 不可用，{self.REDIS_RETRY_INTERVAL}秒内使用进程内存储: {str(e)}")
+            self._redis_retry_at = now + self.REDIS_RETRY_INTERVAL
+            return self._fallback.add(key, ttl)
+
+
+NONCE_STORES = {
+    'redis': RedisNonceStore,
+    'memory': MemoryNonceStore,
+}
+
+
+def get_nonce_store():
+    """按 settings.SIGNATURE_NONCE_STORE 创建 nonce 存储"""
+    name = getattr(settings, 'SIGNATURE_NONCE_STORE', 'redis')
+    store_class = NONCE_STORES.get(name)
+    if store_class is None:
+        logerror(f"[NONCE] 未知的 SIGNATURE_NONCE_STORE: {name}，使用 redis")
+        store_class = RedisNonceStore
+    return store_class()
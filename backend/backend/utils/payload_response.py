@@ -0,0 +1,59 @@
+"""
+带数据区间的 JSON 响应
+
+接口响应统一是 {"code": ..., "message": ..., "success": ..., "data": ...}。
+DataSecurityMiddleware 原来要把 JsonResponse 的字节解码、json.loads、加密 data、再 json.dumps 一遍。
+PayloadResponse 的字节与 JsonResponse 完全相同（data 放在最后），同时记下 data 在字节中的区间 data_span：
+- 加密时直接截取 data 的字节加密，再把密文拼回原来的位置，整个过程不解析也不重新编码 JSON
+- 响应缓存（CacheManager.set_response）会一起保存 data_span，命中缓存时还原成 PayloadResponse
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+
+def encode_envelope(code=200, message="成功", success=True, encoder=DjangoJSONEncoder, json_dumps_params=None):
+    """
+    编码响应外层（data 之前的部分）
+    :return: 以 '"data": ' 结尾的字节，后面接 data 的 JSON 和一个 "}" 就是完整的响应
+    """
+    body = json.dumps({
+        "code": code,
+        "message": message,
+        "success": success,
+        "data": None
+    }, cls=encoder, **(json_dumps_params or {})).encode('utf-8')
+    return body[:-len(b'null}')]
+
+
+class PayloadResponse(HttpResponse):
+    """
+    统一格式的 JSON 响应，data 只编码一次，并记录 data 的字节区间
+    字节内容与 JsonResponse({"code", "message", "success", "data"}) 相同
+    """
+
+    def __init__(self, data, code=200, message="成功", success=True,
+                 encoder=DjangoJSONEncoder, json_dumps_params=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        head = encode_envelope(code, message, success, encoder, json_dumps_params)
+        data_bytes = json.dumps(data, cls=encoder, **(json_dumps_params or {})).encode('utf-8')
+        super().__init__(head + data_bytes + b'}', **kwargs)
+        self.data_span = (len(head), len(head) + len(data_bytes))
+
+    @classmethod
+    def from_body(cls, body, data_span, **kwargs):
+        """用已编码好的字节和 data 区间构建响应（缓存命中、拼接响应时使用，不重新编码）"""
+        kwargs.setdefault('content_type', 'application/json')
+        response = cls.__new__(cls)
+        HttpResponse.__init__(response, body, **kwargs)
+        response.data_span = tuple(data_span)
+        return response
+
+    @property
+    def data_bytes(self):
+        """data 部分的字节，响应体已被替换为二进制（data_span 为 None）时返回 None"""
+        if self.data_span is None:
+            return None
+        start, end = self.data_span
+        return self.content[start:end]
@@ -0,0 +1,71 @@
+"""
+前缀树（名称联想）
+
+每个节点保存经过该节点的前 K 个结果（按插入时的排名），联想时只需沿输入走到对应节点，
+直接返回节点上的结果，不需要遍历子树，查询开销只与输入长度有关
+"""
+
+
+class PrefixTrie:
+    """带 top-k 的前缀树（只读，构建后不再修改）"""
+
+    # 每个节点保留的结果数（联想最多返回这么多条）
+    TOP_K = 10
+
+    def __init__(self, top_k=None):
+        self.top_k = top_k or self.TOP_K
+        # 节点: [子节点 {字符: 节点}, 结果列表 [rank]]
+        self._root = [{}, []]
+
+    def insert(self, key, rank):
+        """
+        插入一个键
+        :param key: 已规范化（小写）的名称
+        :param rank: 排名（越小越靠前），同一结果的多个键使用同一个 rank
+        """
+        node = self._root
+        for char in key:
+            children = node[0]
+            child = children.get(char)
+            if child is None:
+                child = [{}, []]
+                children[char] = child
+            node = child
+
+            ranks = node[1]
+            if rank in ranks:
+                continue
+            if len(ranks) < self.top_k:
+                ranks.append(rank)
+                ranks.sort()
+            elif rank < ranks[-1]:
+                ranks[-1] = rank
+                ranks.sort()
+
+    def _find(self, prefix):
+        node = self._root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return None
+        return node
+
+    def suggest(self, prefixes, limit=None):
+        """
+        按前缀联想
+        :param prefixes: 一个或多个前缀（如输入原文和繁转简后的形式），结果合并去重
+        :param limit: 最多返回条数（不超过 top_k）
+        :return: 排名列表（从小到大）
+        """
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+
+        ranks = set()
+        for prefix in prefixes:
+            if not prefix:
+                continue
+            node = self._find(prefix)
+            if node is not None:
+                ranks.update(node[1])
+
+        return sorted(ranks)[:limit or self.top_k]
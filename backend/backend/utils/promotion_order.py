@@ -0,0 +1,141 @@
+"""
+升学信息（promotion_info）排序
+
+详情页要求 yearly_stats 按年份降序、每年的 schools 按 Band 排序。
+MySQL 的 JSON 类型会按自己的规则重排对象的键，存进去的顺序读出来就丢了，
+所以写入时把排好的顺序存成数组（数组顺序会保留）放在 promotion_order 列：
+    {"v": 1, "years": [[年份, [学校名, ...]], ...]}
+序列化时按这个顺序重建字典，不再排序、不再用正则解析 Band。
+promotion_order 缺失或与 promotion_info 对不上时回退到实时排序（结果相同）
+"""
+import re
+from functools import lru_cache
+
+from common.logger import loginfo
+
+
+PROMOTION_ORDER_VERSION = 1
+
+
+@lru_cache(maxsize=256)
+def _parse_band_sort_key(band_str):
+    band_number = 999
+    # 匹配 "Band 1", "Band 2", "Band 3" 或 "1", "2", "3" 开头
+    match = re.search(r'Band\s*(\d)|^(\d)', band_str, re.IGNORECASE)
+    if match:
+        band_number = int(match.group(1) or match.group(2))
+
+    # 提取子级别 (A, B, C) - 匹配 "Band 1A", "Band 1B", "Band 1C" 等格式
+    sub_level = 4  # 默认无子级别
+    sub_match = re.search(r'Band\s*\d+([ABC])', band_str, re.IGNORECASE)
+    if sub_match:
+        sub_level = {'A': 1, 'B': 2, 'C': 3}[sub_match.group(1).upper()]
+
+    return (band_number, sub_level)
+
+
+def get_band_sort_key(band_str):
+    """
+    获取 Band 的排序键，用于排序
+    返回 (band_number, sub_level)
+    - band_number: 1, 2, 3, 999 (数字越小优先级越高，999表示未知)
+    - sub_level: 1(A), 2(B), 3(C), 4(无子级别), 999 (子级别越小优先级越高)
+
+    排序优先级：Band 1A > Band 1B > Band 1C > Band 1 > Band 2A > ... > 未知
+    取值只有十几种，解析结果按字符串缓存
+    """
+    if not band_str or band_str == '未知':
+        return (999, 999)
+    return _parse_band_sort_key(str(band_str).strip())
+
+
+def _school_band_key(item):
+    data = item[1]
+    return get_band_sort_key(data.get('band', '未知') if isinstance(data, dict) else '未知')
+
+
+def _sort_yearly_stats(yearly_stats):
+    """按年份降序、每年的 schools 按 Band 排序，返回新的 yearly_stats（不修改原数据）"""
+    sorted_stats = {}
+    for year, year_data in sorted(yearly_stats.items(), key=lambda x: x[0], reverse=True):
+        if isinstance(year_data, dict) and isinstance(year_data.get('schools'), dict):
+            year_data = dict(year_data)
+            year_data['schools'] = dict(sorted(year_data['schools'].items(), key=_school_band_key))
+        sorted_stats[year] = year_data
+    return sorted_stats
+
+
+def build_promotion_order(promotion_info):
+    """
+    计算 promotion_order 列（写入时调用）
+    :return: {"v": 版本号, "years": [[年份, [学校名, ...] 或 None], ...]}，没有 yearly_stats 时返回 None
+    """
+    if not isinstance(promotion_info, dict) or not isinstance(promotion_info.get('yearly_stats'), dict):
+        return None
+    try:
+        sorted_stats = _sort_yearly_stats(promotion_info['yearly_stats'])
+    except Exception:
+        # 键不可比较等异常数据，序列化时回退到实时排序
+        return None
+
+    years = []
+    for year, year_data in sorted_stats.items():
+        schools = year_data.get('schools') if isinstance(year_data, dict) else None
+        years.append([year, list(schools) if isinstance(schools, dict) else None])
+    return {"v": PROMOTION_ORDER_VERSION, "years": years}
+
+
+def _apply_promotion_order(yearly_stats, order):
+    """按 promotion_order 重建 yearly_stats；与数据对不上时返回 None"""
+    if not isinstance(order, dict) or order.get("v") != PROMOTION_ORDER_VERSION:
+        return None
+    years = order.get("years") or []
+    if len(years) != len(yearly_stats):
+        return None
+
+    sorted_stats = {}
+    try:
+        for year, school_names in years:
+            year_data = yearly_stats[year]
+            schools = year_data.get('schools') if isinstance(year_data, dict) else None
+            if isinstance(schools, dict):
+                if school_names is None or len(school_names) != len(schools):
+                    return None
+                year_data = dict(year_data)
+                year_data['schools'] = {name: schools[name] for name in school_names}
+            elif school_names is not None:
+                return None
+            sorted_stats[year] = year_data
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if len(sorted_stats) != len(yearly_stats):
+        return None
+    return sorted_stats
+
+
+def sort_yearly_stats(promotion_info, order=None):
+    """
+    对 promotion_info 中的 yearly_stats 按年份降序排序
+    并对每个年份的 schools 按照 Band 进行排序
+    解决 MySQL JSON 字段存储不保证顺序的问题
+    :param order: 写入时预先计算的 promotion_order 列，可用时直接按顺序重建
+    """
+    if not promotion_info or not isinstance(promotion_info, dict):
+        return promotion_info
+
+    if 'yearly_stats' in promotion_info and isinstance(promotion_info['yearly_stats'], dict):
+        sorted_stats = _apply_promotion_order(promotion_info['yearly_stats'], order)
+        if sorted_stats is None:
+            try:
+                sorted_stats = _sort_yearly_stats(promotion_info['yearly_stats'])
+            except Exception:
+                # 如果排序失败（例如键不是可比较的），返回原数据
+                loginfo(f"sorted_stats failed, promotion_info: {promotion_info}")
+                return promotion_info
+
+        # 返回新的字典以避免修改原数据
+        new_info = promotion_info.copy()
+        new_info['yearly_stats'] = sorted_stats
+        return new_info
+    return promotion_info
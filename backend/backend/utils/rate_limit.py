@@ -0,0 +1,151 @@
+"""
+分布式频率限制（Redis 滑动窗口计数）
+
+utils/crypto_utils.RateLimiter 的请求记录存在进程内，gunicorn 有几个 worker 实际上限就放大几倍，
+而且每次检查都要重建一遍时间戳列表。这里把计数放到 Redis，所有 worker / 节点共享同一份：
+
+滑动窗口计数：
+按固定窗口（time_window 秒）计数，估算值 = 上一窗口计数 × 上一窗口仍在滑动窗口内的比例 + 当前窗口计数，
+每次检查只读两个计数、最多写一次，O(1)。检查和计数在一个 Lua 脚本里原子完成（一次 EVALSHA），
+剩余次数也由同一个脚本返回，不需要再查一次
+
+封禁：
+超过上限后封禁 time_window × 2 秒（与原实现一致），封禁 key 带 TTL 由 Redis 自动解封。
+本地快速路径：被封禁的客户端在本 worker 内记住解封时间，封禁期间的请求不再访问 Redis
+
+Redis 不可用时回退到进程内的 RateLimiter，并在一小段时间内不再尝试 Redis
+"""
+import threading
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+from backend.utils.cache import LocalLRUCache
+from common.logger import logerror
+from utils.crypto_utils import RateLimiter
+
+
+# KEYS[1] 封禁 key，KEYS[2] 当前窗口计数，KEYS[3] 上一窗口计数
+# ARGV[1] 上限，ARGV[2] 窗口（秒），ARGV[3] 当前窗口已过去的比例，ARGV[4] 封禁时长（毫秒）
+# 返回 {是否允许, 剩余次数, 封禁剩余毫秒}
+SLIDING_WINDOW_SCRIPT = """
+local blocked = redis.call('PTTL', KEYS[1])
+if blocked > 0 then
+    return {0, 0, blocked}
+end
+
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local previous = tonumber(redis.call('GET', KEYS[3]) or '0')
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+local estimated = previous * (1 - tonumber(ARGV[3])) + current
+
+if estimated >= limit then
+    redis.call('SET', KEYS[1], '1', 'PX', ARGV[4])
+    return {0, 0, -1}
+end
+
+current = redis.call('INCR', KEYS[2])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[2], window * 2)
+end
+return {1, math.max(0, math.floor(limit - estimated - 1)), 0}
+"""
+
+
+class RedisRateLimiter:
+    """Redis 滑动窗口频率限制器（所有 worker 共享计数）"""
+
+    KEY_PREFIX = "ratelimit:"
+
+    # Redis 出错后这么多秒内直接使用进程内限制器
+    REDIS_RETRY_INTERVAL = 5
+
+    def __init__(self, max_requests: int = 100, time_window: int = 60):
+        """
+        Args:
+            max_requests: 时间窗口内的最大请求数
+            time_window: 时间窗口（秒）
+        """
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.block_seconds = time_window * 2
+        self._script = None
+        self._script_lock = threading.Lock()
+        self._redis_retry_at = 0.0
+        # 本地快速路径：已封禁的客户端 -> 解封时间
+        self._blocked = LocalLRUCache(max_entries=10000, max_bytes=4 * 1024 * 1024)
+        # Redis 不可用时的兜底
+        self._fallback = RateLimiter(max_requests=max_requests, time_window=time_window)
+
+    def _get_script(self):
+        if self._script is None:
+            with self._script_lock:
+                if self._script is None:
+                    from django_redis import get_redis_connection
+                    self._script = get_redis_connection("default").register_script(SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    def _keys(self, client_id: str, now: float):
+        # {client_id} 为 hash tag，Redis Cluster 下同一客户端的 key 落在同一个 slot
+        window_index = int(now // self.time_window)
+        base = f"{self.KEY_PREFIX}{{{client_id}}}"
+        return [f"{base}:blocked", f"{base}:{window_index}", f"{base}:{window_index - 1}"]
+
+    def _blocked_message(self, block_until: float, now: float) -> str:
+        remaining = int(block_until - now)
+        return f"请求过于频繁，请在{remaining}秒后重试"
+
+    def check(self, client_id: str) -> Tuple[bool, Optional[str], int]:
+        """
+        检查并记录一次请求
+
+        Args:
+            client_id: 客户端标识（IP、设备ID等）
+
+        Returns:
+            (is_allowed, error_message, remaining_requests)
+        """
+        now = time.time()
+
+        block_until = self._blocked.get(client_id)
+        if block_until is not None and now < block_until:
+            return False, self._blocked_message(block_until, now), 0
+
+        if now < self._redis_retry_at:
+            return self._check_local(client_id)
+
+        try:
+            elapsed = (now % self.time_window) / self.time_window
+            allowed, remaining, blocked_ms = self._get_script()(
+                keys=self._keys(client_id, now),
+                args=[self.max_requests, self.time_window, elapsed, self.block_seconds * 1000],
+            )
+        except Exception as e:
+            logerror(f"[RATE_LIMIT] Redis 不可用，{self.REDIS_RETRY_INTERVAL}秒内使用进程内限制: {str(e)}")
+            self._redis_retry_at = now + self.REDIS_RETRY_INTERVAL
+            return self._check_local(client_id)
+
+        if allowed:
+            return True, None, int(remaining)
+
+        # 刚触发限制（-1）或已在封禁中：记住解封时间，封禁期间不再访问 Redis
+        blocked_seconds = self.block_seconds if blocked_ms < 0 else blocked_ms / 1000.0
+        block_until = now + blocked_seconds
+        self._blocked.set(client_id, block_until, blocked_seconds)
+        if blocked_ms < 0:
+            return False, "请求过于频繁，已被暂时限制访问", 0
+        return False, self._blocked_message(block_until, now), 0
+
+    def _check_local(self, client_id: str) -> Tuple[bool, Optional[str], int]:
+        is_allowed, error_msg = self._fallback.is_allowed(client_id)
+        remaining = self._fallback.get_remaining_requests(client_id) if is_allowed else 0
+        return is_allowed, error_msg, remaining
+
+
+# 全局实例
+rate_limiter = RedisRateLimiter(
+    max_requests=getattr(settings, 'RATE_LIMIT_MAX_REQUESTS', 100),
+    time_window=getattr(settings, 'RATE_LIMIT_TIME_WINDOW', 60),
+)
@@ -0,0 +1,99 @@
+"""
+安全中间件的请求上下文
+
+原来频率限制、反爬虫、动态Token、数据加密几个中间件各自遍历 WHITELIST_PATHS、各自解析 X-Forwarded-For、
+各自判断 User-Agent。SecurityPipelineMiddleware 在请求进入时把这些信息解析一次放进 RequestContext，
+各阶段直接读取：
+- 客户端 IP、设备ID、User-Agent 及其识别结果（backend/utils/user_agent.py）
+- 路径标签：各阶段声明的路径前缀（白名单、需要加密的路径等）预先编译成前缀树，
+  一次遍历得到当前路径命中的全部标签
+"""
+from backend.utils.user_agent import classify_request
+
+
+class PathTagTrie:
+    """
+    路径标签前缀树（只读，构建后不再修改）
+    每个节点保存从根到该节点路径上所有前缀的标签并集，匹配时只需走到最深的节点
+    """
+
+    def __init__(self, rules):
+        """
+        :param rules: [(路径前缀, 标签), ...]，与 path.startswith(前缀) 的语义一致
+        """
+        terminal = {}
+        for prefix, tag in rules:
+            terminal.setdefault(prefix, set()).add(tag)
+
+        # 节点：[子节点 {字符: 节点}, 标签 frozenset]
+        # 按长度从短到长插入：创建节点时，路径上更短的前缀都已插入，直接继承父节点的标签即可
+        self._root = [{}, frozenset(terminal.get('', ()))]
+        for prefix in sorted(terminal, key=len):
+            node = self._root
+            for char in prefix:
+                child = node[0].get(char)
+                if child is None:
+                    child = node[0][char] = [{}, node[1]]
+                node = child
+            node[1] = node[1] | terminal[prefix]
+
+    def match(self, path):
+        """返回 path 命中的所有前缀的标签"""
+        node = self._root
+        for char in path:
+            child = node[0].get(char)
+            if child is None:
+                break
+            node = child
+        return node[1]
+
+
+class RequestContext:
+    """一次请求的安全相关信息（由 SecurityPipelineMiddleware 创建，挂在 request.security_context 上）"""
+
+    def __init__(self, request, path_trie=None):
+        meta = request.META
+        self.request = request
+        self.path = request.path
+        self.user_agent = meta.get('HTTP_USER_AGENT', '')
+        self.device_id = meta.get('HTTP_X_DEVICE_ID') or meta.get('HTTP_X_DEVICE_FINGERPRINT')
+
+        x_forwarded_for = meta.get('HTTP_X_FORWARDED_FOR')
+        if x_forwarded_for:
+            self.client_ip = x_forwarded_for.split(',')[0].strip()
+        else:
+            self.client_ip = meta.get('REMOTE_ADDR', 'unknown')
+
+        # 路径标签（白名单、需要加密等），由各阶段的 path_rules 决定
+        self.tags = path_trie.match(self.path) if path_trie is not None else frozenset()
+
+        # 以下由各阶段填写
+        self.is_verified_seo_bot = False
+        self.rate_limit_remaining = None
+
+    @property
+    def ua_verdict(self):
+        """User-Agent 识别结果（同一个请求只识别一次）"""
+        return classify_request(self.request)
+
+    @property
+    def client_id(self):
+        """
+        客户端唯一标识（频率限制用）
+        优先级：Device-ID > IP
+        """
+        if self.device_id:
+            return f"device:{self.device_id}"
+        return f"ip:{self.client_ip}"
+
+    def has_tag(self, tag):
+        return tag in self.tags
+
+
+def get_request_context(request):
+    """取请求的上下文，没有经过 SecurityPipelineMiddleware 时现场创建（不带路径标签）"""
+    context = getattr(request, 'security_context', None)
+    if context is None:
+        context = RequestContext(request)
+        request.security_context = context
+    return context
@@ -0,0 +1,49 @@
+"""
+学校别名
+
+别名来自中学 banding 信息 Excel，由 common/primary_data/export_school_aliases.py 导出为
+common/data/school_aliases.json（路径可通过 settings.SCHOOL_ALIASES_FILE 覆盖）
+"""
+import json
+import os
+
+from django.conf import settings
+
+from common.logger import logerror
+
+
+# backend/backend/utils -> backend（不依赖启动时的工作目录）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def get_aliases_file():
+    return getattr(
+        settings, 'SCHOOL_ALIASES_FILE',
+        os.path.join(PROJECT_ROOT, 'common', 'data', 'school_aliases.json')
+    )
+
+
+def load_school_aliases(school_type):
+    """
+    读取某类学校的别名
+    :param school_type: 'primary' / 'secondary'
+    :return: {学校名称: [别名...]}，简体名和繁体名都可以作为键
+    """
+    path = get_aliases_file()
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        logerror(f"读取学校别名失败: {path}, {e}")
+        return {}
+
+    aliases = {}
+    for item in data.get(school_type) or []:
+        names = item.get('aliases') or []
+        for key in ('school_name', 'school_name_traditional'):
+            if item.get(key):
+                aliases[item[key]] = names
+    return aliases
@@ -0,0 +1,380 @@
+"""
+学校列表内存快照（列式存储）
+
+tb_primary_schools / tb_secondary_schools 都只有几百行，列表页的筛选、排序、分页可以完全在进程内完成：
+- 从数据库一次性读出全部行，构建时按排序键（sort_key）在进程内排序：
+  列表页顺序和游标定位用的是同一套比较规则，不依赖 MySQL 的排序规则（collation）
+- 每个筛选字段存成一列，卡片数据在构建快照时预先序列化
+- 查询时逐列过滤出行号（行号本身就是排好序的），再切片分页，不再有 COUNT / ORDER BY / LIMIT
+
+位图索引：
+每个筛选列按取值建一张位图（Python int，第 i 位表示第 i 行），多条件筛选就是位图按位与，
+分面计数（选中某个取值后会有多少所学校）就是与运算后数 1 的个数；
+名称关键字走 n-gram 倒排索引（见 ngram_index.py），结果同样是位图
+
+推荐接口用的相似学校索引（见 neighbour_index.py）、热门学校等派生数据也挂在快照上，
+随快照一起重建
+
+游标分页：
+游标记录上一页最后一行的 ID 和排序键，下一页从该行之后开始；数据更新后该行不存在时，
+按排序键在当前快照中二分定位（行本身就按排序键排好序），不会重复或跳过仍存在的学校
+
+快照按 (数据集代数, 日期) 缓存：数据导入递增缓存代数后自动重建；
+卡片中的申请状态与日期相关，跨天也会重建
+"""
+import base64
+import bisect
+import json
+import threading
+import time
+
+from backend.utils.application_status import get_utc8_now
+from backend.utils.cache import CacheManager
+from backend.utils.neighbour_index import NeighbourIndex
+from backend.utils.ngram_index import NgramIndex
+from backend.utils.prefix_trie import PrefixTrie
+from backend.utils.text_converter import normalize_keyword
+from common.logger import loginfo
+
+
+class SchoolSnapshot:
+    """
+    一份只读的列式快照
+    行号即排序位置：rows[0] 是列表页第一条
+    """
+
+    # 参与关键字搜索的名称列
+    NAME_COLUMNS = ('school_name', 'school_name_traditional', 'school_name_english')
+    # 别名列（可选，值为别名列表），参与名称联想
+    ALIAS_COLUMN = 'aliases'
+
+    def __init__(self, ids, cards, columns, sort_keys=None):
+        self.ids = ids
+        self.cards = cards
+        self.columns = columns
+        # 每行的排序键（与列表页 ORDER BY 一致的元组），用于游标分页
+        self.sort_keys = sort_keys
+        self.size = len(ids)
+        self.positions = {school_id: i for i, school_id in enumerate(ids)}
+
+        # 关键字搜索用的名称 n-gram 倒排索引
+        self.keyword_index = NgramIndex(
+            list(zip(*(columns[name] for name in self.NAME_COLUMNS)))
+        )
+        self._prefix_index = None
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+        self._bitmaps = {}
+        self._all_mask = (1 << self.size) - 1
+
+    @classmethod
+    def build(cls, schools, serialize, fields, derived=None, sort_key=None):
+        """
+        构建快照
+        :param schools: 模型实例（没有 sort_key 时需已按列表页排序）
+        :param serialize: 卡片序列化函数
+        :param fields: 需要作为列保存的模型字段
+        :param derived: {列名: 函数(card)}，从卡片数据派生的列（如申请状态）
+        :param sort_key: 函数(school)，返回列表页排序的元组（最后一项为 ID），
+                         行按它升序排列，游标分页也用它定位
+        """
+        derived = derived or {}
+        ids = []
+        cards = []
+        sort_keys = None
+        columns = {name: [] for name in list(fields) + list(derived)}
+
+        if sort_key:
+            keyed = sorted(((tuple(sort_key(school)), school) for school in schools), key=lambda item: item[0])
+            sort_keys = [key for key, _ in keyed]
+            schools = [school for _, school in keyed]
+
+        for school in schools:
+            card = serialize(school)
+            ids.append(school.id)
+            cards.append(card)
+            for name in fields:
+                columns[name].append(getattr(school, name))
+            for name, func in derived.items():
+                columns[name].append(func(card))
+
+        return cls(ids, cards, columns, sort_keys)
+
+    def bitmap(self, name):
+        """
+        列的位图索引 {取值: 位图}，每个快照只构建一次
+        """
+        bitmaps = self._bitmaps.get(name)
+        if bitmaps is None:
+            bitmaps = {}
+            for i, value in enumerate(self.columns[name]):
+                bitmaps[value] = bitmaps.get(value, 0) | (1 << i)
+            self._bitmaps[name] = bitmaps
+        return bitmaps
+
+    @staticmethod
+    def count(mask):
+        """位图中 1 的个数（兼容 Python 3.9，没有 int.bit_count）"""
+        return bin(mask).count('1')
+
+    def _condition_masks(self, equals=None, contains=None, keyword=None):
+        """
+        把每个筛选条件转成位图
+        :return: {列名: 位图}，关键字条件的列名为 'keyword'
+        """
+        masks = {}
+
+        for name, value in (equals or {}).items():
+            if value:
+                masks[name] = self.bitmap(name).get(value, 0)
+
+        for name, value in (contains or {}).items():
+            if value:
+                # 在不同取值上做包含判断，再合并对应的位图（取值数远少于行数）
+                needle = value.casefold()
+                mask = 0
+                for column_value, bitmap in self.bitmap(name).items():
+                    if needle in (column_value or '').casefold():
+                        mask |= bitmap
+                masks[name] = mask
+
+        if keyword and keyword.strip():
+            masks['keyword'] = self.keyword_index.match(keyword)
+
+        return masks
+
+    def match(self, equals=None, contains=None, keyword=None):
+        """返回匹配行的位图"""
+        mask = self._all_mask
+        for condition_mask in self._condition_masks(equals, contains, keyword).values():
+            mask &= condition_mask
+        return mask
+
+    @staticmethod
+    def to_rows(mask):
+        """位图转为行号列表（从小到大，即保持排序）"""
+        bits = bin(mask)[:1:-1]
+        return [i for i, bit in enumerate(bits) if bit == '1']
+
+    def filter(self, equals=None, contains=None, keyword=None):
+        """
+        过滤，返回匹配的行号（保持排序）
+        :param equals: {列名: 值}，精确匹配（对应 SQL =），值为空的条件会被忽略
+        :param contains: {列名: 值}，不区分大小写的包含（对应 icontains）
+        :param keyword: 名称关键字（简体/繁体/英文名称，繁体关键字会转简体后一起匹配；
+                        多个词用空格分隔，需全部命中）
+        """
+        return self.to_rows(self.match(equals, contains, keyword))
+
+    def facet_counts(self, facets, equals=None, contains=None, keyword=None):
+        """
+        分面计数：在当前筛选条件下，每个分面再选某个取值时会匹配多少所学校
+        计算某个分面时忽略该分面自身的条件（切换同一分面的取值不受当前选择影响）
+        :param facets: 需要计数的列名
+        :return: {列名: {取值: 数量}}，空值不返回；数量为 0 的取值也会返回（前端可置灰）
+        """
+        masks = self._condition_masks(equals, contains, keyword)
+
+        result = {}
+        for name in facets:
+            base = self._all_mask
+            for condition_name, condition_mask in masks.items():
+                if condition_name != name:
+                    base &= condition_mask
+
+            result[name] = {
+                value: self.count(base & bitmap)
+                for value, bitmap in self.bitmap(name).items()
+                if value
+            }
+        return result
+
+    def prefix_index(self) -> PrefixTrie:
+        """
+        名称联想用的前缀树，每个快照只构建一次
+        键为各名称、别名及其繁转简形式（小写），排名即行号（列表页排序）
+        """
+        trie = self._prefix_index
+        if trie is None:
+            trie = PrefixTrie()
+            aliases = self.columns.get(self.ALIAS_COLUMN) or [()] * self.size
+            for i in range(self.size):
+                names = [self.columns[name][i] for name in self.NAME_COLUMNS]
+                names.extend(aliases[i] or ())
+                keys = set()
+                for name in names:
+                    if name:
+                        keys.add(name.casefold())
+                        keys.add(normalize_keyword(name).casefold())
+                for key in keys:
+                    trie.insert(key, i)
+            self._prefix_index = trie
+        return trie
+
+    def suggest(self, prefix, limit=None):
+        """
+        名称联想：返回名称（或别名）以 prefix 开头的行号，按列表页排序
+        """
+        prefix = (prefix or '').strip()
+        if not prefix:
+            return []
+        prefixes = {prefix.casefold(), normalize_keyword(prefix).casefold()}
+        return self.prefix_index().suggest(prefixes, limit=limit)
+
+    def derived(self, name, build):
+        """
+        快照上的派生数据（如热门学校列表），每个快照只构建一次
+        :param build: 函数(snapshot)，返回派生数据
+        """
+        value = self._derived.get(name)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = build(self)
+                    self._derived[name] = value
+        return value
+
+    def neighbour_index(self, group, weights) -> NeighbourIndex:
+        """
+        相似学校索引，每个快照只构建一次
+        :param group: 分组列名（必须相同，如 district）
+        :param weights: {列名: 权重}，取值相同时加分
+        """
+        names = tuple(weights)
+        return self.derived(
+            ('neighbours', group) + names,
+            lambda snapshot: NeighbourIndex(
+                snapshot.columns[group],
+                list(zip(*(snapshot.columns[name] for name in names))) or [()] * snapshot.size,
+                [weights[name] for name in names],
+            )
+        )
+
+    def page(self, rows, page, page_size):
+        """分页，返回当前页的卡片数据"""
+        start_index = (page - 1) * page_size
+        if start_index < 0:
+            raise ValueError("Negative indexing is not supported.")
+        return [self.cards[i] for i in rows[start_index:start_index + page_size]]
+
+    def encode_cursor(self, row):
+        """行号 -> 不透明游标（URL 安全的 base64）"""
+        payload = {'id': self.ids[row]}
+        if self.sort_keys is not None:
+            payload['key'] = list(self.sort_keys[row])
+        raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, key_types=None):
+        """
+        解析游标
+        :param key_types: 排序键每一项的类型（与 sort_key 返回的元组对应），None 表示游标不带排序键
+        :raises ValueError: 游标格式不正确（包括排序键的长度或类型不符）
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw.decode('utf-8'))
+            school_id = int(payload['id'])
+            key = payload.get('key')
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise ValueError("Invalid cursor")
+        if key is None:
+            return school_id, None
+        if key_types is None or not isinstance(key, list) or len(key) != len(key_types):
+            raise ValueError("Invalid cursor")
+
+        values = []
+        for value, expected in zip(key, key_types):
+            # JSON 不区分 1 和 1.0，浮点项接受整数；bool 是 int 的子类，需要精确比较类型
+            if expected is float and type(value) is int:
+                value = float(value)
+            if type(value) is not expected:
+                raise ValueError("Invalid cursor")
+            values.append(value)
+        return school_id, tuple(values)
+
+    def _cursor_position(self, cursor):
+        """
+        游标对应的行号（游标行之后的行都在它后面）
+        游标行已不在快照中时，返回最后一个排序键不大于游标排序键的行号（可能为 -1）
+        """
+        school_id, key = cursor
+        position = self.positions.get(school_id)
+        if position is not None:
+            return position
+        if key is None or self.sort_keys is None:
+            raise ValueError("Cursor is no longer valid")
+
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.sort_keys[middle] <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1
+
+    def cursor_page(self, rows, cursor, page_size):
+        """
+        游标分页
+        :param rows: filter() 返回的行号（升序）
+        :param cursor: decode_cursor() 的结果，None 表示第一页
+        :return: (当前页卡片数据, 下一页游标或 None)
+        """
+        start_index = 0
+        if cursor is not None:
+            start_index = bisect.bisect_right(rows, self._cursor_position(cursor))
+
+        page_rows = rows[start_index:start_index + page_size]
+        next_cursor = None
+        if page_rows and start_index + page_size < len(rows):
+            next_cursor = self.encode_cursor(page_rows[-1])
+        return [self.cards[i] for i in page_rows], next_cursor
+
+
+class SnapshotStore:
+    """
+    按 (数据集代数, 日期) 缓存快照，版本变化时重建
+    每个 worker 一份，重建期间其他线程等待同一次构建
+    """
+
+    def __init__(self, name, builder):
+        """
+        :param name: 快照名称（用于日志）
+        :param builder: 无参函数，返回 SchoolSnapshot
+        """
+        self.name = name
+        self._builder = builder
+        self._lock = threading.Lock()
+        self._current = None  # (version, snapshot)
+
+    @staticmethod
+    def _current_version():
+        return (CacheManager.get_generation(), get_utc8_now().date())
+
+    def get(self) -> SchoolSnapshot:
+        version = self._current_version()
+        current = self._current
+        if current is not None and current[0] == version:
+            return current[1]
+
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] == version:
+                return current[1]
+
+            start_time = time.time()
+            snapshot = self._builder()
+            self._current = (version, snapshot)
+            loginfo(
+                f"[SNAPSHOT] {self.name} rebuilt | "
+                f"Rows: {snapshot.size} | Generation: {version[0]} | Date: {version[1]} | "
+                f"Time: {(time.time() - start_time) * 1000:.2f}ms"
+            )
+            return snapshot
+
+    def invalidate(self):
+        """丢弃当前快照，下次访问时重建"""
+        self._current = None
@@ -0,0 +1,137 @@
+"""
+申请状态时间线
+
+calculate_s1_p1_status / calculate_transfer_status 每次都要用正则解析自由格式的日期文本。
+而对同一份 transfer_info，状态只会在少数几个日期发生变化：
+- 开始日期 d 当天（开放）
+- 截止日期前 7 天（进入 deadline）
+- 截止日期次日（关闭）
+- 只有开始日期时，第 91 天（关闭）
+- "每年X月" 规则所在月份的第一天和下个月第一天
+
+写入时（与 list_card 一起）只在这些日期上调用原有的计算函数，把结果压缩成
+[[生效日期, 状态], ...]，存到 status_timeline 列。查询某天的状态只需在几个日期中二分查找，
+不再解析日期文本，结果与直接调用计算函数完全一致。
+
+时间线只覆盖编译时的前一年到后两年，超出范围时回退到实时计算
+"""
+import bisect
+from datetime import date, timedelta
+
+from backend.utils.application_status import (
+    get_utc8_now, parse_date_string, parse_month_from_text,
+    calculate_s1_p1_status, calculate_transfer_status,
+)
+
+
+TIMELINE_VERSION = 1
+
+# 状态变化的日期相对于文本中日期的偏移（见模块说明）
+BOUNDARY_OFFSETS = (0, -7, 1, 91)
+
+# 各类申请状态使用的计算函数
+STATUS_CALCULATORS = {
+    '小一': calculate_s1_p1_status,
+    'S1': calculate_s1_p1_status,
+    '插班': calculate_transfer_status,
+}
+
+
+def _boundary_dates(info, valid_from, valid_until):
+    """状态可能发生变化的日期（只多不少）"""
+    boundaries = {valid_from}
+    for value in info.values():
+        if not isinstance(value, str):
+            continue
+
+        parsed = parse_date_string(value)
+        if parsed:
+            for offset in BOUNDARY_OFFSETS:
+                boundaries.add(parsed + timedelta(days=offset))
+
+        month = parse_month_from_text(value) if '每年' in value else None
+        if month:
+            for year in range(valid_from.year, valid_until.year + 1):
+                boundaries.add(date(year, month, 1))
+                boundaries.add(date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1))
+
+    return sorted(d for d in boundaries if valid_from <= d <= valid_until)
+
+
+def compile_status_timeline(info, calculate, valid_from, valid_until):
+    """
+    把一类申请信息编译成状态时间线
+    :return: [[生效日期(ISO), 状态], ...]，第一项的日期为 valid_from
+    """
+    changes = []
+    for boundary in _boundary_dates(info, valid_from, valid_until):
+        status = calculate(info, today=boundary)
+        if not changes or changes[-1][1] != status:
+            changes.append([boundary.isoformat(), status])
+    return changes
+
+
+def build_status_timeline(transfer_info, kinds, today=None):
+    """
+    编译一所学校的申请状态时间线（status_timeline 列的存储格式）
+    :param transfer_info: 学校的 transfer_info
+    :param kinds: 需要的申请类型，如 ('小一', '插班')
+    """
+    today = today or get_utc8_now().date()
+    valid_from = date(today.year - 1, 1, 1)
+    valid_until = date(today.year + 2, 12, 31)
+
+    compiled = {}
+    if isinstance(transfer_info, dict):
+        for kind in kinds:
+            info = transfer_info.get(kind)
+            if info and isinstance(info, dict):
+                compiled[kind] = compile_status_timeline(
+                    info, STATUS_CALCULATORS[kind], valid_from, valid_until
+                )
+
+    return {
+        "v": TIMELINE_VERSION,
+        "from": valid_from.isoformat(),
+        "until": valid_until.isoformat(),
+        "kinds": compiled,
+    }
+
+
+def is_timeline_valid(timeline, today):
+    """时间线是否可用于 today（版本一致且在覆盖范围内）"""
+    if not isinstance(timeline, dict) or timeline.get("v") != TIMELINE_VERSION:
+        return False
+    day = today.isoformat()
+    return timeline["from"] <= day <= timeline["until"]
+
+
+def status_on(changes, today):
+    """从时间线查询某天的状态"""
+    index = bisect.bisect_right([change[0] for change in changes], today.isoformat()) - 1
+    return changes[index][1] if index >= 0 else None
+
+
+def get_statuses(transfer_info, timeline, kinds, today=None, debug_school_id=None):
+    """
+    各类申请当天的状态
+    时间线可用时直接查表，否则实时计算（结果相同）
+    :return: {申请类型: 状态}，只包含 transfer_info 中存在的类型
+    """
+    today = today or get_utc8_now().date()
+    statuses = {}
+    if not isinstance(transfer_info, dict):
+        return statuses
+
+    use_timeline = is_timeline_valid(timeline, today)
+    for kind in kinds:
+        info = transfer_info.get(kind)
+        if not info or not isinstance(info, dict):
+            continue
+        if use_timeline and kind in timeline["kinds"]:
+            statuses[kind] = status_on(timeline["kinds"][kind], today)
+        elif kind == '插班':
+            statuses[kind] = calculate_transfer_status(info, debug_school_id=debug_school_id, today=today)
+        else:
+            statuses[kind] = STATUS_CALCULATORS[kind](info, today=today)
+    return statuses
@@ -0,0 +1,94 @@
+"""
+User-Agent 识别（反爬虫 / 搜索引擎）
+
+原来每个中间件各自维护一份 UA 列表：AntiCrawlerMiddleware 逐个尝试 22 个爬虫正则和 8 个白名单正则，
+DynamicTokenMiddleware、SignatureMiddleware 又各自再匹配一遍搜索引擎（每个标识都要 lower() 一次 UA）。
+这里把各类标识合并成一个忽略大小写的多选正则，一次 search 判断是否命中，结果按 UA 字符串缓存：
+
+- 同一个 UA（绝大多数请求来自少数几种浏览器 UA）只匹配一次，之后直接取缓存
+- 每个请求只识别一次，结果挂在 request.ua_verdict 上，后面的中间件直接复用
+- 命中后才按列表顺序找出具体是哪个标识（用于日志），与原来逐个匹配的结果一致
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+
+# 爬虫User-Agent黑名单（常见爬虫标识）
+CRAWLER_USER_AGENTS = [
+    r'bot', r'crawl', r'spider', r'scrape', r'curl', r'wget',
+    r'python-requests', r'scrapy', r'httpclient', r'okhttp',
+    r'java/', r'go-http-client', r'axios', r'node-fetch',
+    r'headless', r'phantom', r'selenium', r'puppeteer',
+    r'mechanize', r'aiohttp', r'httpx', r'urllib'
+]
+
+# 白名单User-Agent（允许的爬虫，如搜索引擎）
+WHITELIST_USER_AGENTS = [
+    r'Googlebot', r'Bingbot', r'Slurp', r'DuckDuckBot',
+    r'Baiduspider', r'YandexBot', r'Sogou', r'Exabot'
+]
+
+# 搜索引擎User-Agent（SEO识别，比反爬虫白名单多了 Bytespider）
+SEO_USER_AGENTS = WHITELIST_USER_AGENTS + [r'Bytespider']
+
+# 缓存的 UA 数量上限；超长的 UA（多半是伪造的）不进缓存，避免撑大内存
+VERDICT_CACHE_SIZE = 4096
+MAX_CACHED_USER_AGENT_LENGTH = 512
+
+
+class UserAgentVerdict(NamedTuple):
+    """UA 识别结果，各字段为命中的标识（未命中为 None）"""
+    whitelist: Optional[str]
+    search_engine: Optional[str]
+    crawler: Optional[str]
+
+
+class _PatternGroup:
+    """一组标识编译成一个多选正则"""
+
+    def __init__(self, patterns):
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.combined = re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+    def match(self, user_agent):
+        """返回列表中第一个命中的标识"""
+        if not self.combined.search(user_agent):
+            return None
+        for pattern in self.patterns:
+            if pattern.search(user_agent):
+                return pattern.pattern
+        return None
+
+
+_whitelist = _PatternGroup(WHITELIST_USER_AGENTS)
+_search_engines = _PatternGroup(SEO_USER_AGENTS)
+_crawlers = _PatternGroup(CRAWLER_USER_AGENTS)
+
+
+def _classify(user_agent):
+    return UserAgentVerdict(
+        whitelist=_whitelist.match(user_agent),
+        search_engine=_search_engines.match(user_agent),
+        crawler=_crawlers.match(user_agent),
+    )
+
+
+_classify_cached = lru_cache(maxsize=VERDICT_CACHE_SIZE)(_classify)
+
+
+def classify_user_agent(user_agent):
+    """识别 UA（按 UA 字符串缓存）"""
+    user_agent = user_agent or ''
+    if len(user_agent) > MAX_CACHED_USER_AGENT_LENGTH:
+        return _classify(user_agent)
+    return _classify_cached(user_agent)
+
+
+def classify_request(request):
+    """识别请求的 UA，同一个请求只识别一次"""
+    verdict = getattr(request, 'ua_verdict', None)
+    if verdict is None:
+        verdict = classify_user_agent(request.META.get('HTTP_USER_AGENT', ''))
+        request.ua_verdict = verdict
+    return verdict
@@ -19,6 +19,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
 from backend.models.tb_primary_schools import TbPrimarySchools
+from backend.utils.cache import CacheManager
+from backend.utils.list_card import refresh_list_cards_after_import
 
 
 def clean_value(value):
@@ -269,3 +271,8 @@ def main():
 if __name__ == '__main__':
     main()
 
+    # 数据已变更：重新生成列表卡片（导入多用 update/bulk 写入，不经过 save()）
+    refresh_list_cards_after_import()
+
+    # 数据已变更：递增缓存代数，让线上学校缓存一次性失效
+    CacheManager.clear_school_cache_after_import()
@@ -0,0 +1,14 @@
+-- 为 tb_primary_schools / tb_secondary_schools 添加当天申请状态列 application_status（带索引）
+-- 说明：统计开放申请数时不再对 transfer_info 的 JSON 文本做 LIKE 扫描，改为按该列分组计数；
+--       由 save()、数据导入脚本（refresh_all_list_cards）和每日申请状态检查（check_application_status）维护
+-- 执行后运行一次：python manage.py rebuild_list_cards
+
+ALTER TABLE tb_primary_schools
+ADD COLUMN application_status VARCHAR(20) NULL COMMENT '当天申请状态（open/deadline/closed）';
+
+CREATE INDEX idx_pri_app_status ON tb_primary_schools (application_status);
+
+ALTER TABLE tb_secondary_schools
+ADD COLUMN application_status VARCHAR(20) NULL COMMENT '当天申请状态（open/deadline/closed）';
+
+CREATE INDEX idx_sec_app_status ON tb_secondary_schools (application_status);
@@ -0,0 +1,10 @@
+-- 为 tb_primary_schools / tb_secondary_schools 添加列表卡片列 list_card
+-- 说明：列表页卡片中与日期无关的部分在写入时预计算（见 backend/utils/list_card.py），
+--       构建列表快照时只需读取这一列，不再读取 secondary_info / promotion_info 等大字段
+-- 执行后运行一次：python manage.py rebuild_list_cards
+
+ALTER TABLE tb_primary_schools
+ADD COLUMN list_card JSON NULL COMMENT '列表卡片（预计算，不含申请状态）';
+
+ALTER TABLE tb_secondary_schools
+ADD COLUMN list_card JSON NULL COMMENT '列表卡片（预计算，不含申请状态）';
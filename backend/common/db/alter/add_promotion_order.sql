@@ -0,0 +1,7 @@
+-- 为 tb_primary_schools 添加升学信息顺序列 promotion_order
+-- 说明：MySQL JSON 类型不保留对象键的顺序，详情页每次都要对 promotion_info.yearly_stats 重新排序；
+--       写入时把排好的顺序存成数组（见 backend/utils/promotion_order.py），序列化时直接按顺序重建
+-- 执行后运行一次：python manage.py rebuild_list_cards
+
+ALTER TABLE tb_primary_schools
+ADD COLUMN promotion_order JSON NULL COMMENT '升学信息顺序（预计算）';
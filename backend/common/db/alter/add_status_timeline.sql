@@ -0,0 +1,10 @@
+-- 为 tb_primary_schools / tb_secondary_schools 添加申请状态时间线列 status_timeline
+-- 说明：写入时把 transfer_info 编译成各申请类型的状态变化日期（见 backend/utils/status_timeline.py），
+--       构建列表快照时按日期查表，不再逐行解析日期文本
+-- 执行后运行一次：python manage.py rebuild_list_cards
+
+ALTER TABLE tb_primary_schools
+ADD COLUMN status_timeline JSON NULL COMMENT '申请状态时间线（预计算）';
+
+ALTER TABLE tb_secondary_schools
+ADD COLUMN status_timeline JSON NULL COMMENT '申请状态时间线（预计算）';
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+导出学校别名
+从中学 banding 信息 Excel 中读取别名（alias_simple_name / alias_tranditional_name），
+写入 common/data/school_aliases.json，供学校名称联想（/api/schools/suggest）使用
+"""
+
+import os
+import sys
+import django
+import json
+import pandas as pd
+from pathlib import Path
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+# 设置 Django 环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from backend.utils.cache import CacheManager
+from calculate_primary_band1_rate import parse_alias_list
+
+
+def load_secondary_aliases(band_file):
+    """
+    读取中学别名
+    :return: [{"school_name": 简体名, "school_name_traditional": 繁体名, "aliases": [别名...]}]
+    """
+    print(f"正在读取中学别名: {band_file}")
+
+    df = pd.read_excel(band_file)
+    result = []
+
+    for idx, row in df.iterrows():
+        school_name = row.get('school_name')
+        if pd.isna(school_name) or not str(school_name).strip():
+            continue
+
+        aliases = []
+        for column in ('alias_simple_name', 'alias_tranditional_name'):
+            value = row.get(column)
+            if pd.notna(value) and str(value).strip():
+                for alias in parse_alias_list(str(value)):
+                    if alias not in aliases:
+                        aliases.append(alias)
+
+        if not aliases:
+            continue
+
+        school_name_traditional = row.get('school_name_tranditional')
+        result.append({
+            'school_name': str(school_name).strip(),
+            'school_name_traditional': (
+                str(school_name_traditional).strip() if pd.notna(school_name_traditional) else ''
+            ),
+            'aliases': aliases,
+        })
+
+    print(f"已读取 {len(result)} 所中学的别名")
+    return result
+
+
+def main():
+    """
+    主函数
+    :return: 是否已写入 school_aliases.json
+    """
+    print("=" * 80)
+    print("导出学校别名")
+    print("=" * 80)
+
+    data_dir = Path(__file__).parent
+    band_file = data_dir / '中学banding信息_new.xlsx'
+    if not band_file.exists():
+        print(f"\n❌ 错误：找不到中学 banding 信息文件: {band_file}")
+        return False
+
+    output_file = data_dir.parent / 'data' / 'school_aliases.json'
+    data = {
+        'secondary': load_secondary_aliases(band_file),
+    }
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    print(f"\n✅ 已写入: {output_file}")
+    return True
+
+
+if __name__ == '__main__':
+    # 别名在构建学校快照时读取：写入成功后递增缓存代数，让各进程重建联想索引
+    if main():
+        CacheManager.clear_school_cache_after_import()
@@ -8,37 +8,26 @@ import time
 from typing import Dict, Optional, Tuple
 import os
 
+from backend.utils.nonce_store import get_nonce_store
+
 
 class SignatureValidator:
     """
     签名验证器
     """
     
-    def __init__(self, secret_key: str = None, valid_api_keys: list = None):
+    def __init__(self, secret_key: str = None, valid_api_keys: list = None, nonce_store=None):
         """
         初始化签名验证器
         
         Args:
             secret_key: API密钥，用于签名验证
             valid_api_keys: 有效的API Key列表
+            nonce_store: 防重放的nonce存储（backend/utils/nonce_store.py），默认按配置创建
         """
         self.secret_key = secret_key or os.environ.get('API_SECRET', '6vz1c3AhSq3SvGm-rIBrKYCGNcvbhTf6UlAGTZLs8Pk')
         self.valid_api_keys = valid_api_keys or ['betterschool-client-v1']
-        self.nonce_cache = {}  # 用于防重放攻击的nonce缓存
-        self.cache_cleanup_interval = 3600  # 每小时清理一次缓存
-        self.last_cleanup = time.time()
-    
-    def _cleanup_nonce_cache(self):
-        """清理过期的nonce缓存"""
-        current_time = time.time()
-        if current_time - self.last_cleanup > self.cache_cleanup_interval:
-            # 清理5分钟前的nonce
-            expired_time = current_time - 300
-            self.nonce_cache = {
-                k: v for k, v in self.nonce_cache.items() 
-                if v > expired_time
-            }
-            self.last_cleanup = current_time
+        self.nonce_store = nonce_store or get_nonce_store()  # 用于防重放攻击的nonce存储
     
     def _generate_signature(
         self, 
@@ -89,9 +78,6 @@ class SignatureValidator:
         Returns:
             (is_valid, error_message)
         """
-        # 清理过期的nonce缓存
-        self._cleanup_nonce_cache()
-        
         # 验证必要参数
         if not all([timestamp, nonce, api_key, signature]):
             return False, "缺少必要的签名参数"
@@ -112,11 +98,6 @@ class SignatureValidator:
         if time_diff > time_window:
             return False, f"请求已过期（时间差: {time_diff}秒）"
         
-        # 验证nonce（防重放攻击）
-        nonce_key = f"{api_key}:{nonce}:{timestamp}"
-        if nonce_key in self.nonce_cache:
-            return False, "检测到重放攻击"
-        
         # 生成期望的签名
         expected_signature = self._generate_signature(
             request_time, nonce, api_key, params, body
@@ -126,8 +107,12 @@ class SignatureValidator:
         if signature != expected_signature:
             return False, "签名验证失败"
         
-        # 记录nonce（防重放）
-        self.nonce_cache[nonce_key] = current_time
+        # 验证并记录nonce（防重放攻击）：签名通过后才写入，避免伪造请求占满存储
+        # 时间戳离开时间窗口之前都需要记住这个nonce
+        nonce_key = f"{api_key}:{nonce}:{timestamp}"
+        nonce_ttl = request_time + time_window - current_time + 1
+        if not self.nonce_store.add(nonce_key, nonce_ttl):
+            return False, "检测到重放攻击"
         
         return True, None
     
@@ -161,7 +146,7 @@ class SignatureValidator:
 
 class RateLimiter:
     """
-    频率限制器（简单实现，生产环境建议使用Redis）
+    进程内频率限制器（简单实现；线上使用 backend/utils/rate_limit.py 的 Redis 版本，本类作为 Redis 不可用时的兜底）
     """
     
     def __init__(self, max_requests: int = 100, time_window: int = 60):
@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import json
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
@@ -7,13 +8,33 @@ from django.conf import settings
 
 class DataEncryptor:
     """
-    数据加密工具类 (AES-CBC模式)
+    数据加密工具类
+
+    加密格式（版本）：
+    - v1: AES-CBC + PKCS7，{"encrypted": true, "iv": ..., "payload": ...}（原有格式，没有 "v" 字段）
+    - v2: AES-256-GCM，{"encrypted": true, "v": 2, "iv": nonce, "payload": 密文+tag}
+      自带认证标签，数据被篡改时解密直接失败；payload 与 WebCrypto AES-GCM 的输出格式相同
+
+    二进制传输（只支持 v2）：BINARY_MAGIC + 版本(1字节) + nonce(12字节) + 密文 + tag(16字节)，
+    不经过 base64，比 JSON 格式小约四分之一
     """
     # 默认密钥（实际生产环境应从环境变量获取）
     # 确保密钥长度为32字节（使用 \0 填充）
     DEFAULT_KEY = b'Educational_Counselor_Secret_K'.ljust(32, b'\0')[:32]
     BLOCK_SIZE = 16
 
+    VERSION_CBC = 1
+    VERSION_GCM = 2
+    SUPPORTED_VERSIONS = (VERSION_CBC, VERSION_GCM)
+
+    # 默认使用的版本（现有前端按 v1 解密），可通过 settings.API_ENCRYPTION_VERSION 修改
+    DEFAULT_VERSION = VERSION_CBC
+
+    GCM_NONCE_SIZE = 12
+    GCM_TAG_SIZE = 16
+
+    BINARY_MAGIC = b'ECA'
+
     @classmethod
     def get_key(cls):
         secret = getattr(settings, 'API_ENCRYPTION_KEY', None)
@@ -25,16 +46,52 @@ class DataEncryptor:
         return cls.DEFAULT_KEY
 
     @classmethod
-    def encrypt_data(cls, data):
+    def get_key_version(cls):
+        """
+        密钥版本号，用于区分不同密钥加密出的缓存
+        优先使用 API_ENCRYPTION_KEY_VERSION，未配置时取密钥摘要的前8位（换密钥后自动变化）
+        """
+        version = getattr(settings, 'API_ENCRYPTION_KEY_VERSION', None)
+        if version:
+            return str(version)
+        return hashlib.sha256(cls.get_key()).hexdigest()[:8]
+
+    @classmethod
+    def get_default_version(cls):
+        version = getattr(settings, 'API_ENCRYPTION_VERSION', None)
+        if version in cls.SUPPORTED_VERSIONS:
+            return version
+        return cls.DEFAULT_VERSION
+
+    @classmethod
+    def encrypt_data(cls, data, version=None):
         """
         加密数据
         :param data: 字典或列表等可JSON序列化的数据
+        :param version: 加密格式版本，默认 get_default_version()
         :return: { "iv": "base64...", "payload": "base64..." }
         """
         try:
             # 1. 序列化数据
             json_data = json.dumps(data).encode('utf-8')
-            
+        except Exception as e:
+            # 生产环境应记录日志
+            print(f"Encryption error: {e}")
+            return data
+        return cls.encrypt_bytes(json_data, version) or data
+
+    @classmethod
+    def encrypt_bytes(cls, json_data, version=None):
+        """
+        加密已序列化好的 JSON 字节（PayloadResponse 的 data 部分，不需要再序列化一次）
+        :param version: 加密格式版本，默认 get_default_version()
+        :return: { "encrypted": True, "iv": "base64...", "payload": "base64..." }，失败返回 None
+        """
+        if version is None:
+            version = cls.get_default_version()
+        if version == cls.VERSION_GCM:
+            return cls._encrypt_gcm_envelope(json_data)
+        try:
             # 2. 生成IV
             iv = get_random_bytes(cls.BLOCK_SIZE)
             
@@ -51,12 +108,88 @@ class DataEncryptor:
         except Exception as e:
             # 生产环境应记录日志
             print(f"Encryption error: {e}")
-            return data
+            return None
+
+    @classmethod
+    def _encrypt_gcm(cls, plain_bytes):
+        """AES-GCM 加密，返回 (nonce, 密文+tag)"""
+        nonce = get_random_bytes(cls.GCM_NONCE_SIZE)
+        cipher = AES.new(cls.get_key(), AES.MODE_GCM, nonce=nonce, mac_len=cls.GCM_TAG_SIZE)
+        encrypted_bytes, tag = cipher.encrypt_and_digest(plain_bytes)
+        return nonce, encrypted_bytes + tag
+
+    @classmethod
+    def _decrypt_gcm(cls, nonce, encrypted_bytes):
+        """AES-GCM 解密并校验 tag，校验失败抛出 ValueError"""
+        cipher = AES.new(cls.get_key(), AES.MODE_GCM, nonce=nonce, mac_len=cls.GCM_TAG_SIZE)
+        return cipher.decrypt_and_verify(
+            encrypted_bytes[:-cls.GCM_TAG_SIZE], encrypted_bytes[-cls.GCM_TAG_SIZE:]
+        )
+
+    @classmethod
+    def _encrypt_gcm_envelope(cls, json_data):
+        """v2 JSON 格式"""
+        try:
+            nonce, encrypted_bytes = cls._encrypt_gcm(json_data)
+            return {
+                "encrypted": True,
+                "v": cls.VERSION_GCM,
+                "iv": base64.b64encode(nonce).decode('utf-8'),
+                "payload": base64.b64encode(encrypted_bytes).decode('utf-8')
+            }
+        except Exception as e:
+            print(f"Encryption error: {e}")
+            return None
+
+    @classmethod
+    def encrypt_binary(cls, plain_bytes):
+        """
+        加密为二进制帧（v2）：BINARY_MAGIC + 版本 + nonce + 密文 + tag
+        :return: bytes，失败返回 None
+        """
+        try:
+            nonce, encrypted_bytes = cls._encrypt_gcm(plain_bytes)
+            return cls.BINARY_MAGIC + bytes((cls.VERSION_GCM,)) + nonce + encrypted_bytes
+        except Exception as e:
+            print(f"Encryption error: {e}")
+            return None
+
+    @classmethod
+    def decrypt_binary(cls, frame):
+        """
+        解密二进制帧
+        :return: 原始字节，格式不对或校验失败返回 None
+        """
+        try:
+            header_size = len(cls.BINARY_MAGIC) + 1
+            if frame[:len(cls.BINARY_MAGIC)] != cls.BINARY_MAGIC or frame[header_size - 1] != cls.VERSION_GCM:
+                raise ValueError("unknown frame header")
+            nonce = frame[header_size:header_size + cls.GCM_NONCE_SIZE]
+            return cls._decrypt_gcm(nonce, frame[header_size + cls.GCM_NONCE_SIZE:])
+        except Exception as e:
+            print(f"Decryption error: {e}")
+            return None
+
+    @classmethod
+    def decrypt_envelope(cls, envelope):
+        """
+        按版本解密 encrypt_data / encrypt_bytes 的结果
+        """
+        if envelope.get('v', cls.VERSION_CBC) == cls.VERSION_CBC:
+            return cls.decrypt_data(envelope['payload'], envelope['iv'])
+        try:
+            decrypted_bytes = cls._decrypt_gcm(
+                base64.b64decode(envelope['iv']), base64.b64decode(envelope['payload'])
+            )
+            return json.loads(decrypted_bytes.decode('utf-8'))
+        except Exception as e:
+            print(f"Decryption error: {e}")
+            return None
 
     @classmethod
     def decrypt_data(cls, encrypted_payload, iv_str):
         """
-        解密数据
+        解密数据（v1）
         """
         try:
             iv = base64.b64decode(iv_str)